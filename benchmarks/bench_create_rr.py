@@ -0,0 +1,52 @@
+# Scaling benchmark of rr_network.create_rr
+#
+# Builds random food webs of growing size (about 5 links per species, mixing every kind of link)
+# and times their translation into an rr_list. The time per edge should stay roughly constant
+# if the translation scales linearly with the size of the network.
+#
+# Usage: python benchmarks/bench_create_rr.py [max_edges]
+
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "libraries"))
+
+from rr_network import rr_network
+
+
+KINDS = ["predation", "predation", "secondary_predation", "competition", "mutualism"]
+
+
+def random_network(n_edges, links_per_species = 5, seed = 0):
+    # Random network with n_edges links and n_edges / links_per_species species
+    rd = random.Random(seed)
+    n_nodes = max(2, n_edges // links_per_species)
+    net = rr_network()
+    net.add_nodes_from("sp{0}".format(i) for i in range(n_nodes))
+    edges = set()
+    while len(edges) < n_edges:
+        edges.add((rd.randrange(n_nodes), rd.randrange(n_nodes)))
+    for source, target in edges:
+        net.add_edge("sp{0}".format(source), "sp{0}".format(target), kind = rd.choice(KINDS))
+    for i in range(0, n_nodes, 10):
+        net.nodes["sp{0}".format(i)]["feature"] = "autotroph"
+    net.initialize_nodes(initially_present = list(net.nodes)[::2])
+    return net
+
+
+def main(max_edges = 100000):
+    print("{0:>10} {1:>10} {2:>10} {3:>12} {4:>12}".format("nodes", "edges", "rules", "time (s)", "us / edge"))
+    n_edges = 1000
+    while n_edges <= max_edges:
+        net = random_network(n_edges)
+        start = time.perf_counter()
+        rr = net.create_rr(appearance_options = ["no_predator"])
+        elapsed = time.perf_counter() - start
+        print("{0:>10} {1:>10} {2:>10} {3:>12.3f} {4:>12.2f}".format(net.number_of_nodes(), net.number_of_edges(), len(rr.rules), elapsed, 1e6 * elapsed / n_edges))
+        n_edges *= 10
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,53 @@
+# Scaling benchmark of the parallel exploration of the state space (rr_states.explore_states_parallel)
+#
+# Explores a system of n independent switches (each node can appear and disappear), whose state space contains
+# all the 2^n states, with the serial search (explore_states) and with 1, 2, 4... worker processes, up to the
+# number of CPUs. The speedup should be close to the number of processes as long as the levels of the search are
+# large. Extra nodes that never change can be added, to use the sorted arrays of visited states instead of the bitmaps.
+#
+# Usage: python benchmarks/bench_explore.py [n_switches] [n_fixed] [max_processes]
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "libraries"))
+
+from rr_list import rr_list
+from utils import create_rule
+import rr_states
+
+
+def switches(n_switches, n_fixed = 0):
+    # System of n_switches nodes which can appear and disappear freely, and n_fixed nodes without rules
+    nodes = ["sw{0}".format(i) for i in range(n_switches)] + ["fixed{0}".format(i) for i in range(n_fixed)]
+    rr = rr_list(nodes)
+    rr.nodes_init = [0]*len(nodes)
+    for node in nodes[:n_switches]:
+        rr.rules.append(create_rule(node, "-", node, "+"))
+        rr.rules.append(create_rule(node, "+", node, "-"))
+    return rr
+
+
+def main(n_switches = 20, n_fixed = 0, max_processes = None):
+    rr = switches(n_switches, n_fixed)
+    max_processes = os.cpu_count() if max_processes is None else max_processes
+    start = time.perf_counter()
+    space = rr_states.explore_states(rr)
+    serial = time.perf_counter() - start
+    print("{0} nodes, {1} states, {2} transitions, {3} CPUs".format(n_switches + n_fixed, len(space), len(space.targets), os.cpu_count()))
+    print("{0:>10} {1:>10} {2:>10}".format("processes", "time (s)", "speedup"))
+    print("{0:>10} {1:>10.2f} {2:>10.2f}".format("serial", serial, 1.0))
+    processes = 1
+    while processes <= max_processes:
+        start = time.perf_counter()
+        parallel = rr_states.explore_states_parallel(rr, processes = processes)
+        seconds = time.perf_counter() - start
+        if not len(parallel) == len(space):
+            raise ValueError("the parallel exploration found {0} states instead of {1}".format(len(parallel), len(space)))
+        print("{0:>10} {1:>10.2f} {2:>10.2f}".format(processes, seconds, serial / seconds))
+        processes *= 2
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,86 @@
+# Import time budget of the translator
+#
+# Measures, in fresh interpreters, the time taken by the import of the modules (the best of several runs), and the
+# heavy dependencies they load. The core (rr_list, create_rule, .rr files) must be imported within its budget and
+# without numpy, pandas, networkx or scipy ; the exit status is 1 otherwise, so that the script can be used as a check. The modules are imported from the libraries folder, and as the rr_translator package.
+#
+# Usage: python benchmarks/bench_import.py [--runs 5] [--budget 60] [--output import_times.json]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+LIBRARIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "libraries")
+
+HEAVY = ["numpy", "pandas", "networkx", "scipy"]
+
+# (name, import statement, is part of the core)
+IMPORTS = [("rr_list", "from rr_list import rr_list", True),
+           ("utils", "from utils import create_rule", True),
+           ("rr_states", "import rr_states", False),
+           ("rr_bdd", "import rr_bdd", True),
+           ("rr_compiled", "import rr_compiled", False),
+           ("rr_network", "from rr_network import rr_network", False),
+           ("rr_ensemble", "import rr_ensemble", False),
+           ("package", "import rr_translator", True),
+           ("package.rr_list", "from rr_translator import rr_list", True),
+           ("package.probe", "import rr_translator; hasattr(rr_translator, 'np')", True),
+           ("package.rr_network", "from rr_translator import rr_network", False)]
+
+MEASURE = """import sys, time
+sys.path.insert(0, {path!r})
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start, ",".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def import_time(statement, path, runs = 5):
+    # Returns (best time of the import in seconds, heavy modules loaded), each run in a new interpreter
+    best = None
+    for run in range(runs):
+        output = subprocess.run([sys.executable, "-c", MEASURE.format(path = path, statement = statement, heavy = HEAVY)],
+                                capture_output = True, text = True, check = True).stdout.split()
+        seconds = float(output[0])
+        best = seconds if best is None else min(best, seconds)
+    return best, output[1].split(",") if len(output) > 1 else []
+
+
+def measure(runs = 5, budget = 0.060, verbose = True):
+    # Measures the imports of IMPORTS, and returns (results, True if the core is within its budget)
+    results = []
+    success = True
+    with tempfile.TemporaryDirectory() as folder:
+        # the package is imported from a link named rr_translator to the libraries folder (as installed by pip)
+        os.symlink(os.path.abspath(LIBRARIES), os.path.join(folder, "rr_translator"))
+        for name, statement, core in IMPORTS:
+            path = folder if name.startswith("package") else os.path.abspath(LIBRARIES)
+            seconds, heavy = import_time(statement, path, runs)
+            passed = not core or (seconds <= budget and len(heavy) == 0)
+            success = success and passed
+            results.append({"name": name, "statement": statement, "seconds": seconds, "heavy_modules": heavy,
+                            "core": core, "passed": passed})
+            if verbose == True:
+                print("{0:<22} {1:>8.1f} ms  {2:<24} {3}".format(name, 1000*seconds, ",".join(heavy),
+                      ("ok" if passed else "OVER BUDGET") if core else ""), flush = True)
+    return results, success
+
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description = "Import time budget of the network to rr translator")
+    parser.add_argument("--runs", type = int, default = 5, help = "number of runs of each import (the best one is kept)")
+    parser.add_argument("--budget", type = float, default = 60, help = "budget of the imports of the core, in ms")
+    parser.add_argument("--output", help = "JSON file in which the results are written")
+    options = parser.parse_args(arguments)
+    results, success = measure(options.runs, options.budget/1000)
+    if options.output is not None:
+        with open(options.output, "w") as f:
+            json.dump({"budget": options.budget/1000, "results": results}, f, indent = 1)
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+# Scaling benchmark suite of the translation pipeline
+#
+# Builds synthetic food webs of growing size (by default 10 to 100 000 species) with a controlled number of
+# links per species and mix of interactions (predation, secondary predation, competition, mutualism, and a
+# fraction of autotroph species), and measures each stage of the pipeline:
+#       build               creation of the rr_network (add_edges_from)
+#       initialize_nodes    initial states of the nodes
+#       create_rr           translation into an rr_list
+#       create_rule         one create_rule call per link (string building alone)
+#       include_matrix      translation of the predation links given as a community matrix (sparse if scipy is available)
+#       write_file          .rr file
+#       write_universe_file .rr file of the state universe
+#       write_rr_stream     .rr file written directly from the network (write_rr_file with stream = True)
+# The time of each stage is measured in a first run, and its peak memory (tracemalloc) in a second run, as
+# tracemalloc slows the code down. Results are written as JSON, and can be compared to a previous run.
+#
+# Usage: python benchmarks/bench_suite.py [--sizes 10,100,1000] [--links 5] [--output results.json]
+#                                         [--compare previous.json] [--no-memory]
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "libraries"))
+
+import numpy as np
+import networkx as nx
+from rr_network import rr_network
+from rr_list import rr_list
+from utils import create_rule
+
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+
+# Share of each kind of link
+DEFAULT_MIX = {"predation": 0.4, "secondary_predation": 0.2, "competition": 0.2, "mutualism": 0.2}
+
+STAGES = ["build", "initialize_nodes", "create_rr", "create_rule", "include_matrix", "write_file", "write_universe_file", "write_rr_stream"]
+
+
+def synthetic_web(n_species, links_per_species = 5, mix = DEFAULT_MIX, autotroph = 0.1, seed = 0):
+    # Draws the links of a synthetic web: about links_per_species * n_species links without loops or duplicates,
+    # whose kinds are drawn according to mix, and a fraction autotroph of species with the "autotroph" feature
+    # Returns (nodes, edges, features): list of names, list of (source, target, {"kind": kind}) and list of autotroph species
+    rng = np.random.default_rng(seed)
+    nodes = ["sp{0}".format(i) for i in range(n_species)]
+    n_links = min(links_per_species*n_species, n_species*(n_species - 1))
+    pairs = np.zeros(0, dtype = np.int64)
+    while len(pairs) < n_links:
+        drawn = rng.integers(0, n_species*n_species, size = 2*(n_links - len(pairs)) + 10)
+        drawn = drawn[drawn // n_species != drawn % n_species]
+        pairs = np.concatenate([pairs, drawn])
+        pairs = pairs[np.sort(np.unique(pairs, return_index = True)[1])]
+    pairs = pairs[:n_links]
+    kinds = list(mix)
+    drawn_kinds = rng.choice(len(kinds), size = n_links, p = np.array([mix[kind] for kind in kinds])/sum(mix.values()))
+    edges = [(nodes[pair // n_species], nodes[pair % n_species], {"kind": kinds[k]}) for pair, k in zip(pairs.tolist(), drawn_kinds.tolist())]
+    features = [nodes[i] for i in np.flatnonzero(rng.random(n_species) < autotroph).tolist()]
+    return nodes, edges, features
+
+
+def community_matrix(nodes, edges):
+    # Community matrix of the predation links (1 for main preys, 0.5 for secondary preys), sparse if scipy is available
+    positions = {node: i for i, node in enumerate(nodes)}
+    links = [(positions[target], positions[source], 1.0 if attributes["kind"] == "predation" else 0.5)
+             for source, target, attributes in edges if attributes["kind"] in ("predation", "secondary_predation")]
+    rows, columns, values = (np.array(column) for column in zip(*links)) if links else (np.zeros(0, int),)*3
+    try:
+        import scipy.sparse
+        return scipy.sparse.csc_matrix((values, (rows, columns)), shape = (len(nodes), len(nodes)))
+    except ImportError:
+        if len(nodes) > 5000:
+            return None
+        S = np.zeros((len(nodes), len(nodes)))
+        S[rows, columns] = values
+        return S
+
+
+def run_pipeline(n_species, links_per_species, mix, autotroph, folder, measure):
+    # Runs all the stages on a web of n_species species, measure(stage, function) running each of them
+    # Returns the size of the web and of its translation
+    nodes, edges, features = synthetic_web(n_species, links_per_species, mix, autotroph)
+    state = {}
+
+    def build():
+        net = rr_network()
+        net.add_nodes_from(nodes)
+        net.add_edges_from(edges)
+        for node in features:
+            net.nodes[node]["feature"] = "autotroph"
+        state["net"] = net
+    measure("build", build)
+    net = state["net"]
+    measure("initialize_nodes", lambda: net.initialize_nodes(initially_present = nodes[::2]))
+    measure("create_rr", lambda: state.update(rr = net.create_rr(appearance_options = ["no_predator"])))
+    measure("create_rule", lambda: [create_rule(source, "+", target, "-") for source, target, attributes in edges])
+
+    S = community_matrix(nodes, edges)
+    if S is not None:
+        measure("include_matrix", lambda: rr_list(nodes).include_matrix(S, "predation", strong_dependance = True))
+    rr = state["rr"]
+    measure("write_file", lambda: rr.write_file("bench", folder = folder, sure = "y"))
+    measure("write_universe_file", lambda: rr.write_universe_file("bench", folder = folder, sure = "y"))
+    measure("write_rr_stream", lambda: net.write_rr_file("bench_stream", folder = folder, sure = "y", stream = True, appearance_options = ["no_predator"]))
+    return {"species": n_species, "links": net.number_of_edges(), "rules": len(rr.rules), "constraints": len(rr.constraints),
+            "file_bytes": os.path.getsize(os.path.join(folder, "bench.rr"))}
+
+
+def benchmark(sizes = DEFAULT_SIZES, links_per_species = 5, mix = DEFAULT_MIX, autotroph = 0.1, memory = True, verbose = True):
+    # Runs the pipeline for each size, and returns the results as a dict (see save)
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        folder += os.sep
+        for n_species in sizes:
+            times = {}
+            peaks = {}
+
+            def timed(stage, function):
+                gc.collect()
+                start = time.perf_counter()
+                function()
+                times[stage] = time.perf_counter() - start
+
+            def traced(stage, function):
+                gc.collect()
+                tracemalloc.start()
+                function()
+                peaks[stage] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+            sizes_info = run_pipeline(n_species, links_per_species, mix, autotroph, folder, timed)
+            if memory == True:
+                run_pipeline(n_species, links_per_species, mix, autotroph, folder, traced)
+            for stage in STAGES:
+                if stage in times:
+                    results.append(dict(sizes_info, stage = stage, seconds = times[stage], peak_bytes = peaks.get(stage)))
+            if verbose == True:
+                print("{0:>8} species {1:>9} links {2:>9} rules   ".format(n_species, sizes_info["links"], sizes_info["rules"]) +
+                      "  ".join("{0} {1:.3f}s".format(stage, times[stage]) for stage in STAGES if stage in times), flush = True)
+    return {"environment": environment(), "parameters": {"links_per_species": links_per_species, "mix": mix, "autotroph": autotroph},
+            "results": results}
+
+
+def environment():
+    # Versions of the code and of its dependencies, to compare the results of several runs
+    try:
+        commit = subprocess.run(["git", "describe", "--always", "--dirty"], capture_output = True, text = True,
+                                cwd = os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"commit": commit, "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+            "numpy": np.__version__, "networkx": nx.__version__, "machine": platform.machine(), "cpus": os.cpu_count()}
+
+
+def compare(results, previous):
+    # Prints the ratio of the times (and peak memory) of each stage to those of a previous run
+    former = {(entry["species"], entry["stage"]): entry for entry in previous["results"]}
+    print("{0:>8} {1:>20} {2:>10} {3:>10} {4:>8} {5:>8}".format("species", "stage", "time (s)", "before", "ratio", "memory"))
+    for entry in results["results"]:
+        before = former.get((entry["species"], entry["stage"]))
+        if before is None:
+            continue
+        memory_ratio = entry["peak_bytes"]/before["peak_bytes"] if entry["peak_bytes"] and before["peak_bytes"] else float("nan")
+        print("{0:>8} {1:>20} {2:>10.4f} {3:>10.4f} {4:>8.2f} {5:>8.2f}".format(entry["species"], entry["stage"], entry["seconds"],
+              before["seconds"], entry["seconds"]/before["seconds"] if before["seconds"] > 0 else float("nan"), memory_ratio))
+
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description = "Scaling benchmark of the network to rr translation")
+    parser.add_argument("--sizes", default = ",".join(str(size) for size in DEFAULT_SIZES), help = "numbers of species, separated by commas")
+    parser.add_argument("--links", type = float, default = 5, help = "number of links per species")
+    parser.add_argument("--autotroph", type = float, default = 0.1, help = "fraction of autotroph species")
+    parser.add_argument("--output", default = "bench_results.json", help = "JSON file in which the results are written")
+    parser.add_argument("--compare", help = "JSON file of a previous run, to which the results are compared")
+    parser.add_argument("--no-memory", action = "store_true", help = "do not measure the peak memory of each stage")
+    options = parser.parse_args(arguments)
+    results = benchmark([int(size) for size in options.sizes.split(",")], links_per_species = options.links,
+                        autotroph = options.autotroph, memory = not options.no_memory)
+    with open(options.output, "w") as f:
+        json.dump(results, f, indent = 1)
+    if options.compare is not None:
+        with open(options.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,20 @@ import pandas as pd
 import numpy as np
 import sys
 
-# Modify the path below to adapt it to your system
-if not ("/home/mathieu.de-goer/libraries" in sys.path):
-	sys.path.append("/home/mathieu.de-goer/libraries")
-    
-from utils import *
-from rr_network import *
-from rr_list import *
+try:
+    # rr_translator package installed with pip (see README.md)
+    from rr_translator.utils import *
+    from rr_translator.rr_network import *
+    from rr_translator.rr_list import *
+    from rr_translator.rr_states import *
+    from rr_translator.rr_ensemble import *
+except ImportError:
+    # Modify the path below to adapt it to your system
+    if not ("/home/mathieu.de-goer/libraries" in sys.path):
+        sys.path.append("/home/mathieu.de-goer/libraries")
+
+    from utils import *
+    from rr_network import *
+    from rr_list import *
+    from rr_states import *
+    from rr_ensemble import *
@@ -0,0 +1,50 @@
+# Network to RR translator, as the rr_translator package (pip install . from the root of the repository)
+#
+# "import rr_translator" only loads the core: rr_list, create_rule and the reading and writing of the .rr files,
+# without numpy, pandas or networkx. The other modules are imported at the first use of one of their public names (LAZY_NAMES):
+#       rr_states   (numpy)                 state spaces (rr_list.explore)
+#       rr_bdd      (no dependency)         symbolic state spaces, with binary decision diagrams (rr_list.symbolic)
+#       rr_compiled (numpy)                 compiled (binary) files of the rr_lists (rr_list.write_compiled and read_compiled)
+#       rr_network  (networkx, numpy)       translation of networks
+#       rr_ensemble (networkx, numpy)       random ensembles of food webs
+#       rr_batch    (networkx, numpy)       translation of many network files (command line interface)
+# e.g. "from rr_translator import rr_network" imports networkx, "from rr_translator import rr_list" does not.
+# The modules can still be used directly from the libraries folder added to the sys.path (see init.py).
+
+from .utils import *
+from .rr_list import *
+
+# Modules imported when they are first used
+LAZY_MODULES = ["rr_states", "rr_bdd", "rr_compiled", "rr_network", "rr_ensemble", "rr_batch"]
+
+# Public names of the lazy modules: the first use of one of them imports its module only. The other names (e.g. the
+# modules they import, such as np or nx) are not exported, and an unknown name imports nothing.
+LAZY_NAMES = {}
+LAZY_NAMES.update(dict.fromkeys(["rr_state_space", "rr_simulation", "rr_masks", "rr_word_masks", "compile_masks", "compile_word_masks",
+                                 "explore_states", "explore_states_parallel", "simulate", "attractor_analysis", "strong_components"], "rr_states"))
+LAZY_NAMES.update(dict.fromkeys(["bdd", "rr_symbolic", "rr_state_set", "compile_symbolic"], "rr_bdd"))
+LAZY_NAMES.update(dict.fromkeys(["rr_compiled", "compile_rr", "load_compiled", "compiled_filename"], "rr_compiled"))
+LAZY_NAMES.update(dict.fromkeys(["rr_network", "rr_nodes_init", "rr_composition", "INTERACTION_KINDS", "APPEARANCE_OPTIONS",
+                                 "structure_metrics", "stable_states"], "rr_network"))
+LAZY_NAMES.update(dict.fromkeys(["MODELS", "random_network", "cascade_model", "niche_model", "trophic_levels_model", "ensemble_seeds",
+                                 "ensemble_archive", "write_ensemble", "ensemble_replicate"], "rr_ensemble"))
+LAZY_NAMES.update(dict.fromkeys(["read_network", "read_graphml", "translate_file", "translate_files", "batch_summary"], "rr_batch"))
+
+
+def __getattr__(name):
+    # a lazy module is given by its name, unless it has a public name of the same name (rr_compiled, rr_network)
+    module_name = LAZY_NAMES.get(name, name if name in LAZY_MODULES else None)
+    if module_name is None:
+        raise AttributeError("module {0} has no attribute {1}".format(__name__, name))
+    module = import_module("." + module_name, __name__)
+    # the import of a module sets it (and the modules it imports) as an attribute of the package, hiding the public name of the same name
+    for lazy_name in LAZY_MODULES:
+        lazy = globals().get(lazy_name)
+        if hasattr(lazy, "__file__") and lazy_name in LAZY_NAMES:
+            globals()[lazy_name] = getattr(lazy, lazy_name)
+    globals()[name] = getattr(module, name) if name in LAZY_NAMES else module
+    return globals()[name]
+
+
+def __dir__():
+    return sorted(set(globals()) | set(LAZY_MODULES) | set(LAZY_NAMES))
@@ -0,0 +1,235 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+if __package__:
+    from .rr_network import *
+    from .rr_io import *
+else:
+    from rr_network import *
+    from rr_io import *
+
+########### Translation of many network files, without any question asked #############
+
+# Command line interface translating network files into .rr files, with a pool of worker processes:
+#       python libraries/rr_batch.py webs/*.csv webs/*.graphml --output rr_files/ --universe --existing skip
+# (or rr-translate ... once the package is installed). The files can be:
+#   - edge lists (.csv, .tsv, .txt, possibly compressed, or .parquet): a header line, then one link per line, with source, target
+#     and kind columns (kind: predation, secondary_predation, competition or mutualism), and optionally a column of the feature of
+#     the source (see rr_network.from_edgelist)
+#   - GraphML files (.graphml): directed graphs whose edges have a "kind" attribute and whose nodes may have a "feature" attribute
+# The initial state of the nodes and the policy for the existing files are given as options, so that the functions asking
+# the user (create_rr, write_file, ...) are never reached.
+
+# Policies for the .rr files which already exist
+EXISTING_POLICIES = ["fail", "skip", "overwrite"]
+
+
+def network_name(filename):
+    # Name of the network of a file, used as the name of its .rr file (e.g. "webs/web1.csv.gz" -> "web1")
+    name = os.path.basename(filename)
+    if name.endswith(".gz"):
+        name = name[:-3]
+    return os.path.splitext(name)[0]
+
+
+def read_graphml(filename):
+    # Reads a rr_network from a GraphML file, keeping the attributes of its nodes ("feature") and edges ("kind")
+    return rr_network(nx.read_graphml(filename))
+
+
+def read_network(filename, delimiter = None, **kwd):
+    # Reads a rr_network from a GraphML file or an edge list, depending on its extension
+
+    # delimiter (str, optionnal): delimiter of the columns of the edge lists (by default, given by the extension)
+    # The other arguments are those of rr_network.from_edgelist (source, target, kind, feature)
+    if filename.endswith((".graphml", ".graphml.gz")):
+        return read_graphml(filename)
+    if delimiter is not None:
+        kwd["sep"] = delimiter
+    return rr_network.from_edgelist(filename, **kwd)
+
+
+def translate_file(task):
+    # Reads, translates and writes a network file (used by translate_files in the worker processes)
+    # Returns a dict describing the result: "input", "status" ("written", "skipped" or "failed"), "outputs", "nodes", "links",
+    # "rules" and "constraints" (written), "removed" (by the minimization), "bytes", "seconds" and "message" (the error if the translation failed)
+    filename, options = task
+    start = time.perf_counter()
+    result = {"input": filename, "status": "failed", "outputs": [], "nodes": 0, "links": 0, "rules": 0, "constraints": 0, "removed": 0, "bytes": 0,
+              "message": ""}
+    name = network_name(filename)
+    outputs = [rr_filename(name, folder = options["folder"], universe = universe, compression = options["compression"])
+               for universe in options["files"]]
+    try:
+        existing = [output for output in outputs if os.path.isfile(output)]
+        if options["existing"] == "skip" and len(existing) == len(outputs):
+            result["status"] = "skipped"
+            return result
+        if options["existing"] == "fail" and len(existing) > 0:
+            raise ValueError("the rr file '{0}' already exists".format(existing[0]))
+        net = read_network(filename, **options["columns"])
+        result["nodes"] = net.number_of_nodes()
+        result["links"] = net.number_of_edges()
+        if options["init_attribute"] is not None:
+            net.initialize_nodes(attribute = options["init_attribute"])
+        else:
+            net.initialize_nodes(initially_present = list(net.nodes) if options["init"] == "all" else [])
+        rr_out = net.create_rr(**options["translation"])
+        if options["minimize"] == True:
+            result["removed"] = sum(rr_out.minimize().values())
+        result["rules"] = len(rr_out.rules)
+        result["constraints"] = len(rr_out.constraints)
+        for universe, output in zip(options["files"], outputs):
+            if universe == True:
+                rr_out.write_universe_file(name, folder = options["folder"], sure = "y", compression = options["compression"])
+            else:
+                rr_out.write_file(name, folder = options["folder"], sure = "y", compression = options["compression"])
+            result["outputs"].append(output)
+            result["bytes"] += os.path.getsize(output)
+        result["status"] = "written"
+    except Exception as error:
+        result["message"] = "{0}: {1}".format(type(error).__name__, error)
+    finally:
+        result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def translate_files(filenames, folder = "", processes = None, existing = "fail", init = "all", init_attribute = None, normal = True,
+                    universe = False, compression = None, columns = {}, translation = {}, minimize = True, report = None):
+    # Translates many network files into .rr files, with a pool of worker processes, without asking anything
+
+    # filenames (list of str): network files (edge lists or GraphML, see read_network) ; their .rr files are named after them (see network_name)
+    # folder (str): folder in which the .rr files are written
+    # processes (int, optionnal): number of worker processes (by default, the number of CPUs ; 1 to translate the files in this process)
+    # existing (str): policy for the .rr files which already exist: "fail" (the network is not translated if one of its files exists,
+    #                 and counted as failed), "skip" (the network is not translated if all its files exist) or "overwrite"
+    # init (str, "all" or "none"): initial state of the nodes (all present, or all absent)
+    # init_attribute (str, optionnal): name of a node attribute giving the initial state of the nodes instead (see initialize_nodes)
+    # normal, universe (bool): whether the .rr file and the file allowing to compute the state universe are written
+    # compression (None, "gzip" or "xz"): compression of the .rr files
+    # columns (dict): options of read_network (source, target, kind, feature, delimiter)
+    # translation (dict): options of create_rr (allow_appearance, strong_dependance, appearance_options)
+    # minimize (bool): if True, the rules which do not change the behaviour of the system are removed before writing (see rr_list.minimize)
+    # report (function, optionnal): called with the result of each network as soon as it is translated
+    # Returns the list of the results of the networks (see translate_file), in the order of filenames
+    if not existing in EXISTING_POLICIES:
+        raise ValueError("Unknown policy '{0}' for the existing files (has to be one of {1})".format(existing, EXISTING_POLICIES))
+    if not init in ["all", "none"]:
+        raise ValueError("init has to be 'all' or 'none', not '{0}'".format(init))
+    names = [network_name(filename) for filename in filenames]
+    duplicates = sorted(set(name for name in names if names.count(name) > 1))
+    if len(duplicates) > 0:
+        raise ValueError("several files would be written with the same name: {0}".format(duplicates))
+    if len(folder) > 0 and not folder.endswith(os.sep):
+        folder += os.sep
+    if len(folder) > 0:
+        os.makedirs(folder, exist_ok = True)
+
+    options = {"folder": folder, "existing": existing, "init": init, "init_attribute": init_attribute, "compression": compression,
+               "files": [universe_file for universe_file, written in [(False, normal), (True, universe)] if written],
+               "columns": columns, "translation": translation, "minimize": minimize}
+    tasks = [(filename, options) for filename in filenames]
+    processes = os.cpu_count() if processes is None else processes
+    results = []
+    if processes <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            results.append(translate_file(task))
+            if report is not None:
+                report(results[-1])
+    else:
+        with multiprocessing.get_context().Pool(min(processes, len(tasks))) as pool:
+            for result in pool.imap_unordered(translate_file, tasks):
+                results.append(result)
+                if report is not None:
+                    report(result)
+        positions = {filename: i for i, filename in enumerate(filenames)}
+        results.sort(key = lambda result: positions[result["input"]])
+    return results
+
+
+def batch_summary(results, seconds):
+    # Totals and throughput of a batch of translations (see translate_files)
+    written = [result for result in results if result["status"] == "written"]
+    summary = {"networks": len(results), "seconds": seconds}
+    for status in ["written", "skipped", "failed"]:
+        summary[status] = sum(result["status"] == status for result in results)
+    for total in ["nodes", "links", "rules", "constraints", "removed", "bytes"]:
+        summary[total] = sum(result[total] for result in written)
+    summary["networks_per_s"] = len(written)/seconds if seconds > 0 else 0.0
+    summary["links_per_s"] = summary["links"]/seconds if seconds > 0 else 0.0
+    return summary
+
+
+def report_result(result):
+    # Prints a line about the translation of a network
+    if result["status"] == "written":
+        print("written  {0} ({1} nodes, {2} links, {3} rules, {4} constraints, {5} removed) in {6:.3f} s".format(result["input"], result["nodes"],
+              result["links"], result["rules"], result["constraints"], result["removed"], result["seconds"]), flush = True)
+    elif result["status"] == "skipped":
+        print("skipped  {0} (files already exist)".format(result["input"]), flush = True)
+    else:
+        print("FAILED   {0}: {1}".format(result["input"], result["message"]), file = sys.stderr, flush = True)
+
+
+def report_failure(result):
+    # Prints a line about the translation of a network only if it failed
+    if result["status"] == "failed":
+        report_result(result)
+
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description = "Translation of network files (edge lists or GraphML) into .rr files")
+    parser.add_argument("files", nargs = "+", help = "network files: edge lists (.csv, .tsv, .txt, possibly compressed, or .parquet) or GraphML (.graphml)")
+    parser.add_argument("-o", "--output", default = "", help = "folder in which the .rr files are written (default: current folder)")
+    parser.add_argument("-p", "--processes", type = int, help = "number of worker processes (default: number of CPUs)")
+    parser.add_argument("--existing", choices = EXISTING_POLICIES, default = "fail",
+                        help = "policy for the .rr files which already exist (default: fail)")
+    parser.add_argument("--init", choices = ["all", "none"], default = "all", help = "initial state of the nodes (default: all present)")
+    parser.add_argument("--init-attribute", help = "node attribute giving the initial state of the nodes (present if 1, True or +)")
+    parser.add_argument("--universe", action = "store_true", help = "also write the files allowing to compute the state universe")
+    parser.add_argument("--universe-only", action = "store_true", help = "only write the files allowing to compute the state universe")
+    parser.add_argument("--compression", choices = ["gzip", "xz"], help = "compression of the .rr files")
+    parser.add_argument("--no-appearance", action = "store_true", help = "species cannot reappear (allow_appearance = False)")
+    parser.add_argument("--no-strong-dependance", action = "store_true",
+                        help = "predators without preys are not removed by a constraint (strong_dependance = False)")
+    parser.add_argument("--appearance-option", action = "append", choices = APPEARANCE_OPTIONS, default = [],
+                        help = "option of the appearance rules (can be repeated)")
+    parser.add_argument("--no-minimize", action = "store_true",
+                        help = "keep the rules which do not change the behaviour of the system (duplicates, subsumed or dead rules)")
+    parser.add_argument("--source-column", default = "source", help = "column of the sources of the links in the edge lists")
+    parser.add_argument("--target-column", default = "target", help = "column of the targets of the links in the edge lists")
+    parser.add_argument("--kind-column", default = "kind", help = "column of the kinds of the links in the edge lists")
+    parser.add_argument("--feature-column", help = "column of the feature of the sources of the links in the edge lists (e.g. autotroph)")
+    parser.add_argument("--delimiter", help = "delimiter of the columns of the edge lists (default: given by the extension)")
+    parser.add_argument("--summary", help = "JSON file in which the results and the summary are written")
+    parser.add_argument("-q", "--quiet", action = "store_true", help = "only print the failures and the summary")
+    options = parser.parse_args(arguments)
+
+    translation = {"allow_appearance": not options.no_appearance, "strong_dependance": not options.no_strong_dependance,
+                   "appearance_options": options.appearance_option}
+    columns = {"source": options.source_column, "target": options.target_column, "kind": options.kind_column,
+               "feature": options.feature_column, "delimiter": options.delimiter}
+    start = time.perf_counter()
+    try:
+        results = translate_files(options.files, folder = options.output, processes = options.processes, existing = options.existing,
+                                  init = options.init, init_attribute = options.init_attribute, normal = not options.universe_only,
+                                  universe = options.universe or options.universe_only, compression = options.compression,
+                                  columns = columns, translation = translation, minimize = not options.no_minimize,
+                                  report = report_failure if options.quiet else report_result)
+    except ValueError as error:
+        parser.error(str(error))
+    summary = batch_summary(results, time.perf_counter() - start)
+    print("{0} networks: {1} written, {2} skipped, {3} failed in {4:.2f} s ({5:.2f} networks/s, {6:.0f} links/s, {7} rules, {8} constraints, {9} removed, {10:.1f} MB written)".format(
+          summary["networks"], summary["written"], summary["skipped"], summary["failed"], summary["seconds"], summary["networks_per_s"],
+          summary["links_per_s"], summary["rules"], summary["constraints"], summary["removed"], summary["bytes"]/1e6), flush = True)
+    if options.summary is not None:
+        import json
+        with open(options.summary, "w") as f:
+            json.dump({"summary": summary, "results": results}, f, indent = 1)
+    return 1 if summary["failed"] > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
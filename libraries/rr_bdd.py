@@ -0,0 +1,522 @@
+import random
+import weakref
+from warnings import warn
+if __package__:
+    from .rr_stats import *
+else:
+    from rr_stats import *
+
+########### Symbolic state spaces of an rr_list, with binary decision diagrams #############
+
+# A set of states is represented by a reduced ordered binary decision diagram (BDD) over one variable per node
+# (variable i is True if the i-th node of rr_list.nodes is present), so that its size does not depend on the
+# number of states it contains. The rules have the same semantics as in rr_states.py: a rule can be fired in
+# the states where its conditions hold and in which it changes the state, and in the states where a constraint
+# can be fired, only constraints can be fired. The states reachable from the initial ones are computed as a
+# fixpoint by chaining: R = init, then each rule in turn adds to R the states obtained by firing it from R,
+# until a whole pass over the rules adds nothing (the diagrams of the intermediate sets remain much smaller
+# than with breadth-first levels).
+# The diagrams are computed in pure python (no dependency), without ever listing the states. Their size depends
+# on the order of the variables, i.e. of rr_list.nodes: related species should be close to each other, as in the
+# order in which the networks are usually built.
+
+
+class bdd():
+    # Manager of reduced ordered binary decision diagrams over n_vars variables, ordered by their number
+    # A diagram is designated by an int: 0 (empty set, False), 1 (all the assignments, True), or the number of its root node.
+    # Node k tests the variable var[k]: low[k] is the diagram of the assignments in which it is False, high[k] of those in which it is True.
+    # Nodes are unique (a diagram is never built twice), so that two sets are equal if and only if their diagrams have the same number.
+
+    # n_vars (int): number of variables
+
+    def __init__(self, n_vars):
+        self.n_vars = n_vars
+        self.var = [n_vars, n_vars]     # the terminals are after the last variable
+        self.low = [0, 1]
+        self.high = [0, 1]
+        self._unique = {}
+        self._and = {}
+        self._or = {}
+        self._not = {}
+
+    def __len__(self):
+        # Number of nodes created
+        return len(self.var)
+
+    def node(self, v, low, high):
+        # Returns the diagram testing variable v, equal to low if it is False and to high if it is True
+        if low == high:
+            return low
+        key = (v, low, high)
+        k = self._unique.get(key)
+        if k is None:
+            k = len(self.var)
+            self.var.append(v)
+            self.low.append(low)
+            self.high.append(high)
+            self._unique[key] = k
+        return k
+
+    def literal(self, v, value = True):
+        # Returns the diagram of the assignments in which variable v has the given value
+        return self.node(v, 0, 1) if value == True else self.node(v, 1, 0)
+
+    def cube(self, literals):
+        # Returns the diagram of the assignments satisfying all the literals ({variable: value}), 0 if they contradict each other
+        u = 1
+        for v in sorted(literals, reverse = True):
+            u = self.node(v, 0, u) if literals[v] == True else self.node(v, u, 0)
+        return u
+
+    def clear_cache(self):
+        # Empties the caches of the operations (the diagrams remain valid)
+        self._and.clear()
+        self._or.clear()
+        self._not.clear()
+
+    def collect(self, roots):
+        # Deletes the nodes which are not part of the diagrams roots (list of int), and the cached results using them
+        # Returns the list giving the new number of each former diagram (-1 for the deleted ones)
+        live = bytearray(len(self.var))
+        live[0] = live[1] = 1
+        stack = list(roots)
+        while len(stack) > 0:
+            k = stack.pop()
+            if live[k] == 0:
+                live[k] = 1
+                stack.append(self.low[k])
+                stack.append(self.high[k])
+        # the children of a node are always created before it, and therefore renumbered before it
+        mapping = [-1]*len(self.var)
+        var, low, high = self.var, self.low, self.high
+        self.var, self.low, self.high = var[:2], low[:2], high[:2]
+        self._unique = {}
+        mapping[0], mapping[1] = 0, 1
+        for k in range(2, len(var)):
+            if live[k] == 1:
+                mapping[k] = len(self.var)
+                self.var.append(var[k])
+                self.low.append(mapping[low[k]])
+                self.high.append(mapping[high[k]])
+                self._unique[(var[k], mapping[low[k]], mapping[high[k]])] = mapping[k]
+        for cache in (self._and, self._or):
+            entries = [((mapping[u], mapping[w]), mapping[result]) for (u, w), result in cache.items()]
+            cache.clear()
+            cache.update(entry for entry in entries if entry[0][0] >= 0 and entry[0][1] >= 0 and entry[1] >= 0)
+        entries = [(mapping[u], mapping[result]) for u, result in self._not.items()]
+        self._not.clear()
+        self._not.update(entry for entry in entries if entry[0] >= 0 and entry[1] >= 0)
+        return mapping
+
+    ######## Operations
+    # The operations go through the diagrams with explicit stacks, as they can be deeper than the recursion limit of python
+
+    def negate(self, u):
+        # Complement of u
+        var, low, high, cache = self.var, self.low, self.high, self._not
+        results = []
+        stack = [(u, False)]
+        while len(stack) > 0:
+            u, expanded = stack.pop()
+            if u < 2:
+                result = 1 - u
+            elif expanded == True:
+                high_result = results.pop()
+                result = self.node(var[u], results.pop(), high_result)
+                cache[u] = result
+            else:
+                result = cache.get(u)
+                if result is None:
+                    stack.extend(((u, True), (high[u], False), (low[u], False)))
+                    continue
+            results.append(result)
+        return results[0]
+
+    def apply(self, u, w, cache, absorbing):
+        # Conjunction (absorbing = 0, cache = self._and) or disjunction (absorbing = 1, cache = self._or) of u and w
+        neutral = 1 - absorbing
+        if u == absorbing or w == absorbing:
+            return absorbing
+        if u == neutral or u == w:
+            return w
+        if w == neutral:
+            return u
+        result = cache.get((u, w) if u < w else (w, u))
+        if result is not None:
+            return result
+        var, low, high, unique = self.var, self.low, self.high, self._unique
+        results = []
+        stack = [(u, w, -1)]
+        while stack:
+            u, w, v = stack.pop()
+            if v >= 0:
+                # both operands (u: key of the cache) have been split on variable v, whose two results are on the stack (node, inlined)
+                high_result = results.pop()
+                low_result = results.pop()
+                if low_result == high_result:
+                    result = low_result
+                else:
+                    result = unique.get((v, low_result, high_result))
+                    if result is None:
+                        result = len(var)
+                        var.append(v)
+                        low.append(low_result)
+                        high.append(high_result)
+                        unique[(v, low_result, high_result)] = result
+                cache[u] = result
+            elif u == absorbing or w == absorbing:
+                result = absorbing
+            elif u == neutral or u == w:
+                result = w
+            elif w == neutral:
+                result = u
+            else:
+                key = (u, w) if u < w else (w, u)
+                result = cache.get(key)
+                if result is None:
+                    v = var[u] if var[u] < var[w] else var[w]
+                    u0, u1 = (low[u], high[u]) if var[u] == v else (u, u)
+                    w0, w1 = (low[w], high[w]) if var[w] == v else (w, w)
+                    stack.extend(((key, None, v), (u1, w1, -1), (u0, w0, -1)))
+                    continue
+            results.append(result)
+        return results[0]
+
+    def conjunction(self, u, w):
+        # Intersection of u and w
+        return self.apply(u, w, self._and, 0)
+
+    def disjunction(self, u, w):
+        # Union of u and w
+        return self.apply(u, w, self._or, 1)
+
+    def difference(self, u, w):
+        # Assignments of u which are not in w
+        return self.conjunction(u, self.negate(w))
+
+    def rebuild(self, u, literals, variables):
+        # Rebuilds u, replacing the nodes testing the literals ({variable: value}) by their child for this value, and those testing
+        # the variables (set of int) by the union of their children (see restrict and exists)
+        last = max(list(literals) + list(variables))
+        var, low, high = self.var, self.low, self.high
+        memo = {}
+        results = []
+        stack = [(u, False)]
+        while len(stack) > 0:
+            u, expanded = stack.pop()
+            if expanded == True:
+                high_result = results.pop()
+                low_result = results.pop()
+                result = self.disjunction(low_result, high_result) if var[u] in variables else self.node(var[u], low_result, high_result)
+                memo[u] = result
+            else:
+                while var[u] in literals:
+                    u = high[u] if literals[var[u]] == True else low[u]
+                if var[u] > last:
+                    result = u
+                else:
+                    result = memo.get(u)
+                    if result is None:
+                        stack.extend(((u, True), (high[u], False), (low[u], False)))
+                        continue
+            results.append(result)
+        return results[0]
+
+    def exists(self, u, variables):
+        # Existential quantification of the variables (set of int) in u: assignments which are in u for some value of these variables
+        if len(variables) == 0:
+            return u
+        return self.rebuild(u, {}, variables)
+
+    def restrict(self, u, literals):
+        # Cofactor of u by the literals ({variable: value}): assignments of the other variables which are in u with these values
+        if len(literals) == 0:
+            return u
+        return self.rebuild(u, literals, ())
+
+    ######## Reading the sets
+
+    def count(self, u):
+        # Number of assignments in u (python int, exact whatever the number of variables)
+        return self.paths(u, {}) << self.var[u]
+
+    def paths(self, u, memo):
+        # Number of assignments of the variables var[u], ..., n_vars - 1 in u (memo: dict of the numbers already computed)
+        var, low, high = self.var, self.low, self.high
+        stack = [u]
+        while len(stack) > 0:
+            k = stack[-1]
+            if k < 2 or k in memo:
+                stack.pop()
+            elif (low[k] < 2 or low[k] in memo) and (high[k] < 2 or high[k] in memo):
+                stack.pop()
+                n_low = low[k] if low[k] < 2 else memo[low[k]]
+                n_high = high[k] if high[k] < 2 else memo[high[k]]
+                memo[k] = (n_low << (var[low[k]] - var[k] - 1)) + (n_high << (var[high[k]] - var[k] - 1))
+            else:
+                stack.extend((high[k], low[k]))
+        return u if u < 2 else memo[u]
+
+    def evaluate(self, u, values):
+        # Returns True if the assignment values (sequence of bool, one per variable) is in u
+        while u > 1:
+            u = self.high[u] if values[self.var[u]] else self.low[u]
+        return u == 1
+
+    def sample(self, u, rng):
+        # Draws an assignment of u uniformly (list of bool, one per variable)
+
+        # rng (random.Random): random number generator
+        if u == 0:
+            raise ValueError("cannot draw an element of an empty set")
+        memo = {}
+        values = [rng.random() < 0.5 for v in range(self.n_vars)]
+        while u > 1:
+            low, high = self.low[u], self.high[u]
+            n_low = self.paths(low, memo) << (self.var[low] - self.var[u] - 1)
+            n_high = self.paths(high, memo) << (self.var[high] - self.var[u] - 1)
+            values[self.var[u]] = rng.randrange(n_low + n_high) >= n_low
+            u = high if values[self.var[u]] else low
+        return values
+
+    def size(self, u):
+        # Number of nodes of the diagram u (terminals included)
+        seen = set()
+        stack = [u]
+        while len(stack) > 0:
+            k = stack.pop()
+            if not k in seen:
+                seen.add(k)
+                if k > 1:
+                    stack.extend((self.low[k], self.high[k]))
+        return len(seen)
+
+
+class rr_symbolic():
+    # Rules and constraints of an rr_list compiled into binary decision diagrams (see compile_symbolic)
+
+    # nodes (list of str): names of the nodes, variable i corresponding to nodes[i]
+    # manager (bdd): manager of the diagrams
+    # rules, constraints (lists of tuples): (guard, conditions, effects, changes) of each rule that can be fired somewhere: guard is the set
+    #       of the states in which it can be fired (regardless of the constraints), conditions and effects the values it requires and sets
+    #       ({variable: value}), and changes the states in which it changes the state, restricted by its conditions
+    # constrained (int): set of the states in which a constraint can be fired
+    # init (list of bool): initial state given by nodes_init
+
+    def __init__(self, nodes, manager, rules, constraints, constrained, init):
+        self.nodes = nodes
+        self.positions = {node: i for i, node in enumerate(nodes)}
+        self.manager = manager
+        self.rules = rules
+        self.constraints = constraints
+        self.constrained = constrained
+        self.init = init
+        self._sets = weakref.WeakValueDictionary()       # rr_state_set objects whose diagrams are kept by collect
+
+    def state(self, present):
+        # Returns the set containing a single state
+
+        # present (list of str, list of bool or int): nodes present, value of each node, or state as an integer (bit i for nodes[i])
+        return self.manager.cube(dict(enumerate(self.values(present))))
+
+    def values(self, present):
+        # Returns the value (bool) of each node in a state given as in the state method
+        if isinstance(present, int):
+            return [bool(present >> i & 1) for i in range(len(self.nodes))]
+        present = list(present)
+        if len(present) == len(self.nodes) and all(isinstance(value, bool) for value in present):
+            return present
+        values = [False]*len(self.nodes)
+        for node in present:
+            if not str(node) in self.positions:
+                raise ValueError("node {0} not defined !".format(node))
+            values[self.positions[str(node)]] = True
+        return values
+
+    def fire(self, states, rule):
+        # Returns the diagram of the states obtained by firing a rule (tuple of self.rules or self.constraints) from the states (diagram)
+        # in which its conditions hold, regardless of the constraints
+        manager = self.manager
+        guard, conditions, effects, changes = rule
+        # states in which the rule can be fired, without its conditions, and without its effects once fired
+        fired = manager.conjunction(manager.restrict(states, conditions), changes)
+        if fired == 0:
+            return 0
+        fired = manager.exists(fired, [v for v in effects if not v in conditions])
+        target = dict(conditions)
+        target.update(effects)
+        return manager.conjunction(fired, manager.cube(target))
+
+    def image(self, states):
+        # Returns the set of the states obtained by firing one rule or constraint from one of the states (rr_state_set)
+        manager = self.manager
+        successors = 0
+        free = manager.difference(states.bdd, self.constrained)
+        for sources, rules in ((states.bdd, self.constraints), (free, self.rules)):
+            for rule in rules:
+                successors = manager.disjunction(successors, self.fire(sources, rule))
+        return rr_state_set(self, successors)
+
+    def collect(self, roots = []):
+        # Deletes the nodes of the diagrams which are not used by the compiled rules, the existing rr_state_set objects or the diagrams
+        # roots (list of int). Returns the new numbers of the diagrams roots
+        manager = self.manager
+        sets = list(self._sets.values())
+        rule_roots = [diagram for rule in self.constraints + self.rules for diagram in (rule[0], rule[3])]
+        mapping = manager.collect(roots + rule_roots + [self.constrained] + [states.bdd for states in sets])
+        self.rules = [(mapping[guard], conditions, effects, mapping[changes]) for guard, conditions, effects, changes in self.rules]
+        self.constraints = [(mapping[guard], conditions, effects, mapping[changes]) for guard, conditions, effects, changes in self.constraints]
+        self.constrained = mapping[self.constrained]
+        for states in sets:
+            states.bdd = mapping[states.bdd]
+        return [mapping[root] for root in roots]
+
+    @stats_timed("symbolic_reachable")
+    def reachable(self, init = None):
+        # Computes the set of the states reachable from the initial states (fixpoint by chaining, see above)
+
+        # init (list of str, int, or rr_state_set, optionnal): nodes initially present, initial state, or set of initial states.
+        #       By default, given by nodes_init
+        # Returns a rr_state_set object, whose attribute passes is the number of passes over the rules
+        manager = self.manager
+        if init is None:
+            init = self.init
+        reached = init.bdd if isinstance(init, rr_state_set) else self.state(init)
+        passes = 0
+        previous = None
+        limit = COLLECT_SIZE
+        while reached != previous:
+            previous = reached
+            for k in range(len(self.constraints) + len(self.rules)):
+                # the rules are read at each step, as collect renumbers their diagrams
+                if k < len(self.constraints):
+                    sources, rule = reached, self.constraints[k]
+                else:
+                    sources, rule = manager.difference(reached, self.constrained), self.rules[k - len(self.constraints)]
+                reached = manager.disjunction(reached, self.fire(sources, rule))
+                if len(manager) > limit:
+                    reached, previous = self.collect([reached, previous])
+                    limit = max(COLLECT_SIZE, 2*len(manager))
+            passes += 1
+            stats_count("symbolic_passes")
+        return rr_state_set(self, reached, passes = passes)
+
+    def universe(self):
+        # Returns the state universe, i.e. the states of the nodes reached by the universe file (see rr_list.write_universe_file). In this
+        # file, all the nodes are initially absent and the "i" node present, and all the rules and constraints require "i-": the "i+ >> X+"
+        # rules build any combination of the nodes before "i+ >> i-" is fired. The universe is therefore always the set of all the 2^n
+        # states, which is returned directly (see reachable for the states reachable from given initial states).
+        return rr_state_set(self, 1)
+
+    def stable(self):
+        # Returns the set of the states in which no rule nor constraint can be fired
+        manager = self.manager
+        fired = self.constrained
+        for guard, conditions, effects, changes in self.rules:
+            fired = manager.disjunction(fired, guard)
+        return rr_state_set(self, manager.negate(fired))
+
+
+class rr_state_set():
+    # Set of states of a rr_symbolic system, represented by a binary decision diagram (the states are never listed)
+
+    # system (rr_symbolic): system whose nodes give the variables
+    # bdd (int): diagram of the set, in system.manager (renumbered when the unused nodes are deleted, see rr_symbolic.collect)
+    # passes (int): number of passes over the rules needed to compute the set (see rr_symbolic.reachable)
+
+    def __init__(self, system, bdd, passes = 0):
+        self.system = system
+        self.nodes = system.nodes
+        self.bdd = bdd
+        self.passes = passes
+        system._sets[id(self)] = self
+
+    def count(self):
+        # Number of states of the set (python int, which can be larger than 2^64)
+        return self.system.manager.count(self.bdd)
+
+    def __contains__(self, state):
+        # state (list of str, list of bool or int): see rr_symbolic.state
+        return self.system.manager.evaluate(self.bdd, self.system.values(state))
+
+    def __eq__(self, other):
+        return isinstance(other, rr_state_set) and other.system is self.system and other.bdd == self.bdd
+
+    def __and__(self, other):
+        return rr_state_set(self.system, self.system.manager.conjunction(self.bdd, other.bdd))
+
+    def __or__(self, other):
+        return rr_state_set(self.system, self.system.manager.disjunction(self.bdd, other.bdd))
+
+    def __sub__(self, other):
+        return rr_state_set(self.system, self.system.manager.difference(self.bdd, other.bdd))
+
+    def present(self, values):
+        # Returns the list of the nodes present in a state given as a list of bool
+        return [node for node, value in zip(self.nodes, values) if value]
+
+    def sample(self, n = 1, seed = None):
+        # Draws n states of the set uniformly (with replacement), and returns the list of their present nodes
+
+        # seed (int, optionnal): seed of the random number generator
+        rng = random.Random(seed)
+        return [self.present(self.system.manager.sample(self.bdd, rng)) for k in range(n)]
+
+    def size(self):
+        # Number of nodes of the diagram of the set
+        return self.system.manager.size(self.bdd)
+
+
+# Number of nodes above which the unused nodes are deleted during a fixpoint (about 300 bytes per node, caches included)
+COLLECT_SIZE = 1 << 20
+
+
+def compile_symbolic(rr):
+    # Compiles the rules and constraints of an rr_list into binary decision diagrams (returns a rr_symbolic object)
+    nodes = [str(node) for node in rr.nodes]
+    positions = {node: i for i, node in enumerate(nodes)}
+    if len(positions) != len(nodes):
+        raise ValueError("some nodes are defined several times")
+    manager = bdd(len(nodes))
+
+    compiled = []
+    for rule_list in (rr.constraints, rr.rules):
+        names = rule_list.names.names
+        guards = []
+        for rule in rule_list.iter_rules():
+            if type(rule) == str:
+                raise ValueError("the rule '{0}' could not be interpreted".format(rule))
+            sides = [{}, {}]
+            for side, ids, signs in ((0, rule.lhs, rule.lhs_signs), (1, rule.rhs, rule.rhs_signs)):
+                for name_id, sign in zip(ids, signs):
+                    name = names[name_id]
+                    if not name in positions:
+                        raise ValueError("node {0} is used in the rules but not defined !".format(name))
+                    if sides[side].setdefault(positions[name], sign == "+") != (sign == "+"):
+                        # contradictory conditions can never hold, and a node set both present and absent is absent (as in rr_states)
+                        sides[side][positions[name]] = None if side == 0 else False
+            conditions, effects = sides
+            if None in conditions.values():
+                continue
+            # the rule has to change the value of one of its effects
+            changes = 0
+            for v, value in effects.items():
+                changes = manager.disjunction(changes, manager.literal(v, not value))
+            changes = manager.restrict(changes, conditions)
+            if changes != 0:
+                guards.append((manager.conjunction(manager.cube(conditions), changes), conditions, effects, changes))
+        compiled.append(guards)
+
+    # The rules can only be fired in the states where no constraint can be fired
+    constrained = 0
+    for guard, conditions, effects, changes in compiled[0]:
+        constrained = manager.disjunction(constrained, guard)
+
+    # Initial state, with the same conventions as write_file
+    nodes_init = list(rr.nodes_init)
+    if not len(nodes_init) == len(nodes):
+        warn("initialization of the nodes is incorrect, as the number of nodes is not equal to the number of initial values. All nodes have been initialized to 1.")
+        nodes_init = [1]*len(nodes)
+    init = [value in (1, "+", True) for value in nodes_init]
+
+    return rr_symbolic(nodes, manager, compiled[1], compiled[0], constrained, init)
@@ -0,0 +1,252 @@
+import struct
+import zipfile
+import numpy as np
+if __package__:
+    from .utils import *
+    from .rr_stats import *
+else:
+    from utils import *
+    from rr_stats import *
+
+########### Compiled (binary) form of an rr_list #############
+
+# The rules and constraints are stored as numpy arrays in an uncompressed .npz file (extension .rr.npz), whose arrays can be
+# mapped in memory instead of being read, so that an analysis can load a system with hundreds of thousands of rules in a few
+# milliseconds. The names are kept in two tables, as in rr_rules.py: "names" (names of the nodes, referred to by their id)
+# and "labels" (tags, comments and rule strings that could not be encoded), each stored as its utf-8 bytes ("*_data") and
+# the offsets of the strings in them ("*_offsets"). The arrays are:
+#       nodes (int32): ids of the nodes of rr_list.nodes, in their order ; nodes_init (int8): 1 if present, 0 if absent
+# and, for kind = "rules" and "constraints", the sign matrices of the preconditions (side = "pre") and effects ("eff"), in
+# sparse row form (one row per rule, one column per name), in which the nodes keep the order in which they are written:
+#       {kind}_{side}_indptr (int64): the entries of rule r are those from indptr[r] to indptr[r+1]
+#       {kind}_{side}_nodes (int32): id of the node of each entry ; {kind}_{side}_signs (int8): its sign (1 or -1)
+#       {kind}_tags, {kind}_comments (int32): label ids of the tag and comment of each rule (-1 if none)
+#       {kind}_strings (int32): label id of the rules that could not be encoded (-1 for the others, whose string is rebuilt). Those
+#       which are rules written with another spacing also have their preconditions, effects, tag and comment (see rr_rule_list.interpret)
+# Writing a system read from a compiled file with write_file gives exactly the file that write_file gives for the original one.
+
+# Version of the format, stored in the file
+COMPILED_VERSION = 1
+
+KINDS = ("rules", "constraints")
+
+
+def compiled_filename(filename, folder = ""):
+    # Returns the complete name of a compiled file (filename without extension, folder as in rr_io.rr_filename)
+    return folder + filename + ".rr.npz"
+
+
+def pack_strings(strings):
+    # Returns (data, offsets): the utf-8 bytes of the strings one after the other (uint8 array) and the offset of each one (int64)
+    encoded = [string.encode("utf-8") for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype = np.int64)
+    np.cumsum([len(string) for string in encoded], out = offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype = np.uint8), offsets
+
+
+def unpack_strings(data, offsets):
+    # Inverse of pack_strings
+    raw = data.tobytes()
+    bounds = offsets.tolist()
+    return [raw[start:end].decode("utf-8") for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+class rr_compiled():
+    # Rules and constraints of an rr_list stored as numpy arrays (see above), possibly mapped in memory
+
+    # arrays (dict of numpy arrays): arrays of the compiled file
+    # names, labels (list of str): tables of the names and labels
+    # nodes (list of str): names of the nodes ; nodes_init (list of int): their initial states (1 or 0)
+
+    def __init__(self, arrays):
+        version = int(arrays["version"][0]) if "version" in arrays else None
+        if version != COMPILED_VERSION:
+            raise ValueError("compiled rr files of version {0} cannot be read (version {1} expected)".format(version, COMPILED_VERSION))
+        self.arrays = arrays
+        self.names = unpack_strings(arrays["names_data"], arrays["names_offsets"])
+        self.labels = unpack_strings(arrays["labels_data"], arrays["labels_offsets"])
+        self.nodes = [self.names[i] for i in arrays["nodes"].tolist()]
+        self.nodes_init = arrays["nodes_init"].tolist()
+
+    def __len__(self):
+        # Number of rules and constraints
+        return sum(len(self.arrays[kind + "_tags"]) for kind in KINDS)
+
+    def sign_matrix(self, kind = "rules", side = "pre"):
+        # Returns the dense sign matrix (int8, one row per rule and one column per name, 1 for "+", -1 for "-" and 0 elsewhere)
+        # of the preconditions (side = "pre") or effects ("eff") of the rules or constraints (kind). A node written twice keeps its last sign.
+        if not kind in KINDS or not side in ("pre", "eff"):
+            raise ValueError("kind has to be one of {0} and side 'pre' or 'eff'".format(KINDS))
+        indptr = self.arrays["{0}_{1}_indptr".format(kind, side)]
+        matrix = np.zeros((len(indptr) - 1, len(self.names)), dtype = np.int8)
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        matrix[rows, self.arrays["{0}_{1}_nodes".format(kind, side)]] = self.arrays["{0}_{1}_signs".format(kind, side)]
+        return matrix
+
+    def packed(self, kind):
+        # Returns the codes of the rules of kind, as rr_rules.rr_rule_list.packed, and their typecode ("H" if they fit
+        # in 16 bits, "I" otherwise), to be added with extend_packed
+        tags = self.arrays[kind + "_tags"]
+        comments = self.arrays[kind + "_comments"]
+        strings = self.arrays[kind + "_strings"]
+        n_rules = len(tags)
+        encoded = strings < 0
+        n_pre = np.diff(self.arrays[kind + "_pre_indptr"])
+        n_eff = np.diff(self.arrays[kind + "_eff_indptr"])
+        lengths = np.where(encoded, n_pre + n_eff + 3, 2)
+        starts = np.zeros(n_rules + 1, dtype = np.int64)
+        np.cumsum(lengths, out = starts[1:])
+        codes = np.zeros(starts[-1], dtype = np.uint32)
+        # (number of inputs, inputs, outputs, tag id + 1, comment id + 1), or (0, label id) for the rules that could not be encoded
+        codes[starts[:-1]] = np.where(encoded, n_pre, 0)
+        for side, first in (("pre", starts[:-1] + 1), ("eff", starts[:-1] + 1 + n_pre)):
+            indptr = self.arrays["{0}_{1}_indptr".format(kind, side)]
+            rows = np.repeat(np.arange(n_rules), np.diff(indptr))
+            positions = first[rows] + np.arange(indptr[-1]) - indptr[rows]
+            # the interpreted rules keep their string
+            selected = encoded[rows]
+            codes[positions[selected]] = (2*self.arrays["{0}_{1}_nodes".format(kind, side)] + (self.arrays["{0}_{1}_signs".format(kind, side)] > 0))[selected]
+        ends = starts[1:]
+        codes[ends[encoded] - 2] = tags[encoded] + 1
+        codes[ends[encoded] - 1] = comments[encoded] + 1
+        codes[starts[:-1][~encoded] + 1] = strings[~encoded]
+        if len(codes) == 0 or codes.max() < 1 << 16:
+            return codes.astype(np.uint16).tobytes(), lengths.astype(np.uint32).tobytes(), "H"
+        return codes.tobytes(), lengths.astype(np.uint32).tobytes(), "I"
+
+    def to_rr(self, cls = None):
+        # Returns the rr_list (or object of the subclass cls) described by the arrays
+        if cls is None:
+            cls = import_sibling("rr_list").rr_list
+        rr_out = cls()
+        # the tables are filled first, so that the ids of the names are those of the arrays
+        for name in self.names:
+            rr_out._names.get_id(name)
+        for label in self.labels:
+            rr_out._labels.get_id(label)
+        if len(rr_out._names) != len(self.names) or len(rr_out._labels) != len(self.labels):
+            raise ValueError("the names or labels of the compiled file are not distinct")
+        rr_out.nodes = self.nodes
+        rr_out.nodes_init = self.nodes_init
+        rr_out.rules.extend_packed(*self.packed("rules"))
+        rr_out.constraints.extend_packed(*self.packed("constraints"))
+        return rr_out
+
+    def word_masks(self):
+        # Returns the rules and constraints as masks of uint64 words (rr_states.rr_word_masks), without building the rr_list
+        rr_states = import_sibling("rr_states")
+        positions = np.full(len(self.names), -1, dtype = np.int64)
+        positions[self.arrays["nodes"]] = np.arange(len(self.nodes))
+        n_words = max(1, (len(self.nodes) + 63) // 64)
+        compiled = []
+        for kind in KINDS:
+            strings = self.arrays[kind + "_strings"]
+            # the rules which could not be interpreted have no effects
+            uninterpreted = (strings >= 0) & (np.diff(self.arrays[kind + "_eff_indptr"]) == 0)
+            if uninterpreted.any():
+                raise ValueError("the rule '{0}' could not be interpreted".format(self.labels[strings[uninterpreted][0]]))
+            masks = {}
+            for side in ("pre", "eff"):
+                indptr = self.arrays["{0}_{1}_indptr".format(kind, side)]
+                nodes = self.arrays["{0}_{1}_nodes".format(kind, side)]
+                columns = positions[nodes]
+                if (columns < 0).any():
+                    raise ValueError("node {0} is used in the rules but not defined !".format(self.names[nodes[columns < 0][0]]))
+                rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+                bits = np.left_shift(np.uint64(1), (columns % 64).astype(np.uint64))
+                positive = self.arrays["{0}_{1}_signs".format(kind, side)] > 0
+                for key, selected in (("_on", positive), ("_off", ~positive)):
+                    mask = np.zeros((len(indptr) - 1, n_words), dtype = np.uint64)
+                    np.bitwise_or.at(mask, (rows[selected], columns[selected] // 64), bits[selected])
+                    masks[side + key] = mask
+            compiled.append(masks)
+        compiled_rr = rr_states.rr_word_masks(self.nodes, compiled[0], compiled[1], None)
+        compiled_rr.init = compiled_rr.state([node for node, value in zip(self.nodes, self.nodes_init) if value == 1])
+        return compiled_rr
+
+    def save(self, complete_filename):
+        # Writes the arrays in an uncompressed .npz file (which can be mapped in memory by load_compiled)
+        with open(complete_filename, "wb") as f:
+            np.savez(f, **self.arrays)
+
+
+def compile_rr(rr):
+    # Returns the rr_compiled object of an rr_list
+    arrays = {"version": np.array([COMPILED_VERSION], dtype = np.int32)}
+    for kind, rule_list in zip(KINDS, (rr.rules, rr.constraints)):
+        packed_codes, packed_lengths = rule_list.packed()
+        codes = np.frombuffer(packed_codes, dtype = np.uint32).astype(np.int64)
+        lengths = np.frombuffer(packed_lengths, dtype = np.uint32).astype(np.int64)
+        starts = np.zeros(len(lengths) + 1, dtype = np.int64)
+        np.cumsum(lengths, out = starts[1:])
+        strings = np.where(codes[starts[:-1]] > 0, -1, codes[np.minimum(starts[:-1] + 1, len(codes) - 1)])
+        if (strings >= 0).any():
+            # rules written with another spacing: their preconditions and effects are those of their interpretation
+            packed_codes, packed_lengths = rule_list.packed(interpret = True)
+            codes = np.frombuffer(packed_codes, dtype = np.uint32).astype(np.int64)
+            lengths = np.frombuffer(packed_lengths, dtype = np.uint32).astype(np.int64)
+        n_rules = len(lengths)
+        starts = np.zeros(n_rules + 1, dtype = np.int64)
+        np.cumsum(lengths, out = starts[1:])
+        ends = starts[1:]
+        starts = starts[:-1]
+        n_lhs = codes[starts]
+        encoded = n_lhs > 0
+        # position of each code in its rule
+        rows = np.repeat(np.arange(n_rules), lengths)
+        positions = np.arange(len(codes)) - starts[rows]
+        sides = {"pre": (positions >= 1) & (positions <= n_lhs[rows]),
+                 "eff": encoded[rows] & (positions > n_lhs[rows]) & (positions < lengths[rows] - 2)}
+        for side, selected in sides.items():
+            arrays["{0}_{1}_indptr".format(kind, side)] = np.concatenate([[0], np.cumsum(np.bincount(rows[selected], minlength = n_rules))]).astype(np.int64)
+            arrays["{0}_{1}_nodes".format(kind, side)] = (codes[selected] >> 1).astype(np.int32)
+            arrays["{0}_{1}_signs".format(kind, side)] = np.where(codes[selected] & 1, 1, -1).astype(np.int8)
+        arrays[kind + "_tags"] = np.where(encoded, codes[ends - 2] - 1, -1).astype(np.int32)
+        arrays[kind + "_comments"] = np.where(encoded, codes[ends - 1] - 1, -1).astype(np.int32)
+        arrays[kind + "_strings"] = strings.astype(np.int32)
+
+    # (after the interpretation of the rules, which may add names and labels)
+    names = list(rr._names.names)
+    ids = dict(rr._names.ids)
+    # the nodes which are not used by the rules are added to the table of names
+    for node in rr.nodes:
+        if not str(node) in ids:
+            ids[str(node)] = len(names)
+            names.append(str(node))
+    arrays["names_data"], arrays["names_offsets"] = pack_strings(names)
+    arrays["labels_data"], arrays["labels_offsets"] = pack_strings(rr._labels.names)
+    arrays["nodes"] = np.array([ids[str(node)] for node in rr.nodes], dtype = np.int32)
+    arrays["nodes_init"] = np.array([1 if value in (1, "+", True) else 0 for value in rr.nodes_init], dtype = np.int8)
+    return rr_compiled(arrays)
+
+
+def load_compiled(complete_filename, mmap = True):
+    # Reads a compiled file. If mmap is True, the arrays are mapped in memory (read only) instead of being read,
+    # which is possible as long as the file is not compressed. Returns a rr_compiled object
+    arrays = {}
+    with open(complete_filename, "rb") as f, zipfile.ZipFile(f) as archive:
+        for info in archive.infolist():
+            if not info.filename.endswith(".npy"):
+                continue
+            key = info.filename[:-4]
+            if mmap == True and info.compress_type == zipfile.ZIP_STORED:
+                # the data of a stored member follows its local header (30 bytes, then its name and extra field)
+                f.seek(info.header_offset)
+                header = f.read(30)
+                name_length, extra_length = struct.unpack("<HH", header[26:30])
+                f.seek(info.header_offset + 30 + name_length + extra_length)
+                version = np.lib.format.read_magic(f)
+                if version in ((1, 0), (2, 0)):
+                    read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+                    shape, fortran_order, dtype = read_header(f)
+                    if dtype.hasobject:
+                        raise ValueError("the compiled file '{0}' contains python objects".format(complete_filename))
+                    if np.prod(shape) == 0:
+                        arrays[key] = np.zeros(shape, dtype = dtype)
+                    else:
+                        arrays[key] = np.memmap(complete_filename, dtype = dtype, mode = "r", offset = f.tell(), shape = shape,
+                                                order = "F" if fortran_order else "C")
+                    continue
+            with archive.open(info) as member:
+                arrays[key] = np.lib.format.read_array(member, allow_pickle = False)
+    return rr_compiled(arrays)
@@ -0,0 +1,214 @@
+import io
+import os
+import multiprocessing
+import tarfile
+import zipfile
+import numpy as np
+if __package__:
+    from .rr_network import *
+    from .rr_io import *
+else:
+    from rr_network import *
+    from rr_io import *
+
+########### Random ensembles of food webs #############
+
+# Structural models generating random food webs, and translation of many replicates of a model.
+# Each replicate k is generated from its own random generator, derived from the seed of the ensemble
+# (numpy SeedSequence(seed).spawn), so that it does not depend on the number of processes used.
+
+# Kinds of links drawn by the trophic levels model (as in the tutorial)
+TROPHIC_KINDS = ["predation", "secondary_predation", None]
+
+
+def trophic_levels_model(rng, levels = [1, 2, 3], kinds = TROPHIC_KINDS, autotroph = 0.4):
+    # Random assignment of the links between trophic levels, as in the tutorial: each species can eat each species of the lower levels,
+    # the kind of each link being chosen uniformly in kinds (None: no link)
+
+    # rng (numpy Generator): random generator
+    # levels (list of int): number of species of each level, from the top level to the basal one
+    # kinds (list of str or None): kinds of links among which each link is drawn
+    # autotroph (float): probability for each species of the level just above the basal one to be autotroph
+    # Returns (nodes, sources, targets, kinds, features): list of names, arrays of the links (positions in nodes), and dict {node: feature}
+    level = np.repeat(np.arange(len(levels)), levels)
+    nodes = ["sp{0}".format(i) for i in range(len(level))]
+    sources, targets = np.nonzero(level[:, None] < level[None, :])
+    drawn = rng.integers(0, len(kinds), size = len(sources))
+    kept = np.array([kind is not None for kind in kinds])[drawn]
+    link_kinds = np.array([str(kind) for kind in kinds], dtype = object)[drawn[kept]]
+    features = {}
+    if len(levels) >= 2:
+        candidates = np.flatnonzero(level == len(levels) - 2)
+        for i in candidates[rng.random(len(candidates)) < autotroph].tolist():
+            features[nodes[i]] = "autotroph"
+    return nodes, sources[kept], targets[kept], link_kinds, features
+
+
+def cascade_model(rng, n_species = 20, connectance = 0.1, secondary = 0.0, autotroph = 0.0):
+    # Cascade model (Cohen & Newman): the species are ranked, and each species eats each species of lower rank with probability 2*C*S/(S-1)
+
+    # rng (numpy Generator): random generator
+    # n_species (int): number of species S
+    # connectance (float): expected connectance C (number of links / S^2)
+    # secondary (float): probability for each link to be a secondary predation
+    # autotroph (float): probability for each species having preys to be autotroph
+    # Returns (nodes, sources, targets, kinds, features), as trophic_levels_model
+    p = min(1.0, 2*connectance*n_species/(n_species - 1)) if n_species > 1 else 0.0
+    targets, sources = np.triu_indices(n_species, k = 1)        # source (predator) of higher rank than target
+    kept = rng.random(len(sources)) < p
+    return finish_model(rng, n_species, sources[kept], targets[kept], secondary, autotroph)
+
+
+def niche_model(rng, n_species = 20, connectance = 0.1, secondary = 0.0, autotroph = 0.0):
+    # Niche model (Williams & Martinez): each species i has a niche value n_i, and eats the species whose niche values are in a
+    # range of width r_i = n_i * x (x following a Beta(1, 1/(2C) - 1) distribution) centered on c_i, uniform in [r_i/2, n_i].
+    # The species of lowest niche value has no preys, and the species do not eat themselves.
+
+    # rng (numpy Generator): random generator
+    # n_species, connectance, secondary, autotroph: see cascade_model
+    # Returns (nodes, sources, targets, kinds, features), as trophic_levels_model
+    niche = np.sort(rng.random(n_species))
+    width = niche*rng.beta(1, 1/(2*connectance) - 1, size = n_species)
+    if n_species > 0:
+        width[0] = 0
+    center = rng.uniform(width/2, niche)
+    # the preys of i are the species between positions start[i] and stop[i] in the niche order (memory proportional to the number of links)
+    start = np.searchsorted(niche, center - width/2, side = "left")
+    stop = np.searchsorted(niche, center + width/2, side = "right")
+    counts = stop - start
+    sources = np.repeat(np.arange(n_species), counts)
+    targets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(start, counts)
+    kept = sources != targets
+    return finish_model(rng, n_species, sources[kept], targets[kept], secondary, autotroph)
+
+
+def finish_model(rng, n_species, sources, targets, secondary, autotroph):
+    # Draws the kinds of links and the autotroph species of cascade_model and niche_model
+    nodes = ["sp{0}".format(i) for i in range(n_species)]
+    kinds = np.where(rng.random(len(sources)) < secondary, "secondary_predation", "predation").astype(object)
+    predators = np.unique(sources)
+    features = {nodes[i]: "autotroph" for i in predators[rng.random(len(predators)) < autotroph].tolist()}
+    return nodes, sources, targets, kinds, features
+
+
+# Models available by name in random_network and write_ensemble
+MODELS = {"trophic_levels": trophic_levels_model, "cascade": cascade_model, "niche": niche_model}
+
+
+def random_network(model = "trophic_levels", seed = None, presence = 1.0, **parameters):
+    # Generates a random rr_network from a structural model
+
+    # model (str or function): name of the model (see MODELS), or function with the same arguments and outputs as the models
+    # seed (int, numpy SeedSequence or Generator, optionnal): seed of the random generator
+    # presence (float): probability for each species to be initially present
+    # the other arguments are passed to the model (e.g. n_species, connectance)
+    if type(model) == str:
+        if not model in MODELS:
+            raise ValueError("Unknown model '{0}' (has to be one of {1})".format(model, list(MODELS)))
+        model = MODELS[model]
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    nodes, sources, targets, kinds, features = model(rng, **parameters)
+    net = rr_network()
+    net.add_nodes_from(nodes)
+    net.add_edges_from((nodes[source], nodes[target], {"kind": kind})
+                       for source, target, kind in zip(sources.tolist(), targets.tolist(), kinds.tolist()))
+    for node, feature in features.items():
+        net.nodes[node]["feature"] = feature
+    net.initialize_nodes(values = rng.random(len(nodes)) < presence)
+    return net
+
+
+########### Ensembles #############
+
+def ensemble_seeds(seed, n_replicates):
+    # Returns the seeds (numpy SeedSequence) of the replicates of an ensemble
+    return np.random.SeedSequence(seed).spawn(n_replicates)
+
+
+def ensemble_archive(output):
+    # Returns "tar", "zip" or None (directory) depending on the name of the output of write_ensemble
+    if output.endswith((".tar", ".tar.gz", ".tgz", ".tar.xz")):
+        return "tar"
+    elif output.endswith(".zip"):
+        return "zip"
+    return None
+
+
+def write_ensemble(output, n_replicates, model = "trophic_levels", seed = 0, processes = None, prefix = "replicate", universe = False,
+                   compression = None, presence = 1.0, translation = {}, sure = "?", **parameters):
+    # Generates and translates many replicates of a random model, writing their .rr files in a folder or in a single archive
+
+    # output (str): folder in which the files are written, or name of a .tar (.tar.gz, .tgz, .tar.xz) or .zip archive
+    # n_replicates (int): number of replicates
+    # model (str or function): structural model (see random_network)
+    # seed (int): seed of the ensemble ; replicate k only depends on the seed and k, whatever the number of processes
+    # processes (int, optionnal): number of processes generating and translating the replicates (by default, the number of CPUs)
+    # prefix (str): the file of replicate k is named prefix_k.rr (k with at least 5 digits)
+    # universe (bool): if True, the files allowing to compute the state universe are written
+    # compression (None, "gzip" or "xz"): compression of each file (folder output only)
+    # presence (float): probability for each species to be initially present
+    # translation (dict): options of create_rr (allow_appearance, strong_dependance, appearance_options)
+    # sure (str, "y" or "n"): policy if the folder files or the archive already exist (see write_rr_file)
+    # the other arguments are passed to the model (e.g. n_species, connectance)
+    # Returns the list of the names of the files (paths in the folder or names in the archive), in the order of the replicates
+    archive = ensemble_archive(output)
+    if archive is not None and compression is not None:
+        raise ValueError("compression of the files is only possible when writing in a folder (use e.g. a .tar.gz archive)")
+    tasks = [(k, seed_k, model, presence, parameters, translation, prefix, universe, compression, None if archive else output)
+             for k, seed_k in enumerate(ensemble_seeds(seed, n_replicates))]
+
+    if archive is None:
+        if len(output) > 0 and not output.endswith(os.sep):
+            output += os.sep
+        os.makedirs(output, exist_ok = True)
+        for k in range(n_replicates):
+            check_overwrite(rr_filename(replicate_name(prefix, k), folder = output, universe = universe, compression = compression), sure = sure)
+        tasks = [task[:-1] + (output,) for task in tasks]
+    else:
+        check_overwrite(output, sure = sure)
+
+    processes = os.cpu_count() if processes is None else processes
+    pool = multiprocessing.get_context().Pool(min(processes, n_replicates)) if processes > 1 and n_replicates > 1 else None
+    try:
+        results = pool.imap(ensemble_replicate, tasks) if pool is not None else map(ensemble_replicate, tasks)
+        if archive is None:
+            return list(results)
+        names = []
+        if archive == "tar":
+            mode = {".gz": "w:gz", "tgz": "w:gz", ".xz": "w:xz"}.get(output[-3:], "w")
+            with tarfile.open(output, mode) as f:
+                for name, content in results:        # written as they are produced, in the order of the replicates
+                    info = tarfile.TarInfo(name)
+                    info.size = len(content)
+                    f.addfile(info, io.BytesIO(content))
+                    names.append(name)
+        else:
+            with zipfile.ZipFile(output, "w", compression = zipfile.ZIP_DEFLATED) as f:
+                for name, content in results:
+                    f.writestr(name, content)
+                    names.append(name)
+        return names
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def replicate_name(prefix, k):
+    return "{0}_{1:05d}".format(prefix, k)
+
+
+def ensemble_replicate(task):
+    # Generates and translates a replicate of write_ensemble. Writes the file in the folder if one is given (and returns its name),
+    # or returns (name, content of the file as bytes)
+    k, seed, model, presence, parameters, translation, prefix, universe, compression, folder = task
+    net = random_network(model, seed = np.random.default_rng(seed), presence = presence, **parameters)
+    if folder is not None:
+        net.write_rr_file(replicate_name(prefix, k), folder = folder, sure = "y", universe = universe, compression = compression, **translation)
+        return rr_filename(replicate_name(prefix, k), folder = folder, universe = universe, compression = compression)
+    rr_out = net.create_rr(**translation)
+    if universe == False and not len(rr_out.nodes_init) == len(rr_out.nodes):
+        rr_out.nodes_init = np.ones(len(rr_out.nodes))
+    f = io.StringIO()
+    write_rr(f, rr_out.nodes, rr_out.nodes_init, rr_out.rules, rr_out.constraints, universe = universe)
+    return rr_filename(replicate_name(prefix, k), universe = universe), f.getvalue().encode()
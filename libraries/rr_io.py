@@ -0,0 +1,168 @@
+import gzip
+import lzma
+import os.path
+from re import split
+if __package__:
+    from .rr_stats import *
+else:
+    from rr_stats import *
+
+########### Reading and writing of the .rr files #############
+
+# Extensions added to the .rr files depending on the compression
+COMPRESSIONS = {None: "", "gzip": ".gz", "xz": ".xz"}
+
+# Number of lines gathered before each write
+CHUNK_SIZE = 10000
+
+
+def rr_filename(filename, folder = "", universe = False, compression = None):
+    # Returns the complete name of a .rr file
+
+    # filename (str): name of the file (without the .rr extension)
+    # folder (str, optionnal): path of the file
+    # universe (bool): if True, the suffix "_universe" is added to the name
+    # compression (None, "gzip" or "xz"): compression of the file (the .gz or .xz extension is added)
+    if not compression in COMPRESSIONS:
+        raise ValueError("Unknown compression '{0}' (has to be one of {1})".format(compression, list(COMPRESSIONS)))
+    return folder + filename + ("_universe" if universe == True else "") + ".rr" + COMPRESSIONS[compression]
+
+
+def check_overwrite(complete_filename, sure = "?"):
+    # Checks whether a file can be written, asking the user if it already exists
+
+    # sure (str, "y" or "n"): if "y", existing files are overridden without asking.
+    #                         if "n", raises a ValueError if the file already exists.
+    if os.path.isfile(complete_filename):
+        while not sure in ["y", "Y", "n", "N"]:
+            sure = input("the rr file '{0}' already exists. Are you sure that you want to override it? (y/n) \n".format(complete_filename))
+
+        if sure in["n","N"]:
+            raise ValueError("the rr file '{0}' already exists and you asked not to override it".format(complete_filename))
+
+
+def open_rr(complete_filename, mode = "r"):
+    # Opens a .rr file in text mode, compressed or not depending on its extension (.gz or .xz)
+    if complete_filename.endswith(".gz"):
+        return gzip.open(complete_filename, mode + "t")
+    elif complete_filename.endswith(".xz"):
+        return lzma.open(complete_filename, mode + "t")
+    return open(complete_filename, mode, buffering = 1 << 20)
+
+
+def universe_rule(rule):
+    # Adds the "i-" condition to a rule of the universe file (after its tag if it has one)
+    if "]" in rule:         # Tests whether rules have a name, in order to insert the "i-" condition after it
+        temp_string = split(r"\] ", rule)
+        return temp_string[0]+"] i-, "+temp_string[1]
+    return " i-," + rule
+
+
+def write_rr(f, nodes, nodes_init, rules, constraints = [], universe = False):
+    # Writes a .rr file in the opened file f, writing the lines by chunks
+
+    # nodes (list of str): names of the nodes
+    # nodes_init (list): initial states of the nodes (1, "+" or True if present ; 0, "-" or False if absent)
+    # rules (iterable of str): rules, which may be generated on the fly
+    # constraints (iterable of str): constraints. They are only read once all the rules have been written
+    #                                (they can therefore be collected while the rules are generated)
+    # universe (bool): if True, writes the file allowing to compute the state universe (nodes_init is then ignored)
+    # Returns the number of characters written
+
+    # Write nodes list and initial states
+    written = 0
+    n_rules = 0
+    lines = ["nodes:\n"]
+    if universe == True:
+        for node in nodes:
+            lines.append(" "+ node +"- :\n")
+        lines.append(" i+ :\n")
+    else:
+        for node, init in zip(nodes, nodes_init):
+            if init in (1, "+", True): # node initially present
+                lines.append(" "+ node +"+ :\n")
+            elif init in (0, "-", False): # node initially absent
+                lines.append(" "+node +"- :\n")
+            else:
+                print("node {0} was not initialized properly and was set as initially inactive".format(node))
+                lines.append(" "+node +"- :\n")
+            if len(lines) >= CHUNK_SIZE:
+                written += f.write("".join(lines))
+                lines = []
+    lines.append("\n")
+
+    # Write rules and constraints:
+    lines.append("rules:\n")
+    for rule in rules:
+        lines.append((universe_rule(rule) if universe == True else rule) + "\n")
+        n_rules += 1
+        if len(lines) >= CHUNK_SIZE:
+            written += f.write("".join(lines))
+            lines = []
+    if universe == True:
+        for node in nodes:
+            lines.append(" i+ >> " + node +"+\n")
+        lines.append(" i+ >> i-\n")
+    first = True
+    for constraint in constraints:
+        if first == True:
+            lines.append("\nconstraints:\n")
+            first = False
+        lines.append((" i-," + constraint if universe == True else constraint) + "\n")
+        n_rules += 1
+        if len(lines) >= CHUNK_SIZE:
+            written += f.write("".join(lines))
+            lines = []
+    written += f.write("".join(lines))
+    stats_count("bytes_written", written)
+    stats_count("rules_written", n_rules)
+    return written
+
+
+def read_rr(f):
+    # Reads an opened .rr file line by line (nothing is stored)
+
+    # Yields ("nodes", (name, sign)), ("rules", rule) and ("constraints", constraint) tuples in the order of the file,
+    # the rules and constraints being the lines as they are written (without the end of line).
+    # Empty lines and lines starting with "#" are ignored, as well as the descriptions of the nodes (after the ":").
+    section = None
+    for line_number, line in enumerate(f, 1):
+        line = line.rstrip("\n")
+        # Quick output for the rules written by create_rule (starting with " X" or "[")
+        if (section == "rules" or section == "constraints") and (line[:1] == "[" or (line[:1] == " " and line[1:2] != " " and line[1:2] != "#")):
+            yield section, line
+            continue
+        stripped = line.strip()
+        if len(stripped) == 0 or stripped.startswith("#"):
+            continue
+        if stripped in ("nodes:", "rules:", "constraints:"):
+            section = stripped[:-1]
+        elif section == "nodes":
+            node = stripped.partition(":")[0].rstrip()
+            if len(node) < 2 or not node[-1] in "+-":
+                raise ValueError("line {0}: the node '{1}' has no initial state ('+' or '-')".format(line_number, node))
+            yield section, (node[:-1], node[-1])
+        elif section is None:
+            raise ValueError("line {0}: '{1}' is outside of the nodes, rules and constraints sections".format(line_number, stripped))
+        else:
+            yield section, line
+
+
+def strip_universe(lines, nodes):
+    # Transforms the lines read in a universe file (see read_rr) back into the original nodes, rules and constraints
+
+    # lines (iterable): ("rules", rule) and ("constraints", constraint) tuples read after the nodes section
+    # nodes (list of str): names of the nodes (without the "i" node)
+    # Yields the original rules and constraints, and raises a ValueError if a line was not written by write_rr with universe = True.
+    # The " i+ >> node+" and " i+ >> i-" rules are skipped.
+    appear = set(" i+ >> " + node + "+" for node in nodes)
+    appear.add(" i+ >> i-")
+    for section, line in lines:
+        if section == "rules" and line in appear:
+            continue
+        if line.startswith(" i-,"):
+            yield section, line[4:]
+        elif section == "rules" and "] i-, " in line:
+            yield section, line.replace("] i-, ", "] ", 1)
+        else:
+            raise ValueError("'{0}' is not a rule of a universe file".format(line))
@@ -1,19 +1,132 @@
 from warnings import warn
-import numpy as np
-import os.path
-from re import split
-from utils import *
+from itertools import groupby
+from operator import itemgetter
+if __package__:
+    from .utils import *
+    from .rr_rules import *
+    from .rr_io import *
+    from .rr_stats import *
+else:
+    from utils import *
+    from rr_rules import *
+    from rr_io import *
+    from rr_stats import *
+
+class rr_nodes(list):
+    # List of the names of the nodes, which also keeps a hashed count of each name so that "node in nodes" takes constant time
+    # It can be modified as any list (append, extend, remove, ...), the index being updated accordingly
+    
+    def __init__(self, nodes = []):
+        list.__init__(self, nodes)
+        self._reindex()
+    
+    def _reindex(self):
+        self._counts = {}
+        for node in self:
+            self._counts[node] = self._counts.get(node, 0) + 1
+    
+    def _add(self, node):
+        self._counts[node] = self._counts.get(node, 0) + 1
+    
+    def _discard(self, node):
+        if self._counts[node] == 1:
+            del self._counts[node]
+        else:
+            self._counts[node] -= 1
+    
+    def __contains__(self, node):
+        try:
+            return node in self._counts
+        except TypeError:       # unhashable object
+            return list.__contains__(self, node)
+    
+    def __reduce__(self):
+        return (rr_nodes, (list(self),))
+    
+    def append(self, node):
+        list.append(self, node)
+        self._add(node)
+    
+    def extend(self, nodes):
+        start = len(self)
+        list.extend(self, nodes)
+        for node in self[start:]:
+            self._add(node)
+    
+    def __iadd__(self, nodes):
+        self.extend(nodes)
+        return self
+    
+    def insert(self, position, node):
+        list.insert(self, position, node)
+        self._add(node)
+    
+    def remove(self, node):
+        list.remove(self, node)
+        self._discard(node)
+    
+    def pop(self, position = -1):
+        node = list.pop(self, position)
+        self._discard(node)
+        return node
+    
+    def clear(self):
+        list.clear(self)
+        self._counts = {}
+    
+    def __setitem__(self, position, value):
+        list.__setitem__(self, position, value)
+        self._reindex()
+    
+    def __delitem__(self, position):
+        list.__delitem__(self, position)
+        self._reindex()
+    
+    def __imul__(self, n):
+        list.__imul__(self, n)
+        self._reindex()
+        return self
+
 
 class rr_list():
     # Input (optionnal): a list of character strings corresponding to the system's nodes.
     # If no argument is given, the nodes list begins empty
     
     def __init__(self, nodes_list = []):
+        # The rules and constraints are stored in packed form (see rr_rules.py) and share the same tables of names
+        self._names = rr_names()
+        self._labels = rr_names()
         self.rules = []
         self.constraints = []
         self.nodes = nodes_list
         self.nodes_init = []
         
+    # the nodes can be set as any list of names, it is converted into a rr_nodes object (copy of the list)
+    @property
+    def nodes(self):
+        return self._nodes
+    
+    @nodes.setter
+    def nodes(self, nodes):
+        self._nodes = rr_nodes(nodes)
+    
+    # rules and constraints can be set as any list of rule strings, they are converted into rr_rule_list objects
+    @property
+    def rules(self):
+        return self._rules
+    
+    @rules.setter
+    def rules(self, rules):
+        self._rules = rr_rule_list(rules, names = self._names, labels = self._labels)
+        
+    @property
+    def constraints(self):
+        return self._constraints
+    
+    @constraints.setter
+    def constraints(self, constraints):
+        self._constraints = rr_rule_list(constraints, names = self._names, labels = self._labels)
+        
     def show(self):
         print("Nodes:")
         print(self.nodes)
@@ -28,7 +141,7 @@ class rr_list():
     def replace_rule(self, former_rule, new_rule, is_constraint = False):
         # Replace an existing rule (or constraint) from the system by another one
         if is_constraint == True:
-            self.constraits.remove(former_rule)
+            self.constraints.remove(former_rule)
             self.constraints.append(new_rule)
         else:
             self.rules.remove(former_rule)
@@ -36,35 +149,59 @@ class rr_list():
             
     def replace_constraint(self, former_constraint, new_constraint):
         # Replace an existing constraint from the system by another one
-            self.constraits.remove(former_constraint)
-            self.constraints.append(new_constraint)
-
-########### Useless? ################
-#    def add_rule(self, new_rule, is_constraint = False):
-#        if is_constraint == True:
-#            self.constraits.append(new_rule)
-#        else:
-#            self.rules.append(new_rule)
-#            
-#    def add_constraint(self, constraint):
-#        self.constraits.remove(constraint)
-#        
-#    def remove_rule(self, rule, is_constraint = False):
-#        if is_constraint == True:
-#            self.constraits.remove(rule)
-#        else:
-#            self.rules.remove(rule)
-#            
-#    def remove_constraint(self, constraint):
-#            self.constraits.remove(constraint)
-
+        self.replace_rule(former_constraint, new_constraint, is_constraint = True)
 
+    def add_rule(self, new_rule, is_constraint = False, unique = False):
+        # Adds a rule (or constraint) given as a character string
+        
+        # unique (bool): if True, the rule is not added if it is already present
+        # Returns True if the rule was added
+        target = self.constraints if is_constraint == True else self.rules
+        if unique == True:
+            return target.add(new_rule)
+        target.append(new_rule)
+        return True
+            
+    def add_constraint(self, constraint, unique = False):
+        return self.add_rule(constraint, is_constraint = True, unique = unique)
+        
+    def remove_rule(self, rule, is_constraint = False):
+        # Removes a rule (or constraint) from the system (ValueError if it is absent)
+        if is_constraint == True:
+            self.constraints.remove(rule)
+        else:
+            self.rules.remove(rule)
+            
+    def remove_constraint(self, constraint):
+        self.remove_rule(constraint, is_constraint = True)
+        
+    def remove_duplicates(self):
+        # Removes the rules and constraints present several times. Returns the number of rules and constraints removed
+        return self.rules.dedup() + self.constraints.dedup()
+    
+    @stats_timed("minimize")
+    def minimize(self):
+        # Removes the rules and constraints which do not change the behaviour of the system (same states and transitions, see minimal_rules):
+        # duplicates, rules subsumed by a more general rule with the same effect, and rules that can never be fired (e.g. because a constraint
+        # can always be fired when they could). The order of the other rules is kept.
+        # Returns the number of rules and constraints removed for each reason: {"duplicates": n, "subsumed": n, "dead": n}
+        rules, constraints, removed = minimal_rules(list(self.rules.keys()), list(self.constraints.keys()))
+        if len(rules) < len(self.rules):
+            self.rules.clear()
+            self.rules.extend(rules)
+        if len(constraints) < len(self.constraints):
+            self.constraints.clear()
+            self.constraints.extend(constraints)
+        for reason, n in removed.items():
+            stats_count("minimize_" + reason, n)
+        return removed
         
     ######## functions allowing to add "common" rules to a given rr set ########
     
     # These are our current definitions of predation, competition, and all our common rules
         
-    def add_predation(self, predator, preys_list, secondary_preys=[], preferential = True, autotroph = False, strong_dependance = False, allow_appearance = False):
+    @stats_rules("predation")
+    def add_predation(self, predator, preys_list, secondary_preys=[], preferential = True, autotroph = False, strong_dependance = False, allow_appearance = False, check_nodes = True):
         # Writes the rules corresponding to the predation of a given species
         
         # predator (str): name of the predator
@@ -75,83 +212,150 @@ class rr_list():
         # strong_dependance (bool): if True, adds a constraint that forces the predator to disappear if all its preys (main and secondary) are absent
 
         # allow_appearance (bool): if True, adds the rules leading to appearance of species (/!\ should probably not be used for the event-based vision, only the process-based one)
+        # check_nodes (bool): if False, the presence of the species in the nodes list is not checked (used when they are known to be defined)
 
         # Check presence of species in the nodes list
-        for node in preys_list+[predator]+secondary_preys:
-            if not node in self.nodes:
-               warn("node {0} not defined !".format(node))
+        if check_nodes == True:
+            for node in preys_list+[predator]+secondary_preys:
+                if not node in self.nodes:
+                   warn("node {0} not defined !".format(node))
         # Check type
         if type(preys_list) != list:
             raise ValueError("preys_list has to be a list !")
         
         # Rules are illustrated with predator P, main prey N, secondary prey n
         for prey in preys_list:
-            self.rules.append(create_rule(predator,"+", prey, "-")) # P+ >> N-
+            self.rules.append_rule(predator,"+", prey, "-") # P+ >> N-
             
             if allow_appearance == True:
-                self.rules.append(create_rule(prey, "+", predator, "+")) # N+ >> P+
-                self.rules.append(create_rule(predator, "-", prey, "+")) # P- >> N+
+                self.rules.append_rule(prey, "+", predator, "+") # N+ >> P+
+                self.rules.append_rule(predator, "-", prey, "+") # P- >> N+
  
         if not autotroph == True:    
             if len(preys_list) == 0:
-                self.rules.append(create_rule(predator, "+", predator, "-")) # P+ >> P- if no viable prey, like Euplotes Patella in the Weatherby experiments
+                self.rules.append_rule(predator, "+", predator, "-") # P+ >> P- if no viable prey, like Euplotes Patella in the Weatherby experiments
                 if strong_dependance == True:
-                    self.constraints.append(create_rule(secondary_preys, "-", predator, "-")) # Constraint: n- >> P-
+                    self.constraints.append_rule(secondary_preys, "-", predator, "-") # Constraint: n- >> P-
             else:
                 if strong_dependance == True:
-                    self.constraints.append(create_rule(preys_list + secondary_preys, "-", predator, "-")) # N-, n- >> P-
+                    self.constraints.append_rule(preys_list + secondary_preys, "-", predator, "-") # N-, n- >> P-
                     if len(secondary_preys) > 0: # (otherwise the previous rule is enough)
-                        self.rules.append(create_rule(preys_list, "-", predator, "-")) # N- >> P-
+                        self.rules.append_rule(preys_list, "-", predator, "-") # N- >> P-
                     # the predator can disappear in the absence of its main preys, and is forced to disappear in the absence of all preys
                 else:
-                    self.rules.append(create_rule(preys_list, "-", predator, "-")) # N- >> P-
+                    self.rules.append_rule(preys_list, "-", predator, "-") # N- >> P-
         
         
         for s_prey in secondary_preys:
             if preferential == True:
-                self.rules.append(create_rule([predator]+preys_list, ["+"]+["-"]*len(preys_list), s_prey, "-")) # N-, P+ >> P-
+                self.rules.append_rule([predator]+preys_list, ["+"]+["-"]*len(preys_list), s_prey, "-") # N-, P+ >> P-
             else:
-                self.rules.append(create_rule(predator, "+", s_prey, "-")) # P+ >> n-
+                self.rules.append_rule(predator, "+", s_prey, "-") # P+ >> n-
             # P eats the secondary prey if the main preys (in preys_list) are all absent
           
             
-    def add_competition(self, A, B, asymmetric = False):
+    @stats_rules("competition")
+    def add_competition(self, A, B, asymmetric = False, check_nodes = True):
         # Writes the rules corresponding to competition between A and B
         
         # A (str): name of the first competitor (dominant if asymmetric competition)
         # B (str): name of the second competitor
         # asymmetric (bool): if True, B is unable to exclude A
+        # check_nodes (bool): if False, the presence of A and B in the nodes list is not checked
         
         # Note : compétition deux à deux pour le moment, pas sûr que ça soit utile de s'embêter à la faire par plus grands groupes?
         
         # Check types
-        if not A in self.nodes:
-            warn("node {0} not defined !".format(A))
-        if not B in self.nodes:
-            warn("node {0} not defined !".format(B))
+        if check_nodes == True:
+            if not A in self.nodes:
+                warn("node {0} not defined !".format(A))
+            if not B in self.nodes:
+                warn("node {0} not defined !".format(B))
             
-        self.rules.append(create_rule(A, "+", B, "-")) # A+ >> B-
+        self.rules.append_rule(A, "+", B, "-") # A+ >> B-
         if asymmetric == False:
-            self.rules.append(create_rule(B, "+", A, "-")) # B+ >> A-
+            self.rules.append_rule(B, "+", A, "-") # B+ >> A-
             
             
-    def add_mutualism(self, A, B, asymmetric = False):
+    @stats_rules("mutualism")
+    def add_mutualism(self, A, B, asymmetric = False, check_nodes = True):
         # Writes the rules corresponding to mutualism
         
         # A, B (str): name of the mutualist species
         # asymmetric (bool): if True, only A depends on B
+        # check_nodes (bool): if False, the presence of A and B in the nodes list is not checked
         
         # Check types
-        if not A in self.nodes:
-            warn("node {0} not defined !".format(A))
-        if not B in self.nodes:
-            warn("node {0} not defined !".format(B))
+        if check_nodes == True:
+            if not A in self.nodes:
+                warn("node {0} not defined !".format(A))
+            if not B in self.nodes:
+                warn("node {0} not defined !".format(B))
         
-        self.rules.append(create_rule(B, "-", A, "-")) # B- >> A-
+        self.rules.append_rule(B, "-", A, "-") # B- >> A-
         if asymmetric == False:
-            self.rules.append(create_rule(A, "-", B, "-")) # A- >> B-
+            self.rules.append_rule(A, "-", B, "-") # A- >> B-
             
         
+    ######## bulk versions, for many links at once ########
+    
+    # The links are given as (A, B) pairs, or as a two-columns array. All the names are checked at once, and a single warning lists the
+    # undefined nodes. These methods return the list of the undefined nodes (empty if all are defined).
+    
+    def check_nodes(self, names):
+        # Returns the list of the names that are not in self.nodes (in order of first appearance), and warns once if there are some
+        missing = []
+        seen = set()
+        for name in names:
+            if not name in seen:
+                seen.add(name)
+                if not name in self.nodes:
+                    missing.append(name)
+        if len(missing) > 0:
+            shown = ", ".join(str(node) for node in missing[:10]) + (", ..." if len(missing) > 10 else "")
+            warn("{0} nodes not defined ! ({1})".format(len(missing), shown))
+        return missing
+    
+    def add_predations_from(self, links, secondary_links = [], **kwd):
+        # Writes the rules corresponding to many predation links (same rules as add_predation, called once per predator)
+        
+        # links (iterable of (predator, prey) pairs): main preys
+        # secondary_links (iterable of (predator, prey) pairs): secondary preys
+        # The optionnal arguments of add_predation (preferential, autotroph, strong_dependance, allow_appearance) apply to all predators.
+        # Predators are translated in order of first appearance, and their preys in the order of the links.
+        links = links_list(links)
+        secondary_links = links_list(secondary_links)
+        preys = {}
+        for predator, prey in links:
+            preys.setdefault(predator, ([], []))[0].append(prey)
+        for predator, prey in secondary_links:
+            preys.setdefault(predator, ([], []))[1].append(prey)
+        missing = self.check_nodes(name for link in links + secondary_links for name in link)
+        for predator, (preys_list, secondary_preys) in preys.items():
+            self.add_predation(predator, preys_list, secondary_preys = secondary_preys, check_nodes = False, **kwd)
+        return missing
+    
+    def add_competitions_from(self, links, asymmetric = False):
+        # Writes the rules corresponding to many competition links (see add_competition)
+        
+        # links (iterable of (A, B) pairs): competitors (A dominant if asymmetric competition)
+        links = links_list(links)
+        missing = self.check_nodes(name for link in links for name in link)
+        for A, B in links:
+            self.add_competition(A, B, asymmetric = asymmetric, check_nodes = False)
+        return missing
+    
+    def add_mutualisms_from(self, links, asymmetric = False):
+        # Writes the rules corresponding to many mutualism links (see add_mutualism)
+        
+        # links (iterable of (A, B) pairs): mutualist species (only A depends on B if asymmetric)
+        links = links_list(links)
+        missing = self.check_nodes(name for link in links for name in link)
+        for A, B in links:
+            self.add_mutualism(A, B, asymmetric = asymmetric, check_nodes = False)
+        return missing
+        
+    @stats_rules("appearance")
     def add_appearance(self, A, absence_conditions = [], presence_conditions = []):
         # Writes the rules corresponding to appearance of A
         
@@ -159,17 +363,19 @@ class rr_list():
         # absence_conditions (list of str): list of the names of the nodes that have to be absent in order to allow A to appear
         # presence_contitions (list of str): list of the names of the nodes that have to be absent in order to allow A to appear
         if len(absence_conditions) + len(presence_conditions) == 0:
-            self.rules.append(create_rule(A, "-", A, "+"))
+            self.rules.append_rule(A, "-", A, "+")
         else:
-            self.rules.append(create_rule(absence_conditions + presence_conditions, ["-"]*len(absence_conditions) + ["+"]*len(presence_conditions), A, "+"))
+            self.rules.append_rule(absence_conditions + presence_conditions, ["-"]*len(absence_conditions) + ["+"]*len(presence_conditions), A, "+")
             
         
     ########### Direct inclusion of community matrices to the rules
     
+    @stats_timed("include_matrix")
     def include_matrix(self, S, interaction_choice, **kwd):
         # Write the rules corresponding to the community matrix S
         
-        # S (numpy matrix): adjacency matrix ; its size should be equal to the number of components in the system.
+        # S (numpy array or scipy.sparse matrix): adjacency matrix ; its size should be equal to the number of components in the system.
+        #   Sparse matrices (CSC, CSR, ...) are read through their nonzero elements only, without building the dense matrix.
         # interaction_choice (str ; "predation" or "competition")
         
         #   For predation, S should be lower diagonal.
@@ -185,135 +391,332 @@ class rr_list():
         # Check size of S
         if not len(self.nodes) == S.shape[0] == S.shape[1]:
             raise ValueError("The community matrix should have size N x N, with N the number of nodes in the network")
+        if not interaction_choice in ["predation", "competition"]:
+            warn("Interaction '{0}' is unknown, no rule was added".format(interaction_choice))
+            return
+
+        import numpy as np
+        
+        # Nonzero elements of S, sorted by column then by row
+        with stats_phase("matrix_entries"):
+            rows, columns, values = matrix_entries(S)
+        nodes = list(self.nodes)
+        n = len(nodes)
 
         if interaction_choice == "predation":
 #                                   if isin(False, triu(S, k=+1) == 0):
 #                                   warn("Community matrix is not lower diagonal. Its upper elements were set to 0, but this shouldn't happen.")
             # check that S is lower diagonal
-            if np.isin(False, np.diag(S) == 0):
+            diagonal = rows == columns
+            if np.any(diagonal):
                 warn("Diagonal elements in the matrix are not zero. They were set to zero, but there might be a problem somewhere.")
-                S = S - np.diag(np.diag(S))  #sets diagonal elements to zero
-            for i in range(len(self.nodes)):
-                nodes_as_array = np.array(self.nodes)      # To allow manipulation with numpy
-                predator = self.nodes[i]                # Predator name
-                preys_list = list(nodes_as_array[S[:,i] == 1]) # 
-                secondary_preys = list(nodes_as_array[ (S[:,i] < 1) & (S[:,i] > 0) ])
-                if len(preys_list + secondary_preys) > 0:
-                    self.add_predation(predator = predator, preys_list = preys_list, secondary_preys = secondary_preys, **kwd)
+                rows, columns, values = rows[~diagonal], columns[~diagonal], values[~diagonal]
+            main = values == 1
+            secondary = (values < 1) & (values > 0)
+            # Preys of each predator: slices [bounds[i]:bounds[i+1]] of the lists of names
+            main_preys = [nodes[i] for i in rows[main].tolist()]
+            main_bounds = np.searchsorted(columns[main], np.arange(n + 1)).tolist()
+            secondary_preys = [nodes[i] for i in rows[secondary].tolist()]
+            secondary_bounds = np.searchsorted(columns[secondary], np.arange(n + 1)).tolist()
+            kwd.setdefault("check_nodes", False)
+            for i in np.unique(columns[main | secondary]).tolist():
+                self.add_predation(predator = nodes[i], preys_list = main_preys[main_bounds[i]:main_bounds[i+1]],
+                                   secondary_preys = secondary_preys[secondary_bounds[i]:secondary_bounds[i+1]], **kwd)
         
         elif interaction_choice == "competition":
-            for i in range(len(self.nodes)):
-                nodes_as_array = np.array(self.nodes)
-                species = self.nodes[i]
-                competitors_list = list(nodes_as_array[S[:,i] == 1])
-                
-                for competitor in competitors_list:
-                    self.add_competition(species, competitor, asymmetric = True)
-                    
-        else:
-            warn("Interaction '{0}' is unknown, no rule was added".format(interaction_choice))
-            return
+            competition = values == 1
+            for competitor, species in zip(rows[competition].tolist(), columns[competition].tolist()):
+                self.add_competition(nodes[species], nodes[competitor], asymmetric = True, check_nodes = False)
+
+    ############ Computation of the state space ###################
+    
+    @stats_timed("explore")
+    def explore(self, init = None, max_states = None, processes = None):
+        # Computes the states reachable from the initial state and the transitions between them, directly in python (see rr_states.py)
+        
+        # init (list of str or int, optionnal): nodes initially present (or state as an integer). By default, given by nodes_init
+        # max_states (int, optionnal): maximal number of states to explore
+        # processes (int, optionnal): if set, the states are shared between this number of worker processes (see explore_states_parallel)
+        # Returns a rr_state_space object (states as integers, bit i corresponding to self.nodes[i], and transitions)
+        rr_states = import_sibling("rr_states")      # imports numpy
+        if processes is not None:
+            return rr_states.explore_states_parallel(self, processes = processes, init = init, max_states = max_states)
+        return rr_states.explore_states(self, init = init, max_states = max_states)
+
+    def attractors(self, init = None, max_states = None, processes = None):
+        # Finds the attractors reachable from the initial state (sets of states which cannot be left: stable communities, or communities
+        # alternating forever) and their basins, from the explored state space (see explore and rr_states.attractor_analysis)
+        
+        # init, max_states, processes: see explore (the exploration has to be complete)
+        # Returns the list of the attractors (dicts with their "states", "size", "present" and "variable" nodes, "basin" and "strong_basin")
+        return self.explore(init = init, max_states = max_states, processes = processes).attractors()
+
+    def simulate(self, n_trajectories = 1000, max_steps = 1000, seed = None, init = None, processes = None):
+        # Estimates the outcomes of systems too large to be explored, by simulating random trajectories (see rr_states.simulate):
+        # e.g. rr.simulate(10000, seed = 1).outcomes() gives the frequencies of the final communities
+        
+        # n_trajectories (int): number of trajectories ; max_steps (int): maximal number of rules fired in each trajectory
+        # seed (int, optionnal): seed of the random generators (the results do not depend on processes)
+        # init (list of str, optionnal): nodes initially present. By default, given by nodes_init
+        # processes (int, optionnal): if set, the trajectories are shared between this number of worker processes
+        # Returns a rr_simulation object
+        rr_states = import_sibling("rr_states")      # imports numpy
+        return rr_states.simulate(self, n_trajectories = n_trajectories, max_steps = max_steps, seed = seed, init = init, processes = processes)
+
+    def symbolic(self):
+        # Compiles the rules and constraints into binary decision diagrams, to compute sets of states without listing them (see rr_bdd.py):
+        # e.g. rr.symbolic().reachable().count() for the number of states reachable from the initial state.
+        # Unlike explore, the number of nodes is not limited to 64.
+        # Returns a rr_symbolic object
+        rr_bdd = import_sibling("rr_bdd")
+        return rr_bdd.compile_symbolic(self)
+
+    ############ Reading a .rr file ###################
+    
+    @classmethod
+    @stats_timed("read_file")
+    def read_file(cls, filename, folder = "", universe = False, compression = None):
+        # Creates a rr_list object from a .rr file written by write_file (or write_universe_file if universe = True), with the same arguments.
+        
+        # filename (str): name of the file to read (without the .rr extension)
+        # folder (str, optionnal): path of the file
+        # universe (bool): if True, reads the file filename_universe.rr and removes what write_universe_file added.
+        # compression (None, "gzip" or "xz"): compression of the file
+        return cls.from_rr(rr_filename(filename, folder = folder, universe = universe, compression = compression), universe = universe)
+    
+    @classmethod
+    def from_rr(cls, complete_filename, universe = None):
+        # Creates a rr_list object from any .rr file (compressed or not depending on its extension), read line by line.
+        # Writing it back with write_file (or write_universe_file) gives the same file, apart from comment lines and node descriptions.
+        
+        # complete_filename (str): path of the file, with its extension
+        # universe (bool or None): if True, the file is read as a universe file: the "i" node, the "i-" conditions
+        #                          and the rules making the nodes appear are removed, and all nodes are initially absent.
+        #                          If None, this is done if the last node is "i", initially present, and all the others absent.
+        with open_rr(complete_filename) as f:
+            lines = read_rr(f)
+            # Nodes section
+            nodes = []
+            nodes_init = []
+            first = None
+            for section, line in lines:
+                if section != "nodes":
+                    first = (section, line)
+                    break
+                nodes.append(line[0])
+                nodes_init.append(1 if line[1] == "+" else 0)
+            
+            if universe is None:
+                universe = len(nodes) > 0 and nodes[-1] == "i" and nodes_init[-1] == 1 and sum(nodes_init) == 1
+                if universe == True:
+                    try:
+                        return cls.from_rr(complete_filename, universe = True)
+                    except ValueError:
+                        universe = False
+            
+            if universe == True:
+                if len(nodes) == 0 or nodes[-1] != "i":
+                    raise ValueError("'{0}' is not a universe file (its last node is not 'i')".format(complete_filename))
+                nodes = nodes[:-1]
+                nodes_init = [0]*len(nodes)
+            
+            rr_out = cls(nodes_list = nodes)
+            rr_out.nodes_init = nodes_init
+            
+            # Rules and constraints sections
+            def remaining():
+                if first is not None:
+                    yield first
+                yield from lines
+            rules = remaining()
+            if universe == True:
+                rules = strip_universe(rules, nodes)
+            for section, group in groupby(rules, key = itemgetter(0)):
+                if section == "nodes":
+                    raise ValueError("the nodes section of '{0}' has to be placed before the rules".format(complete_filename))
+                elif section == "rules":
+                    rr_out.rules.extend(line for section, line in group)
+                else:
+                    rr_out.constraints.extend(line for section, line in group)
+        return rr_out
 
     ############ Writing the .rr file ###################
     
-    def write_file(self, filename, folder = "", sure = "?"):
+    @stats_timed("write_file")
+    def write_file(self, filename, folder = "", sure = "?", compression = None):
         # Export the list of nodes and rules into the corresponding .rr file, directly readable by ecoserv.
         
         # filename (str): name of the file to create (without the .rr extension)
         # folder (str, optionnal): path to create the file
         # sure (str, "y" or "n"): if "y", will automatically override existing files without asking.
         #                         if "n", will automatically abort operation if the file already exists.
+        # compression (None, "gzip" or "xz"): if set, the file is compressed (and the .gz or .xz extension added)
         
         
-        complete_filename = folder + filename + ".rr"
+        complete_filename = rr_filename(filename, folder = folder, compression = compression)
         
         # Checking whether the file already exists or not
-        if os.path.isfile(complete_filename):
-            while not sure in ["y", "Y", "n", "N"]:
-                sure = input("the rr file '{0}' already exists. Are you sure that you want to override it? (y/n) \n".format(complete_filename))
-            
-            if sure in["n","N"]:
-                raise ValueError("the rr file '{0}' already exists and you asked not to override it".format(complete_filename)) 
+        check_overwrite(complete_filename, sure = sure)
         
         # First test for nodes initialization
         if not len(self.nodes_init) == len(self.nodes):
             warn("initialization of the nodes is incorrect, as the number of nodes is not equal to the number of initial values. All nodes have been initialized to 1.")
+            import numpy as np
             self.nodes_init = np.ones(len(self.nodes))
             
-        with open(complete_filename, 'w') as f:
-                
-            # Write nodes list and initial states
-            f.write("nodes:\n")
-            for node, init in zip(self.nodes, self.nodes_init):
-                if init in (1, "+", True): # node initially present
-                    f.write(" "+ node +"+ :\n")
-                elif init in (0, "-", False): # node initially absent
-                    f.write(" "+node +"- :\n")
-                else:
-                    print("node {0} was not initialized properly and was set as initially inactive".format(node))
-                    f.write(" "+node +"- :\n")
-            f.write("\n")
-            
-            # Write rules and constraints:
-            f.write("rules:\n")
-            for rule in self.rules:
-                f.write(rule +"\n")
-            if len(self.constraints) > 0:
-                f.write("\nconstraints:\n")
-                for constraint in self.constraints:
-                    f.write(constraint +"\n")
+        # The rules are rendered as they are written
+        with open_rr(complete_filename, 'w') as f:
+            write_rr(f, self.nodes, self.nodes_init, self.rules, self.constraints)
 
 
 
 
     ################### Write the .rr file allowing to compute the universe ###########
                 
-    def write_universe_file(self, filename, folder = "", sure = "?"):
+    @stats_timed("write_universe_file")
+    def write_universe_file(self, filename, folder = "", sure = "?", compression = None):
         # Creates the .rr file allowing to compute the state universe, directly readable by ecoserv or ecco.
         
         # filename (str): name of the file to create (without the .rr extension ; the suffix "_universe" will automatically be added to the name.)
         # folder (str, optionnal): path to create the file
         # sure (str, "y" or "n"): if "y", will automatically override existing files without asking.
         #                         if "n", will automatically abort operation if the file already exists.
+        # compression (None, "gzip" or "xz"): if set, the file is compressed (and the .gz or .xz extension added)
         
         
         
         
-        complete_filename = folder + filename + "_universe.rr"
+        complete_filename = rr_filename(filename, folder = folder, universe = True, compression = compression)
         
         # Checking whether the file already exists or not
-        if os.path.isfile(complete_filename):
-            while not sure in ["y", "Y", "n", "N"]:
-                sure = input("the rr file '{0}' already exists. Are you sure that you want to override it? (y/n) \n".format(complete_filename))
-            
-            if sure in["n","N"]:
-                raise ValueError("the rr file '{0}' already exists and you asked not to override it".format(complete_filename)) 
+        check_overwrite(complete_filename, sure = sure)
                 
-        with open(complete_filename, 'w') as f:
-            
-            # Write nodes list and initial states
-            f.write("nodes:\n")
-            for node in self.nodes:
-                f.write(" "+ node +"- :\n")
-            f.write(" i+ :\n")
-            f.write("\n")
-            
-            # Write rules and constraints:
-            f.write("rules:\n")
-            for rule in self.rules:
-                if "]" in rule:         # Tests whether rules have a name, in order to insert the "i-" condition after it
-                    temp_string = split("\] ", rule)
-                    f.write(temp_string[0]+"] i-, "+temp_string[1] +"\n")
-                else:
-                    f.write(" i-," + rule +"\n")
-            for node in self.nodes:
-                f.write(" i+ >> " + node +"+\n")
-            f.write(" i+ >> i-\n")
-            if len(self.constraints) > 0:
-                f.write("\nconstraints:\n")
-                for constraint in self.constraints:
-                    f.write(" i-," + constraint +"\n")
-                    
-
-                    
-            
\ No newline at end of file
+        with open_rr(complete_filename, 'w') as f:
+            write_rr(f, self.nodes, self.nodes_init, self.rules, self.constraints, universe = True)
+
+
+    ################### Compiled (binary) form of the rr_list ###########
+
+    @stats_timed("write_compiled")
+    def write_compiled(self, filename, folder = "", sure = "?"):
+        # Writes the nodes, rules and constraints as numpy arrays in the file filename.rr.npz (see rr_compiled.py), much faster to load
+        # than the .rr file. read_compiled gives back an rr_list whose .rr file (write_file) is the same as the one of this rr_list.
+
+        # filename (str): name of the file to create (without the .rr.npz extension)
+        # folder (str, optionnal): path to create the file
+        # sure (str, "y" or "n"): if "y", will automatically override existing files without asking.
+        #                         if "n", will automatically abort operation if the file already exists.
+        rr_compiled = import_sibling("rr_compiled")      # imports numpy
+        complete_filename = rr_compiled.compiled_filename(filename, folder = folder)
+        check_overwrite(complete_filename, sure = sure)
+        if not len(self.nodes_init) == len(self.nodes):
+            warn("initialization of the nodes is incorrect, as the number of nodes is not equal to the number of initial values. All nodes have been initialized to 1.")
+            self.nodes_init = [1]*len(self.nodes)
+        rr_compiled.compile_rr(self).save(complete_filename)
+
+    @classmethod
+    @stats_timed("read_compiled")
+    def read_compiled(cls, filename, folder = "", mmap = True):
+        # Creates a rr_list object from a file written by write_compiled, with the same arguments.
+        # To analyse the system without building the rr_list, rr_compiled.load_compiled returns the arrays themselves (mapped in memory).
+
+        # mmap (bool): if True, the arrays are mapped in memory instead of being read
+        rr_compiled = import_sibling("rr_compiled")
+        return rr_compiled.load_compiled(rr_compiled.compiled_filename(filename, folder = folder), mmap = mmap).to_rr(cls)
+
+
+def minimal_rules(rules, constraints):
+    # Removes the rules and constraints which do not change the transitions of the system (see rr_states.py for the semantics: a rule can be
+    # fired if its conditions hold and if it changes the state, and only constraints can be fired in the states where a constraint can be fired).
+    # A rule is removed if:
+    #   - it can never be fired ("dead"): contradictory conditions, effects always already set, or (rules only) a constraint whose conditions
+    #     are included in those of the rule can be fired in every state where the rule could
+    #   - another rule of the same list with the same effects can be fired whenever it can ("duplicates" if they can be fired in exactly the
+    #     same states, "subsumed" if the other one has less conditions), the first of several duplicates being kept
+    # The conditions of a rule with a single effect include the opposite of its effect (e.g. "A+ >> B-" can only be fired if B is present).
+
+    # rules, constraints (lists of encoded rules, see rr_rule_list.encode): the rules that could not be encoded are kept
+    # Returns (rules, constraints, removed): the lists of the rules kept, in their order, and the number of rules removed for each reason
+    removed = {"duplicates": 0, "subsumed": 0, "dead": 0}
+    kept_constraints = minimal_list(constraints, [], removed)
+    blockers = [sides for sides in map(rule_sides, kept_constraints) if sides is not None]
+    return minimal_list(rules, blockers, removed), kept_constraints, removed
+
+
+def rule_sides(key):
+    # Returns (conditions, effects) of an encoded rule as frozensets of codes (2*id + 1 for "+", 2*id for "-"), the conditions including the
+    # opposite of the effect of the rules with a single effect, or None for a rule that could not be encoded
+    n_lhs = key[0]
+    if n_lhs == 0:
+        return None
+    conditions = frozenset(key[1:n_lhs+1])
+    effects = frozenset(key[n_lhs+1:-2])
+    if len(effects) == 1:
+        conditions = conditions | {next(iter(effects)) ^ 1}
+    return conditions, effects
+
+
+def minimal_list(keys, blockers, removed):
+    # Rules of keys kept by minimal_rules, blockers being the (conditions, effects) of the constraints (empty for the constraints themselves)
+    sides = [rule_sides(key) for key in keys]
+    blocker_index = {}      # constraints indexed by their lowest condition
+    for blocker in blockers:
+        blocker_index.setdefault(min(blocker[0]), []).append(blocker)
+    dead = [False]*len(keys)
+    for k, rule in enumerate(sides):
+        if rule is None:
+            continue
+        conditions, effects = rule
+        if any(code ^ 1 in conditions for code in conditions) or effects <= conditions:
+            dead[k] = True
+        else:
+            dead[k] = any(blocker_conditions <= conditions and any(effect ^ 1 in conditions for effect in blocker_effects)
+                          for code in conditions for blocker_conditions, blocker_effects in blocker_index.get(code, ()))
+        removed["dead"] += dead[k]
+
+    # Rules with the same effects, from the least to the most conditions, each rule kept being indexed by its lowest condition
+    kept = [not is_dead for is_dead in dead]
+    index = {}
+    order = sorted((k for k in range(len(keys)) if kept[k] and sides[k] is not None), key = lambda k: len(sides[k][0]))
+    for k in order:
+        conditions, effects = sides[k]
+        candidates = index.setdefault(effects, {})
+        for code in conditions:
+            for other in candidates.get(code, ()):
+                if sides[other][0] <= conditions:
+                    kept[k] = False
+                    removed["duplicates" if sides[other][0] == conditions else "subsumed"] += 1
+                    break
+            if kept[k] == False:
+                break
+        if kept[k] == True:
+            candidates.setdefault(min(conditions), []).append(k)
+    return [key for key, keep in zip(keys, kept) if keep]
+
+
+def links_list(links):
+    # Converts links given as pairs or as a two-columns (numpy) array into a list of (A, B) tuples of python objects
+    if hasattr(links, "tolist"):
+        links = links.tolist()
+    links = [tuple(link) for link in links]
+    for link in links:
+        if len(link) != 2:
+            raise ValueError("links have to be given as (A, B) pairs, not {0}".format(link))
+    return links
+
+
+def matrix_entries(S):
+    # Returns the arrays (rows, columns, values) of the nonzero elements of the matrix S, sorted by column and then by row
+
+    # S (numpy array or scipy.sparse matrix): the sparse matrices are read through their column structure (memory proportional to the number of nonzero elements)
+    import numpy as np
+    if hasattr(S, "tocsc"):
+        S = S.tocsc(copy = True)
+        S.sum_duplicates()      # sorts the row indices of each column
+        columns = np.repeat(np.arange(S.shape[1]), np.diff(S.indptr))
+        rows, values = S.indices, S.data
+        nonzero = values != 0
+        return rows[nonzero], columns[nonzero], values[nonzero]
+    S = np.asarray(S)
+    columns, rows = np.nonzero(S.T)
+    return rows, columns, S[rows, columns]
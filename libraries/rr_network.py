@@ -1,13 +1,250 @@
+import heapq
+import multiprocessing
+import os
+from itertools import product, combinations
 import networkx as nx
-import pandas as pd
 import numpy as np
-from rr_list import *
-from utils import *
+from warnings import warn
+if __package__:
+    from .rr_list import *
+    from .rr_io import *
+    from .utils import *
+    from .rr_stats import *
+else:
+    from rr_list import *
+    from rr_io import *
+    from utils import *
+    from rr_stats import *
+
+class rr_nodes_init():
+    # Initial states of the nodes of a rr_network, stored as the position of each node and an array of values (0 if absent, 1 if present)
+    # The columns can be read as in the former pandas DataFrame: nodes_init["nodes"] and nodes_init["init"]
+
+    # nodes (list of str): names of the nodes
+    # values (array-like, optionnal): initial values, in the order of nodes (all nodes absent by default)
+    
+    def __init__(self, nodes, values = None):
+        self.nodes = list(nodes)
+        self.positions = {node: i for i, node in enumerate(self.nodes)}
+        if values is None:
+            self.values = np.zeros(len(self.nodes))
+        else:
+            self.values = np.array(values, dtype = float)
+            if not self.values.shape == (len(self.nodes),):
+                raise ValueError("{0} initial values were given for {1} nodes".format(len(self.values), len(self.nodes)))
+    
+    def __getitem__(self, column):
+        if column == "nodes":
+            return self.nodes
+        elif column == "init":
+            return self.values
+        raise KeyError(column)
+    
+    def __len__(self):
+        return len(self.nodes)
+    
+    def __repr__(self):
+        return repr(self.to_dataframe())
+    
+    def _repr_html_(self):
+        return self.to_dataframe()._repr_html_()
+    
+    def to_dataframe(self):
+        # Returns the initial states as a pandas DataFrame with columns "nodes" and "init"
+        import pandas as pd
+        return pd.DataFrame({"nodes" : self.nodes, "init" : self.values})
+    
+    def get(self, node):
+        # Returns the initial value of a node
+        return self.values[self.positions[node]]
+    
+    def set(self, nodes, init = 1):
+        # Sets the initial value of several nodes
+        
+        # nodes (list of str): names of the nodes
+        # init (0 or 1, or list of values): initial value of all the nodes, or of each of them
+        positions = []
+        defined = []
+        for k, node in enumerate(nodes):
+            if node in self.positions:
+                positions.append(self.positions[node])
+                defined.append(k)
+            else:
+                warn("node {0} not defined !".format(node))
+        if np.ndim(init) > 0:
+            init = np.asarray(init, dtype = float)[defined]
+        self.values[positions] = init
+    
+    def present(self):
+        # Returns the list of the nodes initially present
+        return [self.nodes[i] for i in np.flatnonzero(self.values == 1)]
+
+
+class tracked_dict(dict):
+    # Dict of the attributes of a node or an edge of a rr_network, which reports its modifications (e.g. of the "feature" of a node)
+    # by adding the nodes concerned to the set of nodes to translate again (see rr_network.create_rr with incremental = True)
+    __slots__ = ("dirty", "owners")
+    
+    def bind(self, dirty, owners):
+        self.dirty = dirty
+        self.owners = owners
+    
+    def _touch(self):
+        dirty = getattr(self, "dirty", None)
+        if dirty is not None:
+            dirty.update(self.owners)
+    
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self._touch()
+    
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._touch()
+    
+    def update(self, *args, **kwd):
+        dict.update(self, *args, **kwd)
+        self._touch()
+    
+    def setdefault(self, key, default = None):
+        if not key in self:
+            self._touch()
+        return dict.setdefault(self, key, default)
+    
+    def pop(self, key, *default):
+        value = dict.pop(self, key, *default)
+        self._touch()
+        return value
+    
+    def popitem(self):
+        item = dict.popitem(self)
+        self._touch()
+        return item
+    
+    def clear(self):
+        dict.clear(self)
+        self._touch()
+
 
 class rr_network(nx.DiGraph):
     # Overlayer of the nx.DiGraph class from the networkx library, intended to allow translation towards the rr_list class
     # No initialization, the initial network will be empty
     
+    # The translation of each node only depends on its own links and feature. After a first incremental translation (create_rr with
+    # incremental = True), the methods modifying the graph and the attributes dicts record the nodes whose links or attributes changed,
+    # so that only these nodes are translated again. Before that, nothing is recorded (no cost for the networks translated once).
+    
+    def __init__(self, incoming_graph_data = None, **attr):
+        self._dirty = set()         # nodes modified since the last incremental translation
+        self._rr_cache = None       # rules of each node at the last incremental translation (None if the modifications are not tracked)
+        super().__init__(incoming_graph_data, **attr)
+    
+    ##########################################
+    # Tracking of the modifications          #
+    ##########################################
+    
+    def _track(self):
+        # Starts recording the modifications: the attributes dicts are replaced by tracked_dict objects
+        self.node_attr_dict_factory = tracked_dict
+        self.edge_attr_dict_factory = tracked_dict
+        for node, attributes in self._node.items():
+            if not type(attributes) is tracked_dict:
+                self._node[node] = tracked_dict(attributes)
+            self._node[node].bind(self._dirty, (node,))
+        for u, successors in self._succ.items():
+            for v, attributes in successors.items():
+                if not type(attributes) is tracked_dict:
+                    attributes = tracked_dict(attributes)
+                    successors[v] = attributes
+                    self._pred[v][u] = attributes
+                attributes.bind(self._dirty, (u, v))
+    
+    def _bind_node(self, node):
+        self._node[node].bind(self._dirty, (node,))
+        self._dirty.add(node)
+    
+    def _bind_edge(self, u, v):
+        # (the attributes of u and v only have to be bound if the nodes were created with the edge)
+        dirty = self._dirty
+        self._succ[u][v].bind(dirty, (u, v))
+        dirty.add(u)
+        dirty.add(v)
+        if not hasattr(self._node[u], "dirty"):
+            self._node[u].bind(dirty, (u,))
+        if not hasattr(self._node[v], "dirty"):
+            self._node[v].bind(dirty, (v,))
+    
+    def add_node(self, node_for_adding, **attr):
+        super().add_node(node_for_adding, **attr)
+        if self._rr_cache is not None:
+            self._bind_node(node_for_adding)
+    
+    def add_nodes_from(self, nodes_for_adding, **attr):
+        if self._rr_cache is None:
+            return super().add_nodes_from(nodes_for_adding, **attr)
+        nodes_for_adding = list(nodes_for_adding)
+        super().add_nodes_from(nodes_for_adding, **attr)
+        for node in nodes_for_adding:
+            try:
+                node in self._node
+            except TypeError:       # (node, attributes) tuple
+                node = node[0]
+            self._bind_node(node)
+    
+    def remove_node(self, n):
+        if self._rr_cache is None:
+            return super().remove_node(n)
+        neighbours = list(self._succ[n]) + list(self._pred[n]) if n in self._node else []
+        super().remove_node(n)
+        self._dirty.update(neighbours)
+        self._dirty.add(n)
+    
+    def remove_nodes_from(self, nodes):
+        if self._rr_cache is None:
+            return super().remove_nodes_from(nodes)
+        nodes = list(nodes)
+        for node in nodes:
+            if node in self._node:
+                self._dirty.update(self._succ[node])
+                self._dirty.update(self._pred[node])
+        super().remove_nodes_from(nodes)
+        self._dirty.update(nodes)
+    
+    def add_edge(self, u_of_edge, v_of_edge, **attr):
+        super().add_edge(u_of_edge, v_of_edge, **attr)
+        if self._rr_cache is not None:
+            self._bind_edge(u_of_edge, v_of_edge)
+    
+    def add_edges_from(self, ebunch_to_add, **attr):
+        if self._rr_cache is None:
+            return super().add_edges_from(ebunch_to_add, **attr)
+        ebunch_to_add = list(ebunch_to_add)
+        super().add_edges_from(ebunch_to_add, **attr)
+        for edge in ebunch_to_add:
+            self._bind_edge(edge[0], edge[1])
+    
+    def remove_edge(self, u, v):
+        super().remove_edge(u, v)
+        if self._rr_cache is not None:
+            self._dirty.update((u, v))
+    
+    def remove_edges_from(self, ebunch):
+        if self._rr_cache is None:
+            return super().remove_edges_from(ebunch)
+        ebunch = list(ebunch)
+        super().remove_edges_from(ebunch)
+        for edge in ebunch:
+            self._dirty.update(edge[:2])
+    
+    def clear_edges(self):
+        super().clear_edges()
+        self._dirty.update(self._node)
+    
+    def clear(self):
+        super().clear()
+        self._dirty.clear()
+        self._rr_cache = None
+    
     ##########################################
     # Addition of ecologically meaning links #
     ##########################################
@@ -35,7 +272,111 @@ class rr_network(nx.DiGraph):
 
         # A, B (str): names of the species
         self.add_edges_from([(A, B), (B, A)], kind = "mutualism")
-    
+
+    ######################################
+    # Bulk construction from link tables #
+    ######################################
+
+    def add_links_from(self, sources, targets, kinds, features = None):
+        # Adds many links at once, given as columns (lists or arrays), after checking their kinds (see INTERACTION_KINDS)
+        # The network is the same as with add_edges_from (nodes in order of first appearance, the kind of a link given twice being the last one),
+        # except that the other attributes of the links which were already in the network are not kept.
+
+        # sources, targets (list or array of str): names of the source and target of each link (e.g. predator and prey)
+        # kinds (list or array of str): kind of each link
+        # features (dict or list of str, optionnal): feature of some nodes ({node: feature}), or names of autotroph nodes ;
+        #                                            the nodes which are not in the network are added
+        sources, targets, kinds = column_list(sources), column_list(targets), column_list(kinds)
+        if not len(sources) == len(targets) == len(kinds):
+            raise ValueError("the columns of the links have different lengths ({0}, {1} and {2})".format(len(sources), len(targets), len(kinds)))
+        check_kinds(kinds)
+
+        if self._rr_cache is not None or not self.node_attr_dict_factory is dict or not self.edge_attr_dict_factory is dict:
+            # the modifications are tracked (see create_rr with incremental = True): the links are added one by one
+            self.add_edges_from((u, v, {"kind": kind}) for u, v, kind in zip(sources, targets, kinds))
+        else:
+            succ, pred, node = self._succ, self._pred, self._node
+            # new nodes, in order of first appearance
+            for name in dict.fromkeys([name for link in zip(sources, targets) for name in link]):
+                if not name in succ:
+                    if name is None:
+                        raise ValueError("None cannot be a node")
+                    succ[name] = {}
+                    pred[name] = {}
+                    node[name] = {}
+            # (a link given again gets a new attributes dict, at the same place in the adjacency dicts)
+            for u, v, attributes in zip(sources, targets, [{"kind": kind} for kind in kinds]):
+                succ[u][v] = attributes
+                pred[v][u] = attributes
+            # the views cached by networkx >= 3.3 are reset (before, the views read the adjacency dicts directly and nothing is cached)
+            clear_cache = getattr(nx, "_clear_cache", None)
+            if clear_cache is not None:
+                clear_cache(self)
+
+        if features is not None:
+            if not hasattr(features, "items"):
+                features = dict.fromkeys(features, "autotroph")
+            for name, feature in features.items():
+                if not name in self._node:
+                    self.add_node(name)
+                self.nodes[name]["feature"] = feature
+
+    @classmethod
+    def from_arrays(cls, sources, targets, kinds, features = None):
+        # Creates a network from columns of links (see add_links_from)
+        net = cls()
+        net.add_links_from(sources, targets, kinds, features = features)
+        return net
+
+    @classmethod
+    def from_dataframe(cls, df, source = "source", target = "target", kind = "kind", feature = None):
+        # Creates a network from a table of links (pandas DataFrame, or dict of columns), or from an iterable of such tables (chunks)
+
+        # source, target, kind (str): names of the columns of the source, target and kind of the links
+        # feature (str, optionnal): name of a column giving the feature of the source of each link (e.g. "autotroph" ; ignored if empty or missing)
+        net = cls()
+        for chunk in ([df] if hasattr(df, "keys") else df):
+            net.add_frame(chunk, source = source, target = target, kind = kind, feature = feature)
+        return net
+
+    @classmethod
+    def from_edgelist(cls, filename, source = "source", target = "target", kind = "kind", feature = None, chunksize = 1000000, **kwd):
+        # Creates a network from a file of links with a header line, read by chunks of chunksize lines (memory independent of the size of the file):
+        # CSV file (.csv, or .tsv and .txt separated by tabs, possibly compressed, read with pandas) or Parquet file (.parquet, read with pyarrow)
+
+        # source, target, kind, feature (str): names of the columns (see from_dataframe)
+        # chunksize (int): number of lines read at once
+        # The other arguments are passed to pandas.read_csv (e.g. sep)
+        columns = [source, target, kind] + ([] if feature is None else [feature])
+        net = cls()
+        if filename.endswith(".parquet"):
+            try:
+                import pyarrow.parquet
+            except ImportError:
+                raise ImportError("pyarrow is needed to read Parquet files")
+            for batch in pyarrow.parquet.ParquetFile(filename).iter_batches(batch_size = chunksize, columns = columns):
+                net.add_frame({name: batch.column(name).to_pylist() for name in columns}, source = source, target = target, kind = kind, feature = feature)
+            return net
+
+        import pandas as pd
+        name = filename[:filename.rfind(".")] if filename.endswith((".gz", ".bz2", ".xz", ".zip")) else filename
+        if name.endswith((".tsv", ".txt")):
+            kwd.setdefault("sep", "\t")
+        for chunk in pd.read_csv(filename, usecols = columns, dtype = str, keep_default_na = False, chunksize = chunksize, **kwd):
+            net.add_frame(chunk, source = source, target = target, kind = kind, feature = feature)
+        return net
+
+    def add_frame(self, df, source = "source", target = "target", kind = "kind", feature = None):
+        # Adds the links of a table (see from_dataframe)
+        for column in [source, target, kind] + ([] if feature is None else [feature]):
+            if not column in df.keys():
+                raise ValueError("the table of links has no column '{0}' (columns: {1})".format(column, list(df.keys())))
+        features = None
+        if feature is not None:
+            features = {name: value for name, value in zip(column_list(df[source]), column_list(df[feature]))
+                        if isinstance(value, str) and len(value) > 0}
+        self.add_links_from(column_list(df[source]), column_list(df[target]), column_list(df[kind]), features = features)
+
     ###############################
     # Initialization of the nodes #
     ###############################
@@ -43,13 +384,17 @@ class rr_network(nx.DiGraph):
     # Optionnal (but recommended) if the rr_list is meant to be manipulated later
     # Mandatory if the .rr file is meant to be created directly
 
-    def initialize_nodes(self, initially_present = []):
+    def initialize_nodes(self, initially_present = [], values = None, attribute = None):
         # Sets the initial state of the system.
 
         # initially_present(list of str, optionnal): list of the names of the nodes initially present (all other are set initially absent)
-        self.nodes_init = pd.DataFrame({"nodes" : list(self.nodes), "init" : list(np.zeros(len(self.nodes)))})
-        for node in initially_present:
-            self.nodes_init.loc[self.nodes_init["nodes"] == node, "init"] = 1
+        # values (array-like, optionnal): initial state of each node (1 or True if present, 0 or False if absent), in the order of self.nodes
+        # attribute (str, optionnal): name of a node attribute giving the initial state of the nodes (present if 1, True or "+",
+        #                             absent otherwise or if the node has no such attribute)
+        self.nodes_init = rr_nodes_init(self.nodes, values = values)
+        if attribute is not None:
+            self.nodes_init.set([node for node, value in self.nodes(data = attribute) if value in (1, "+", True)])
+        self.nodes_init.set(initially_present)
     
     def set_node_init(self, node, init):
         # Sets or modifies the initial state of a given node
@@ -58,13 +403,72 @@ class rr_network(nx.DiGraph):
         # init (0 or 1): initial state (0 if absent, 1 if present)
         if hasattr(self, "nodes_init") == False:
             raise ValueError("please initialize the nodes using the initialize_nodes method")
-        self.nodes_init.loc[self.nodes_init["nodes"] == node, "init"] = init
+        self.nodes_init.set([node], init)
+    
+    def set_nodes_init(self, nodes_init):
+        # Sets or modifies the initial state of several nodes at once
+
+        # nodes_init (dict or list of str): initial state of each node ({node: 0 or 1}), or list of the names of nodes set initially present
+        #                                   (the state of the other nodes is not modified)
+        if hasattr(self, "nodes_init") == False:
+            raise ValueError("please initialize the nodes using the initialize_nodes method")
+        if hasattr(nodes_init, "items"):
+            self.nodes_init.set(list(nodes_init.keys()), list(nodes_init.values()))
+        else:
+            self.nodes_init.set(nodes_init)
 
     ###############################
     # Translation into an rr_list #
     ###############################
     
-    def create_rr(self, allow_appearance = True, strong_dependance = True, appearance_options = [], **kwd):
+    def interactions(self):
+        # Lists, for every node, the species with which it interacts, in a single pass over the edges
+        
+        # Returns a dict {node: (preys, secondary_preys, predators, competitors, mutuals)} of lists of node names.
+        # Edges are visited in the order of nx.to_pandas_edgelist (nodes order, then successors order), so that
+        # each list is ordered exactly as the former per-node pandas masks did. Edges of unknown kind are ignored.
+        neighbours = {node: ([], [], [], [], []) for node in self.nodes}
+        for source, target, kind in self.edges(data = "kind"):
+            if kind == "predation":
+                neighbours[source][0].append(target)
+                neighbours[target][2].append(source)
+            elif kind == "secondary_predation":
+                neighbours[source][1].append(target)
+            elif kind == "competition":
+                neighbours[target][3].append(source)
+            elif kind == "mutualism":
+                neighbours[target][4].append(source)
+        return neighbours
+    
+    def node_interactions(self, node, positions):
+        # Lists the species with which a single node interacts, in the same order as the interactions method
+        
+        # node (str): name of the node
+        # positions (dict): position of each node in self.nodes, i.e. {node: i for i, node in enumerate(self.nodes)}
+        # Returns the tuple (preys, secondary_preys, predators, competitors, mutuals)
+        preys = []
+        secondary_preys = []
+        for target, kind in self._succ[node].items():
+            kind = kind.get("kind")
+            if kind == "predation":
+                preys.append(target)
+            elif kind == "secondary_predation":
+                secondary_preys.append(target)
+        predators = []
+        competitors = []
+        mutuals = []
+        for source in sorted(self._pred[node], key = positions.__getitem__):
+            kind = self._pred[node][source].get("kind")
+            if kind == "predation":
+                predators.append(source)
+            elif kind == "competition":
+                competitors.append(source)
+            elif kind == "mutualism":
+                mutuals.append(source)
+        return preys, secondary_preys, predators, competitors, mutuals
+    
+    @stats_timed("create_rr")
+    def create_rr(self, allow_appearance = True, strong_dependance = True, appearance_options = [], incremental = False, **kwd):
         # Creates a rr_list object corresponding to the translation of the network
 
         # allow_appearance (bool): if True, species will be allowed to reappear.
@@ -75,6 +479,8 @@ class rr_network(nx.DiGraph):
         #       if "no_predator" is in the list, species can only appear if no main predator is present
         #       if "no_competitor" is in the list, species cannot appear if a competitor is present
         #       if "all_mutualists" is in the list, species can appear if all its mutuals are present
+        # incremental (bool): if True, the rules of each node are kept in a cache, and only the nodes whose links or attributes were modified
+        #       since the previous incremental call are translated again (same result as a complete translation)
         
         # Check of initialisation
         if hasattr(self, "nodes_init") == False:
@@ -91,76 +497,100 @@ class rr_network(nx.DiGraph):
         if hasattr(self, "nodes_init") == True:
             rr_out.nodes_init = list(self.nodes_init["init"])
         
-        edges = nx.to_pandas_edgelist(self)
+        if incremental == True:
+            # Only the nodes modified since the last call are translated, the rules of the other ones are taken from the cache
+            cache = self.update_translation(allow_appearance = allow_appearance, strong_dependance = strong_dependance, appearance_options = appearance_options)
+            with stats_phase("assembly"):
+                share_names(rr_out, cache["names"], cache["labels"])
+                fragments = [cache["fragments"][node] for node in self.nodes]
+                rr_out.rules.extend_packed(b"".join(fragment[0] for fragment in fragments), b"".join(fragment[1] for fragment in fragments))
+                rr_out.constraints.extend_packed(b"".join(fragment[2] for fragment in fragments), b"".join(fragment[3] for fragment in fragments))
+            return rr_out
         
-        for node in self.nodes:
-            
-            # Identification of species with which the node interacts
-
-            preys = list(edges["target"][(edges['source'] == node) & (edges["kind"] == "predation")])
-            secondary_preys = list(edges["target"][(edges['source'] == node) & (edges["kind"] == "secondary_predation")])
-            predators = list(edges["source"][(edges['target'] == node) & (edges["kind"] == "predation")])
-            competitors = list(edges["source"][(edges['target'] == node) & (edges["kind"] == "competition")])
-            mutuals = list(edges["source"][(edges['target'] == node) & (edges["kind"] == "mutualism")])
-            
-            # Rules corresponding to predation links #
-            
-            if len(preys + secondary_preys) > 0:
-                if "feature" in self.nodes[node]:
-                # exceptionif a species is autotroph : it will not disappear in the absence of its preys
-                    if self.nodes[node]["feature"] == "autotroph":
-                        rr_out.add_predation(node, preys_list = preys, secondary_preys = secondary_preys, autotroph = True, strong_dependance = strong_dependance)
-                else :
-                    rr_out.add_predation(node, preys_list = preys, secondary_preys = secondary_preys, strong_dependance = strong_dependance)
-
-            # Rules corresponding to competition links #
-
-            for competitor in competitors:
-                rr_out.add_competition(node, competitor, asymmetric = True) # The links in the network are asymmetric ; if competition is symmetric the link will appear once for each direction and the translation has therefore to be asymmetric
-                #rr_out.rules.append(create_rule(node, "+", competitor, "-"))
-                
-            # Rules corresponding to mutualism links #
-            
-            for mutual in mutuals:
-                rr_out.add_mutualism(node, mutual, asymmetric = True)
-                #rr_out.rules.append(create_rule(mutuals, "-", node, "-"))
-
-            ## Rules corresponding to the node's appearance #
-            
-            if allow_appearance == True:
-                # choice of other nodes that have to be absent from the system to allow the node to reappear:
-                absence_conditions = []
-                if "no_predator" in appearance_options:
-                    absence_conditions += predators
-                if "no_competitor" in appearance_options:
-                    absence_conditions += competitors
-                
-                # choice of other nodes that have to be present in the system to allow the node to reappear:
-                presence_conditions = []
-                if "all_mutualists" in appearance_options:
-                    presence_conditions += mutuals
-                    
-                if len(preys + secondary_preys) == 0:
-                # if the species has no preys, it has to be an autotroph
-                    rr_out.add_appearance(node, presence_conditions = presence_conditions, absence_conditions = absence_conditions)
-                else:
-                    # if autotroph, only absence conditions
-                    if "feature" in self.nodes[node]:
-                        if self.nodes[node]["feature"] == "autotroph":
-                            rr_out.add_appearance(node, presence_conditions = presence_conditions, absence_conditions = absence_conditions)
-                    # if not, duplication of the the rule for each prey
-                    else:
-                        for prey in preys:
-                            rr_out.add_appearance(node, absence_conditions = absence_conditions, presence_conditions = presence_conditions+[prey])
-                        if not "only_main_prey" in appearance_options:
-                            for prey in secondary_preys:
-                                rr_out.add_appearance(node, absence_conditions = absence_conditions, presence_conditions = presence_conditions+[prey])
-                    
+        # Identification of species with which each node interacts (single pass over the edges)
+        with stats_phase("interactions"):
+            neighbours = self.interactions()
+        
+        with stats_phase("translation"):
+            for node in self.nodes:
+                has_feature = "feature" in self.nodes[node]
+                autotroph = has_feature and self.nodes[node]["feature"] == "autotroph"
+                translate_node(rr_out, node, *neighbours[node], has_feature = has_feature, autotroph = autotroph,
+                               allow_appearance = allow_appearance, strong_dependance = strong_dependance, appearance_options = appearance_options)
                 
         return rr_out
     
     
-    def write_rr_file(self, filename, folder = "", sure = "?", universe = False, **kwd):
+    @stats_timed("update_translation")
+    def update_translation(self, allow_appearance = True, strong_dependance = True, appearance_options = []):
+        # Translates again the nodes modified since the last call (all nodes at the first call or if the options changed), and returns the cache:
+        # a dict with the options, the tables of names shared by the cached rules ("names", "labels") and the rules of each node
+        # ("fragments": {node: (rules codes, rules lengths, constraints codes, constraints lengths)}, see rr_rule_list.packed)
+        options = (allow_appearance, strong_dependance, tuple(appearance_options))
+        cache = self._rr_cache
+        if cache is None or cache["options"] != options:
+            if cache is None:
+                self._track()
+            cache = {"options": options, "names": rr_names(), "labels": rr_names(), "fragments": {}}
+            self._rr_cache = cache
+            modified = list(self.nodes)
+        else:
+            modified = [node for node in self._dirty if node in self._node]
+            for node in self._dirty:
+                if not node in self._node:
+                    cache["fragments"].pop(node, None)
+        self._dirty.clear()
+        stats_count("nodes_translated", len(modified))
+        if len(modified) == 0:
+            return cache
+        
+        # Temporary rr_list object sharing the tables of names of the cache, emptied after each node
+        rr_node = rr_list()
+        share_names(rr_node, cache["names"], cache["labels"])
+        positions = {node: i for i, node in enumerate(self.nodes)}
+        for node in modified:
+            has_feature = "feature" in self.nodes[node]
+            autotroph = has_feature and self.nodes[node]["feature"] == "autotroph"
+            translate_node(rr_node, node, *self.node_interactions(node, positions), has_feature = has_feature, autotroph = autotroph,
+                           allow_appearance = allow_appearance, strong_dependance = strong_dependance, appearance_options = appearance_options)
+            cache["fragments"][node] = rr_node.rules.packed() + rr_node.constraints.packed()
+            rr_node.rules.clear()
+            rr_node.constraints.clear()
+        return cache
+    
+    def iter_rr(self, allow_appearance = True, strong_dependance = True, appearance_options = [], minimize = False, removed = None, **kwd):
+        # Lazy version of create_rr: translates the network node by node and yields the rules as soon as they are created, without storing them.
+
+        # Same options as create_rr. Yields ("rules", rule) and ("constraints", constraint) tuples, the rules being character strings
+        # in the order in which create_rr would add them. The initialization of the nodes is not checked.
+        # minimize (bool): if True, the rules of each node are minimized (see rr_list.minimize) before being yielded: the rules that do not
+        #                  change the behaviour of the system among those of the node are not yielded
+        # removed (dict, optionnal): if given, the number of rules not yielded for each reason is added to it (see rr_list.minimize)
+        
+        # Temporary rr_list object, emptied after each node
+        rr_node = rr_list(nodes_list = list(self.nodes))
+        
+        # The neighbours are listed node by node, so that nothing proportional to the number of links is stored
+        positions = {node: i for i, node in enumerate(self.nodes)}
+        
+        for node in self.nodes:
+            has_feature = "feature" in self.nodes[node]
+            autotroph = has_feature and self.nodes[node]["feature"] == "autotroph"
+            translate_node(rr_node, node, *self.node_interactions(node, positions), has_feature = has_feature, autotroph = autotroph,
+                           allow_appearance = allow_appearance, strong_dependance = strong_dependance, appearance_options = appearance_options)
+            if minimize == True:
+                for reason, n in rr_node.minimize().items():
+                    if removed is not None:
+                        removed[reason] = removed.get(reason, 0) + n
+            for rule in rr_node.rules:
+                yield "rules", rule
+            for constraint in rr_node.constraints:
+                yield "constraints", constraint
+            rr_node.rules.clear()
+            rr_node.constraints.clear()
+    
+    @stats_timed("write_rr_file")
+    def write_rr_file(self, filename, folder = "", sure = "?", universe = False, stream = False, compression = None, minimize = None, **kwd):
         # Directly writes the .rr file translated from the network (the rr_list object is created but not stored)
 
         # filename (str): name of the file to create (without the .rr extension)
@@ -168,6 +598,12 @@ class rr_network(nx.DiGraph):
         # sure (str, "y" or "n"): if "y", will automatically override existing files without asking.
         #                         if "n", will automatically abort operation if the file already exists.
         # universe (bool): if True, writes the .rr file allowing to compute the state universe
+        # stream (bool): if True, no rr_list is created: the rules are written as they are generated (see iter_rr),
+        #                so that the memory used does not depend on the number of rules. The file is the same, up to minimization.
+        # compression (None, "gzip" or "xz"): if set, the file is compressed (and the .gz or .xz extension added)
+        # minimize (bool, optionnal): if True, the rules which do not change the behaviour of the system are not written (see rr_list.minimize ;
+        #                when streaming, only the rules of each node are compared). By default, True when streaming and False otherwise.
+        # Returns the number of rules and constraints removed by the minimization for each reason (see rr_list.minimize)
 
         # Check of nodes initialization
         if hasattr(self, "nodes_init") == False:
@@ -178,24 +614,891 @@ class rr_network(nx.DiGraph):
             else:
                 raise ValueError("aborted conversion to rr, please initialize the nodes properly") 
         
+        if stream == True:
+            complete_filename = rr_filename(filename, folder = folder, universe = universe, compression = compression)
+            check_overwrite(complete_filename, sure = sure)
+            
+            nodes_init = list(self.nodes_init["init"])
+            if universe == False and not len(nodes_init) == len(self.nodes):
+                warn("initialization of the nodes is incorrect, as the number of nodes is not equal to the number of initial values. All nodes have been initialized to 1.")
+                nodes_init = [1]*len(self.nodes)
+            
+            # The constraints (at most one per node) are kept aside while the rules are written, and written afterwards
+            constraints = []
+            removed = {"duplicates": 0, "subsumed": 0, "dead": 0}
+            def rules():
+                for section, rule in self.iter_rr(minimize = minimize != False, removed = removed, **kwd):
+                    if section == "constraints":
+                        constraints.append(rule)
+                    else:
+                        yield rule
+            
+            with open_rr(complete_filename, "w") as f:
+                write_rr(f, list(self.nodes), nodes_init, rules(), constraints, universe = universe)
+            return removed
+        
         # Creation of a temporary rr_list object
         temp_rr = self.create_rr(**kwd)
+        removed = temp_rr.minimize() if minimize == True else {"duplicates": 0, "subsumed": 0, "dead": 0}
         
         # Exportation of the .rr file
         if universe == True:
-            temp_rr.write_universe_file(filename = filename, folder = folder, sure = sure)
+            temp_rr.write_universe_file(filename = filename, folder = folder, sure = sure, compression = compression)
         else :
-            temp_rr.write_file(filename = filename, folder = folder, sure = sure)
+            temp_rr.write_file(filename = filename, folder = folder, sure = sure, compression = compression)
+        return removed
+    
+    ######################################
+    # Translation with several options   #
+    ######################################
+    
+    @stats_timed("sweep_translation")
+    def sweep_translation(self, variants = None):
+        # Translates the network for several sets of options of create_rr, computing what is common to several variants only once:
+        # the links are translated once for each value of strong_dependance, and the appearance rules of each node once for each
+        # combination of the appearance options that concern it (e.g. "no_predator" does not change anything for a top predator).
+        
+        # variants (list of dict, optionnal): options of create_rr of each variant (by default, all the combinations, see sweep_variants)
+        # Returns a dict with the variants, the list of nodes, the shared tables of names ("names", "labels") and the packed rules
+        # of each node, from which the rr_list of each variant is built by sweep_rr_list
+        if variants is None:
+            variants = sweep_variants()
+        variants = [dict({"allow_appearance": True, "strong_dependance": True, "appearance_options": []}, **options) for options in variants]
+        nodes = list(self.nodes)
+        cache = {"variants": variants, "nodes": nodes, "names": rr_names(), "labels": rr_names(),
+                 "links": {}, "appearance": [{} for node in nodes], "relevant": []}
+        
+        # Temporary rr_list object sharing the tables of names of the cache, emptied after each fragment
+        rr_node = rr_list()
+        share_names(rr_node, cache["names"], cache["labels"])
+        def pack():
+            fragment = rr_node.rules.packed() + rr_node.constraints.packed()
+            rr_node.rules.clear()
+            rr_node.constraints.clear()
+            return fragment
+        
+        strong_values = []
+        for options in variants:
+            if not options["strong_dependance"] in strong_values:
+                strong_values.append(options["strong_dependance"])
+        option_sets = set(tuple(options["appearance_options"]) for options in variants if options["allow_appearance"] == True)
+        
+        # Identification of species with which each node interacts (single pass over the edges)
+        neighbours = self.interactions()
+        
+        for strong_dependance in strong_values:
+            cache["links"][strong_dependance] = links = []
+            for node in nodes:
+                has_feature = "feature" in self.nodes[node]
+                autotroph = has_feature and self.nodes[node]["feature"] == "autotroph"
+                preys, secondary_preys, predators, competitors, mutuals = neighbours[node]
+                translate_links(rr_node, node, preys, secondary_preys, competitors, mutuals, has_feature = has_feature, autotroph = autotroph,
+                                strong_dependance = strong_dependance)
+                links.append(pack())
+        
+        for i, node in enumerate(nodes):
+            has_feature = "feature" in self.nodes[node]
+            autotroph = has_feature and self.nodes[node]["feature"] == "autotroph"
+            relevant = relevant_options(APPEARANCE_OPTIONS, *neighbours[node], has_feature = has_feature)
+            cache["relevant"].append(relevant)
+            for appearance_options in option_sets:
+                key = tuple(option for option in relevant if option in appearance_options)
+                if not key in cache["appearance"][i]:
+                    translate_appearance(rr_node, node, *neighbours[node], has_feature = has_feature, autotroph = autotroph, appearance_options = key)
+                    cache["appearance"][i][key] = pack()
+        return cache
+    
+    def sweep_rr(self, variants = None):
+        # Same as create_rr for several sets of options, the common part of the translations being only computed once (see sweep_translation)
+        
+        # variants (list of dict, optionnal): options of create_rr of each variant (by default, all the combinations, see sweep_variants)
+        # Yields (options, rr_list) tuples, in the order of the variants (the rr_list objects are created one at a time)
+        cache = self.sweep_translation(variants)
+        nodes_init = list(self.nodes_init["init"]) if hasattr(self, "nodes_init") == True else []
+        for options in cache["variants"]:
+            yield options, sweep_rr_list(cache, options, nodes_init)
+    
+    @stats_timed("write_sweep")
+    def write_sweep(self, filename, folder = "", variants = None, processes = None, sure = "?", universe = False, compression = None):
+        # Writes the .rr files of several variants of the translation, named after their options (see variant_name),
+        # e.g. "web_appearance-strong-no_predator.rr" for filename = "web"
+        
+        # variants (list of dict, optionnal): options of create_rr of each variant (by default, all the combinations, see sweep_variants)
+        # processes (int, optionnal): number of processes writing the files (by default, the number of CPUs ; 1 to write them in this process)
+        # sure, universe, compression: see write_rr_file
+        # Returns the list of the names of the files written, in the order of the variants
+        
+        # Check of nodes initialization
+        if hasattr(self, "nodes_init") == False:
+            answer = input("the nodes have not been initialized. Do you want to initialize them all to 1 ? (y/n)")
+            
+            if answer in["y","Y"]:
+                self.initialize_nodes(initially_present = list(self.nodes))
+            else:
+                raise ValueError("aborted conversion to rr, please initialize the nodes properly") 
+        
+        cache = self.sweep_translation(variants)
+        filenames = [filename + "_" + variant_name(options) for options in cache["variants"]]
+        complete_filenames = [rr_filename(name, folder = folder, universe = universe, compression = compression) for name in filenames]
+        for complete_filename in complete_filenames:
+            check_overwrite(complete_filename, sure = sure)
+        
+        tasks = [(options, name, folder, universe, compression) for options, name in zip(cache["variants"], filenames)]
+        nodes_init = list(self.nodes_init["init"])
+        processes = os.cpu_count() if processes is None else processes
+        if processes <= 1 or len(tasks) <= 1:
+            sweep_init(cache, nodes_init)
+            for task in tasks:
+                sweep_write(task)
+        else:
+            with multiprocessing.get_context().Pool(min(processes, len(tasks)), initializer = sweep_init, initargs = (cache, nodes_init)) as pool:
+                pool.map(sweep_write, tasks)
+        return complete_filenames
+    
+    ##########################################
+    # Aggregation of interchangeable species #
+    ##########################################
+    
+    @stats_timed("symmetry_classes")
+    def symmetry_classes(self, use_init = True, split_linked = False):
+        # Finds the classes of interchangeable species: species with the same feature (and initial state), and the same numbers of preys,
+        # secondary preys, predators, competitors and mutuals in each class (coarsest equitable partition of the typed links, computed by
+        # partition refinement). Two species exchanged by a symmetry of the network are always in the same class.
+        
+        # use_init (bool): if True and the nodes are initialized, species with different initial states are never in the same class
+        # split_linked (bool): if True, the classes containing species linked to each other (e.g. two competitors) are split into single
+        # species, and the other classes are refined again, so that no link joins two species of the same class (see aggregate)
+        # Returns the list of the classes (lists of nodes in the order of self.nodes), ordered by their first node
+        nodes = list(self.nodes)
+        positions = {node: i for i, node in enumerate(nodes)}
+        links = [(positions[source], positions[target], kind) for source, target, kind in self.edges(data = "kind")]
+        init = self.nodes_init if use_init == True and hasattr(self, "nodes_init") == True else None
+        keys = [(str(self.nodes[node].get("feature")), None if init is None or not node in init.positions else init.get(node)) for node in nodes]
+        colours = partition_colours(keys)
+        n_classes = max(colours, default = -1) + 1
+        while True:
+            # Refinement of each class by the multiset of the (direction, kind, class) of the links of its species
+            signatures = [[] for node in nodes]
+            for source, target, kind in links:
+                signatures[source].append((1, kind, colours[target]))
+                signatures[target].append((0, kind, colours[source]))
+            colours = partition_colours([(colours[i], tuple(sorted(signature, key = str))) for i, signature in enumerate(signatures)])
+            n_refined = max(colours, default = -1) + 1
+            if n_refined == n_classes:
+                linked = {colours[source] for source, target, kind in links if split_linked == True and source != target and colours[source] == colours[target]}
+                if len(linked) == 0:
+                    break
+                colours = partition_colours([(colour, i if colour in linked else None) for i, colour in enumerate(colours)])
+                n_refined = max(colours) + 1
+            n_classes = n_refined
+        classes = [[] for k in range(n_classes)]
+        for node, colour in zip(nodes, colours):
+            classes[colour].append(node)
+        return classes
+    
+    def aggregate(self, classes = None, use_init = True):
+        # Collapses each class of interchangeable species into one of its species (its representative), to translate a smaller network
+        # whose state space is explored much faster. The results can be expanded back to all the species with expand_states.
+        # The aggregated model is an approximation of the original one: it only contains the states in which the species of a class
+        # are all present or all absent, and the transitions between them, so that the states and the attractors of the original model
+        # which separate the species of a class are lost.
+        
+        # classes (list of lists of nodes, optionnal): partition of the nodes without links between two species of the same class (by
+        # default, given by symmetry_classes with split_linked)
+        # use_init (bool): see symmetry_classes
+        # Returns (network, classes): the aggregated rr_network, whose nodes are the representatives (first species of each class) with
+        # their attributes and initial states, and the dict {representative: list of the species of its class}
+        if classes is None:
+            classes = self.symmetry_classes(use_init = use_init, split_linked = True)
+        representative = {}
+        for members in classes:
+            for node in members:
+                if not node in self._node:
+                    raise ValueError("node {0} of the classes is not in the network".format(node))
+                if node in representative:
+                    raise ValueError("node {0} is in several classes".format(node))
+                representative[node] = members[0]
+        missing = [node for node in self.nodes if not node in representative]
+        if len(missing) > 0:
+            raise ValueError("the classes do not contain the nodes {0}".format(missing))
+        
+        reduced = rr_network()
+        reduced.add_nodes_from((members[0], dict(self.nodes[members[0]])) for members in classes)
+        kinds = {}
+        for source, target, kind in self.edges(data = "kind"):
+            link = (representative[source], representative[target])
+            if source != target and link[0] == link[1]:
+                # The link would become a link of the representative with itself (e.g. competing species would make it disappear by itself)
+                raise ValueError("nodes {0} and {1} are linked ({2}) but in the same class".format(source, target, kind))
+            if kinds.setdefault(link, kind) != kind:
+                raise ValueError("the links from {0} to {1} do not have the same kind in the classes ({2} and {3})".format(*link, kinds[link], kind))
+        reduced.add_links_from([link[0] for link in kinds], [link[1] for link in kinds], list(kinds.values()))
+        if hasattr(self, "nodes_init") == True:
+            reduced.initialize_nodes(values = [self.nodes_init.get(node) if node in self.nodes_init.positions else 0 for node in reduced.nodes])
+        return reduced, {members[0]: list(members) for members in classes}
+    
+    def expand_states(self, states, classes):
+        # Expands the states of an aggregated network (see aggregate) to all the species: each species is present if its representative is
+        # The expanded states only approximate those of the original model: the species of a class are always all present or all absent.
+        
+        # states (boolean matrix with one column per node of the aggregated network, or rr_state_space object of its translation)
+        # classes (dict): {representative: list of the species of its class}, as returned by aggregate
+        # Returns a boolean matrix with one row per state and one column per node of self.nodes (see state_matrix)
+        if hasattr(states, "to_matrix"):
+            matrix = states.to_matrix()
+            columns = {node: i for i, node in enumerate(states.nodes)}
+            columns = {representative: columns[str(representative)] for representative in classes}
+        else:
+            matrix = np.asarray(states, dtype = bool)
+            if matrix.ndim == 1:
+                matrix = matrix[None, :]
+            if not matrix.ndim == 2 or not matrix.shape[1] == len(classes):
+                raise ValueError("the states should be given as a matrix with one column per class ({0} classes), not of shape {1}".format(len(classes), matrix.shape))
+            columns = {representative: i for i, representative in enumerate(classes)}
+        column = {}
+        for representative, members in classes.items():
+            for node in members:
+                column[node] = columns[representative]
+        return matrix[:, [column[node] for node in self.nodes]]
+    
+    ##########################################
+    # Independent components                 #
+    ##########################################
+    
+    def components(self):
+        # Finds the independent components of the network: the rules of a species only refer to the species linked to it (preys and
+        # secondary preys, predators in the appearance conditions, competitors, mutuals), so that species which are not connected by
+        # links of any kind never appear in the same rule. Links of unknown kind (not in INTERACTION_KINDS), ignored by create_rr, are ignored.
+        # Returns the list of the components (weakly connected components of the links, lists of nodes in the order of self.nodes),
+        # ordered by their first node. The state space of the network is contained in the product of those of its components (see rr_composition).
+        linked = nx.Graph()
+        linked.add_nodes_from(self.nodes)
+        linked.add_edges_from((source, target) for source, target, kind in self.edges(data = "kind") if kind in INTERACTION_KINDS)
+        positions = {node: i for i, node in enumerate(self.nodes)}
+        components = [sorted(component, key = positions.__getitem__) for component in nx.connected_components(linked)]
+        components.sort(key = lambda component: positions[component[0]])
+        return components
+    
+    def component_network(self, nodes):
+        # Returns the network made of some species and of the links between them, with their attributes and initial states
+        # (a copy: self is not modified). Its translation contains the rules of these species in the translation of self, in the same order.
+        
+        # nodes (list of str): species of the network, e.g. a component given by components (in the order of self.nodes)
+        for node in nodes:
+            if not node in self._node:
+                raise ValueError("node {0} not defined !".format(node))
+        network = rr_network()
+        network.add_nodes_from((node, dict(self.nodes[node])) for node in nodes)
+        network.add_edges_from((source, target, dict(data)) for source, target, data in self.subgraph(nodes).edges(data = True))
+        if hasattr(self, "nodes_init") == True:
+            network.initialize_nodes(values = [self.nodes_init.get(node) if node in self.nodes_init.positions else 0 for node in network.nodes])
+        return network
+    
+    @stats_timed("analyse_components")
+    def analyse_components(self, analysis = "explore", processes = None, components = None, filename = None, folder = "", sure = "?",
+                           universe = False, compression = None, analysis_options = {}, **kwd):
+        # Translates and analyses each independent component of the network separately (see components), in a pool of worker processes.
+        # The state space of a component is usually tiny compared to that of the whole network (the product of those of the components).
+        
+        # analysis (str, callable or None): analysis of the rr_list of each component:
+        #       "explore" (rr_list.explore), "attractors" (rr_list.attractors), "simulate" (rr_list.simulate, component k using the seed [seed, k]),
+        #       a function f(rr_list, **analysis_options) returning any result (defined at the top level of a module, to be sent to the workers),
+        #       or None to only translate the components
+        # processes (int, optionnal): number of worker processes (by default, the number of CPUs ; 1 to work in this process)
+        # components (list of lists of nodes, optionnal): the components (by default, given by components)
+        # filename (str, optionnal): if given, the .rr file of each component k (from 1) is written as filename_component{k}.rr,
+        #       and a manifest describing them as filename_components.json (see write_components)
+        # folder, sure, universe, compression: see write_rr_file
+        # analysis_options (dict): arguments of the analysis (e.g. {"max_states": 10**6} or {"n_trajectories": 10000, "seed": 1})
+        # kwd: options of create_rr
+        # Returns a rr_composition object, composing the results of the components into answers for the whole network
+        if hasattr(self, "nodes_init") == False:
+            answer = input("the nodes have not been initialized. Do you want to initialize them all to 1 ? (y/n)")
+            
+            if answer in["y","Y"]:
+                self.initialize_nodes(initially_present = list(self.nodes))
+            else:
+                raise ValueError("aborted conversion to rr, please initialize the nodes properly") 
+        if type(analysis) == str and not analysis in ("explore", "attractors", "simulate"):
+            raise ValueError("unknown analysis '{0}' (has to be 'explore', 'attractors', 'simulate', a function or None)".format(analysis))
+        if components is None:
+            components = self.components()
+        
+        names = [None]*len(components)
+        if filename is not None:
+            names = ["{0}_component{1}".format(filename, k + 1) for k in range(len(components))]
+            complete_filenames = [rr_filename(name, folder = folder, universe = universe, compression = compression) for name in names]
+            manifest_filename = folder + filename + "_components.json"
+            for complete_filename in complete_filenames + [manifest_filename]:
+                check_overwrite(complete_filename, sure = sure)
+        
+        tasks = [(k, self.component_network(nodes), kwd, name, folder, universe, compression, analysis, analysis_options)
+                 for k, (nodes, name) in enumerate(zip(components, names))]
+        # the largest components are started first
+        tasks.sort(key = lambda task: -len(task[1]))
+        processes = os.cpu_count() if processes is None else processes
+        if processes <= 1 or len(tasks) <= 1:
+            results = [component_task(task) for task in tasks]
+        else:
+            with multiprocessing.get_context().Pool(min(processes, len(tasks))) as pool:
+                results = pool.map(component_task, tasks, chunksize = 1)
+        results.sort(key = lambda result: result["component"])
+        
+        manifest = None
+        if filename is not None:
+            manifest = {"network": filename, "options": kwd, "universe": universe,
+                        "components": [{"file": os.path.basename(result["file"]), "nodes": [str(node) for node in nodes],
+                                        "rules": result["rules"], "constraints": result["constraints"]}
+                                       for nodes, result in zip(components, results)]}
+            import json
+            with open(manifest_filename, "w") as f:
+                json.dump(manifest, f, indent = 1)
+        stats_count("components", len(components))
+        return rr_composition(components, [result["result"] for result in results], analysis = analysis, nodes = list(self.nodes),
+                              manifest = manifest)
+    
+    def write_components(self, filename, folder = "", processes = None, sure = "?", universe = False, compression = None, **kwd):
+        # Writes the .rr file of each independent component of the network (filename_component1.rr, ...), translated in a pool of worker
+        # processes, and the manifest filename_components.json: the options of the translation and, for each component, its file, its nodes
+        # and its numbers of rules and constraints. Concatenating the rules of the files gives the rules of the whole network (by node).
+        
+        # Same arguments as analyse_components. Returns the manifest (dict)
+        return self.analyse_components(analysis = None, processes = processes, filename = filename, folder = folder, sure = sure,
+                                       universe = universe, compression = compression, **kwd).manifest
     
     #########
     # Other #
     #########
     
     def network_from_state(self, present):
-        # Allows to obtain the ecological network corresponding to a given state (i.e. removing all absent nodes), for example to compute its structure.
+        # Allows to obtain the ecological network corresponding to a given state (i.e. without the absent nodes), for example to compute its structure.
+        # The network is a read-only view of self: nothing is copied and self is not modified (use .copy() to get a modifiable network).
+        
+        # present (list of str, or boolean array in the order of self.nodes): active nodes
+        if hasattr(present, "dtype") and present.dtype == bool:
+            present = [node for node, on in zip(self.nodes, present.tolist()) if on]
+        return self.subgraph(present)
+    
+    def state_views(self, states):
+        # Yields the networks of many states (see network_from_state), as read-only views of self
+        
+        # states (boolean matrix, one row per state and one column per node of self.nodes, or rr_state_space object)
+        for row in self.state_matrix(states):
+            yield self.network_from_state(row)
+    
+    def state_matrix(self, states):
+        # Returns states as a boolean matrix with one row per state and one column per node of self.nodes
+        
+        # states (boolean matrix, or rr_state_space object whose nodes are matched by name ; the nodes it does not contain are absent)
+        if hasattr(states, "to_matrix"):
+            matrix = states.to_matrix()
+            columns = {node: i for i, node in enumerate(states.nodes)}
+            present = np.zeros((len(matrix), self.number_of_nodes()), dtype = bool)
+            for k, node in enumerate(self.nodes):
+                if str(node) in columns:
+                    present[:, k] = matrix[:, columns[str(node)]]
+            return present
+        present = np.asarray(states, dtype = bool)
+        if present.ndim == 1:
+            present = present[None, :]
+        if not present.ndim == 2 or not present.shape[1] == self.number_of_nodes():
+            raise ValueError("the states should be given as a matrix with one column per node ({0} nodes), not of shape {1}".format(self.number_of_nodes(), present.shape))
+        return present
+    
+    def links_arrays(self, kinds = ["predation", "secondary_predation"]):
+        # Returns the adjacency matrix of the links of the given kinds in coordinate form: (sources, targets), numpy arrays of the
+        # positions in self.nodes of the source (e.g. predator) and target (e.g. prey) of each link
+        positions = {node: i for i, node in enumerate(self.nodes)}
+        links = [(positions[source], positions[target]) for source, target, kind in self.edges(data = "kind") if kind in kinds]
+        if len(links) == 0:
+            return np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64)
+        sources, targets = np.array(links, dtype = np.int64).T
+        return sources, targets
+    
+    def states_structure(self, states, kinds = ["predation", "secondary_predation"], links = None, chunk_size = None):
+        # Structural metrics of many states at once, computed with numpy for blocks of states, without building their networks
+        
+        # states (boolean matrix, one row per state and one column per node of self.nodes, or rr_state_space object)
+        # kinds (list of str): kinds of the links taken into account
+        # links (tuple of arrays, optionnal): adjacency given by self.links_arrays(kinds), to avoid computing it again for each call
+        # chunk_size (int, optionnal): number of states processed at once (by default, chosen to keep the temporary arrays small)
+        # Returns a dict of arrays with one value per state (see structure_metrics)
+        sources, targets = self.links_arrays(kinds) if links is None else links
+        return structure_metrics(self.state_matrix(states), sources, targets, chunk_size = chunk_size)
+
+################### Tables of links ###################
+
+# Kinds of links understood by create_rr (see rr_network.interactions)
+INTERACTION_KINDS = ["predation", "secondary_predation", "competition", "mutualism"]
+
+def check_kinds(kinds):
+    # Raises a ValueError if some kinds of links are not understood by create_rr (they would be silently ignored)
+    unknown = set(kinds).difference(INTERACTION_KINDS)
+    if len(unknown) > 0:
+        raise ValueError("unknown kinds of links: {0} (have to be among {1})".format(sorted(unknown, key = str), INTERACTION_KINDS))
+
+def column_list(column):
+    # Converts a column of a table (pandas Series, numpy array or list) into a list of python objects
+    if hasattr(column, "tolist"):
+        return column.tolist()
+    return list(column)
+
+################### Structure of the states ###################
+
+# Maximal number of elements of the temporary arrays of structure_metrics (states x links)
+STRUCTURE_BLOCK_SIZE = 1 << 20
+
+def structure_metrics(present, sources, targets, chunk_size = None):
+    # Structural metrics of many states of a network, computed for blocks of states with numpy
+    
+    # present (boolean numpy array): one row per state and one column per node, True if the node is present
+    # sources, targets (int numpy arrays): positions of the source (e.g. predator) and target (e.g. prey) of each link
+    # chunk_size (int, optionnal): number of states processed at once
+    # Returns a dict of numpy arrays, one value per state:
+    #       "species": number of present species S
+    #       "links": number of links L between present species
+    #       "connectance": L / S^2 (0 if no species is present)
+    #       "components": number of weakly connected components of the present species (an isolated species being a component)
+    #       "basal": number of present species without present preys (the targets of their links)
+    #       "max_trophic_level", "mean_trophic_level": shortest trophic levels of the present species, 1 for the basal species and
+    #           1 + the lowest level of their present preys for the others (species only feeding in a loop have no level and are not counted)
+    present = np.asarray(present, dtype = bool)
+    n_states, n = present.shape
+    sources = np.asarray(sources, dtype = np.int64)
+    targets = np.asarray(targets, dtype = np.int64)
+    loops = sources == targets
+    preys = link_groups(sources[~loops], targets[~loops])
+    neighbours = link_groups(np.concatenate([sources, targets]), np.concatenate([targets, sources]))
+    if chunk_size is None:
+        chunk_size = max(1, STRUCTURE_BLOCK_SIZE // max(1, n, 2*len(sources)))
+    
+    metrics = {"species": np.zeros(n_states, dtype = np.int64), "links": np.zeros(n_states, dtype = np.int64),
+               "components": np.zeros(n_states, dtype = np.int64), "basal": np.zeros(n_states, dtype = np.int64),
+               "max_trophic_level": np.zeros(n_states, dtype = np.int64), "mean_trophic_level": np.zeros(n_states)}
+    for start in range(0, n_states, chunk_size):
+        block = slice(start, start + chunk_size)
+        X = present[block]
+        metrics["species"][block] = X.sum(axis = 1)
+        present_links = X[:, sources] & X[:, targets]
+        metrics["links"][block] = present_links.sum(axis = 1)
+        metrics["components"][block] = count_components(X, sources, targets, present_links, neighbours)
+        levels = shortest_trophic_levels(X, preys)
+        metrics["basal"][block] = (levels == 1).sum(axis = 1)
+        metrics["max_trophic_level"][block] = levels.max(axis = 1, initial = 0)
+        with np.errstate(invalid = "ignore", divide = "ignore"):
+            metrics["mean_trophic_level"][block] = levels.sum(axis = 1)/(levels > 0).sum(axis = 1)
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        metrics["connectance"] = np.where(metrics["species"] > 0, metrics["links"]/np.maximum(metrics["species"], 1)**2, 0.0)
+    return metrics
+
+def link_groups(keys, values):
+    # Groups the links by key: returns (nodes, values, starts), the values of nodes[k] being values[starts[k]:starts[k+1]]
+    order = np.argsort(keys, kind = "stable")
+    nodes, starts = np.unique(keys[order], return_index = True)
+    return nodes, values[order], starts
+
+def any_of_group(values, groups, n):
+    # For a boolean matrix values (states x nodes), tells for each node if one of the nodes of its group is True (see link_groups)
+    nodes, members, starts = groups
+    result = np.zeros((len(values), n), dtype = bool)
+    if len(members) > 0:
+        result[:, nodes] = np.logical_or.reduceat(values[:, members], starts, axis = 1)
+    return result
+
+def shortest_trophic_levels(X, preys):
+    # Shortest trophic level of each present species in each state (0 if absent or without level), see structure_metrics
+    n = X.shape[1]
+    levels = np.zeros(X.shape, dtype = np.int64)
+    frontier = X & ~any_of_group(X, preys, n)
+    level = 1
+    while frontier.any():
+        levels[frontier] = level
+        level += 1
+        frontier = any_of_group(frontier, preys, n) & X & (levels == 0)
+    return levels
+
+def count_components(X, sources, targets, present_links, neighbours):
+    # Number of weakly connected components of the present species in each state
+    # With scipy, the networks of all the states form a single graph (one copy of the species per state) whose components are computed at once.
+    # Otherwise, each species takes the lowest position of its present neighbours until nothing changes (with pointer jumping),
+    # the components being counted by their lowest species.
+    n_states, n = X.shape
+    try:
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+    except ImportError:
+        connected_components = None
+    if connected_components is not None:
+        states, links = np.nonzero(present_links)
+        graph = coo_matrix((np.ones(len(links), dtype = np.int8), (states*n + sources[links], states*n + targets[links])), shape = (n_states*n, n_states*n))
+        n_components, labels = connected_components(graph, directed = True, connection = "weak")
+        present = np.flatnonzero(X.ravel())
+        component_state = np.full(n_components, -1)
+        component_state[labels[present]] = present // n
+        return np.bincount(component_state[component_state >= 0], minlength = n_states)
+    
+    nodes, members, starts = neighbours
+    labels = np.where(X, np.arange(n, dtype = np.int32), n).astype(np.int32)
+    while len(members) > 0:
+        lowest = np.minimum.reduceat(np.where(X[:, members], labels[:, members], n), starts, axis = 1)
+        updated = labels.copy()
+        updated[:, nodes] = np.minimum(labels[:, nodes], np.where(X[:, nodes], lowest, n))
+        padded = np.concatenate([updated, np.full((n_states, 1), n, dtype = np.int32)], axis = 1)
+        updated = np.minimum(updated, np.take_along_axis(padded, updated, axis = 1))
+        if np.array_equal(updated, labels):
+            break
+        labels = updated
+    return (X & (labels == np.arange(n))).sum(axis = 1)
+
+################### Independent components ###################
+
+# The rules of the components of a network are independent, but not their constraints: in the whole network, a constraint that can be
+# fired in a component prevents the rules of all the other components from being fired (constraints have priority). Hence:
+#   - the stable states of the network are exactly the combinations of stable states of its components, and each component follows its
+#     own dynamics (it is only delayed), so that the outcomes of simulations are those of independent components, with the product
+#     of their probabilities, as long as the trajectories reach a stable state
+#   - the states reached by the network are combinations of the states reached by its components, but a combination in which
+#     constraints can be fired in several components may not be reached: the product of the numbers of states is an upper bound,
+#     reached when at most one component has constraints, and the same holds for the transitions and the basins of the attractors.
+
+
+def component_task(task):
+    # Translates and analyses a component (used by rr_network.analyse_components, possibly in a worker process)
+    k, network, options, filename, folder, universe, compression, analysis, analysis_options = task
+    rr_out = network.create_rr(**options)
+    complete_filename = None
+    if filename is not None:
+        complete_filename = rr_filename(filename, folder = folder, universe = universe, compression = compression)
+        if universe == True:
+            rr_out.write_universe_file(filename = filename, folder = folder, sure = "y", compression = compression)
+        else:
+            rr_out.write_file(filename = filename, folder = folder, sure = "y", compression = compression)
+    if analysis is None:
+        result = None
+    elif analysis == "explore":
+        result = rr_out.explore(**analysis_options)
+    elif analysis == "attractors":
+        result = rr_out.attractors(**analysis_options)
+    elif analysis == "simulate":
+        analysis_options = dict(analysis_options)
+        if analysis_options.get("seed") is not None:
+            analysis_options["seed"] = [analysis_options["seed"], k]
+        result = rr_out.simulate(**analysis_options)
+    else:
+        result = analysis(rr_out, **analysis_options)
+    return {"component": k, "file": complete_filename, "rules": len(rr_out.rules), "constraints": len(rr_out.constraints), "result": result}
+
+
+class rr_composition():
+    # Results of the analyses of the independent components of a network (see rr_network.analyse_components), composed into answers for
+    # the whole network (see the remarks above on the constraints). It can also be built from results computed separately.
+
+    # components (list of lists of str): nodes of each component
+    # results (list): result of the analysis of each component (rr_state_space for "explore", list of attractors for "attractors",
+    #       rr_simulation for "simulate")
+    # analysis (str or callable): analysis done
+    # nodes (list of str, optionnal): nodes of the network, giving the order of the nodes in the answers (by default, those of the components)
+    # manifest (dict or None): manifest of the files written (see rr_network.write_components)
+
+    def __init__(self, components, results, analysis = "explore", nodes = None, manifest = None):
+        if not len(components) == len(results):
+            raise ValueError("there should be one result per component ({0} components, {1} results)".format(len(components), len(results)))
+        self.components = components
+        self.results = results
+        self.analysis = analysis
+        self.nodes = [node for component in components for node in component] if nodes is None else nodes
+        self.manifest = manifest
+        # the nodes are matched by name (the results of the analyses name them with str)
+        self._positions = {str(node): i for i, node in enumerate(self.nodes)}
+        self._component = {str(node): k for k, component in enumerate(components) for node in component}
+
+    def __len__(self):
+        return len(self.components)
+
+    def component(self, node):
+        # Returns the index of the component of a node
+        if not str(node) in self._component:
+            raise ValueError("node {0} not defined !".format(node))
+        return self._component[str(node)]
+
+    def _check(self, *analyses):
+        if not self.analysis in analyses:
+            raise ValueError("this answer needs the analysis {0} of the components (not {1})".format(" or ".join(analyses), self.analysis))
+
+    def _merge(self, node_lists):
+        # Union of lists of nodes of different components, in the order of self.nodes
+        return sorted((node for nodes in node_lists for node in nodes), key = lambda node: self._positions.get(str(node), len(self._positions)))
+
+    ######## "explore"
+
+    def n_states(self):
+        # Number of combinations of the states reached by the components (upper bound of the number of states reached by the network)
+        self._check("explore")
+        n_states = 1
+        for space in self.results:
+            n_states *= len(space)
+        return n_states
+
+    def stable_counts(self):
+        # Returns the number of stable states (in which nothing can be fired) of each component
+        self._check("explore")
+        return [len(stable_states(space)) for space in self.results]
+
+    def n_stable(self):
+        # Number of stable states reached by the network (product of those of the components)
+        n_stable = 1
+        for count in self.stable_counts():
+            n_stable *= count
+        return n_stable
+
+    def stable_states(self):
+        # Yields the stable states reached by the network, as lists of the nodes present (there are n_stable() of them)
+        self._check("explore")
+        per_component = [[space.present(state) for state in stable_states(space).tolist()] for space in self.results]
+        for combination in product(*per_component):
+            yield self._merge(combination)
+
+    ######## "attractors"
+
+    def attractors(self):
+        # Yields the combinations of the attractors of the components (one attractor of the network each, see the remarks above),
+        # as dicts with the nodes "present" in all its states and "variable" in some of them, its "size" and its "basin" (products
+        # of those of the attractors of the components), and the index of the attractor of each component ("attractors")
+        self._check("attractors")
+        for combination in product(*[list(enumerate(attractors)) for attractors in self.results]):
+            size = 1
+            basin = 1
+            for i, attractor in combination:
+                size *= attractor["size"]
+                basin *= attractor["basin"]
+            yield {"present": self._merge(attractor["present"] for i, attractor in combination),
+                   "variable": self._merge(attractor["variable"] for i, attractor in combination),
+                   "size": size, "basin": basin, "attractors": [i for i, attractor in combination]}
+
+    ######## "simulate"
+
+    def presence(self):
+        # Returns {node: frequency of the trajectories in which it is present at the end}
+        self._check("simulate")
+        presence = {}
+        for simulation in self.results:
+            presence.update(simulation.presence())
+        return {node: presence[node] for node in self._merge([presence])}
+
+    def probability(self, present):
+        # Estimated probability that the network ends in the community in which the nodes of present (list of str) are present,
+        # i.e. the product of the frequencies of its restrictions to the components
+        self._check("simulate")
+        present = set(str(node) for node in present)
+        for node in present:
+            self.component(node)
+        probability = 1.0
+        for component, simulation in zip(self.components, self.results):
+            community = [str(node) for node in component if str(node) in present]
+            frequency = 0.0
+            for outcome in simulation.outcomes():
+                if outcome["present"] == community:
+                    frequency = float(outcome["frequency"])
+            probability *= frequency
+        return probability
+
+    def outcomes(self, limit = 10):
+        # Returns the limit most probable final communities of the network (combinations of the outcomes of the components, with the
+        # product of their frequencies), as dicts with the nodes "present", the "probability", whether the community is "stable" and the
+        # index of the outcome of each component ("outcomes", see rr_simulation.outcomes), by decreasing probability
+        self._check("simulate")
+        per_component = [simulation.outcomes() for simulation in self.results]
+        if any(len(outcomes) == 0 for outcomes in per_component):
+            return []
+        def probability(indices):
+            value = 1.0
+            for outcomes, i in zip(per_component, indices):
+                value *= float(outcomes[i]["frequency"])
+            return value
+        # best-first enumeration of the combinations (the outcomes of each component are sorted by decreasing frequency)
+        first = (0,)*len(per_component)
+        heap = [(-probability(first), first)]
+        seen = {first}
+        combined = []
+        while len(heap) > 0 and len(combined) < limit:
+            value, indices = heapq.heappop(heap)
+            chosen = [outcomes[i] for outcomes, i in zip(per_component, indices)]
+            combined.append({"present": self._merge(outcome["present"] for outcome in chosen), "probability": -value,
+                             "stable": all(outcome["stable"] for outcome in chosen), "outcomes": list(indices)})
+            for k in range(len(indices)):
+                if indices[k] + 1 < len(per_component[k]):
+                    following = indices[:k] + (indices[k] + 1,) + indices[k+1:]
+                    if not following in seen:
+                        seen.add(following)
+                        heapq.heappush(heap, (-probability(following), following))
+        return combined
+
+
+def stable_states(space):
+    # Returns the states of a complete state space (rr_state_space) in which nothing can be fired
+    if space.complete == False:
+        raise ValueError("the stable states of an incomplete exploration (max_states) are not known")
+    return space.states[~np.isin(space.states, space.sources)]
+
+
+################### Aggregation of interchangeable species ###################
+
+def partition_colours(keys):
+    # Numbers the distinct keys in the order of their first occurrence: returns the list of the class of each key (0, 1, ...)
+    numbers = {}
+    return [numbers.setdefault(key, len(numbers)) for key in keys]
+
+################### Translation of a single node ###################
+
+# Options of create_rr modifying the appearance rules
+APPEARANCE_OPTIONS = ["only_main_prey", "no_predator", "no_competitor", "all_mutualists"]
+
+def translate_node(rr_out, node, preys, secondary_preys, predators, competitors, mutuals, has_feature = False, autotroph = False,
+                   allow_appearance = True, strong_dependance = True, appearance_options = []):
+    # Adds to rr_out the rules corresponding to the links of a given node (used by rr_network.create_rr)
+
+    # rr_out (rr_list): rr_list object in which the rules are written (its nodes are assumed to contain all the species involved)
+    # node (str): name of the node
+    # preys, secondary_preys, predators, competitors, mutuals (lists of str): species interacting with the node (see rr_network.interactions)
+    # has_feature (bool): True if the node has a "feature" attribute
+    # autotroph (bool): True if this feature is "autotroph"
+    # allow_appearance, strong_dependance, appearance_options: see rr_network.create_rr
+    translate_links(rr_out, node, preys, secondary_preys, competitors, mutuals, has_feature = has_feature, autotroph = autotroph,
+                    strong_dependance = strong_dependance)
+    if allow_appearance == True:
+        translate_appearance(rr_out, node, preys, secondary_preys, predators, competitors, mutuals, has_feature = has_feature,
+                             autotroph = autotroph, appearance_options = appearance_options)
+
+
+def translate_links(rr_out, node, preys, secondary_preys, competitors, mutuals, has_feature = False, autotroph = False, strong_dependance = True):
+    # Adds to rr_out the rules of the predation, competition and mutualism links of a node (first part of translate_node)
+    
+    # Rules corresponding to predation links #
+    
+    if len(preys + secondary_preys) > 0:
+        if has_feature:
+        # exception if a species is autotroph : it will not disappear in the absence of its preys
+            if autotroph:
+                rr_out.add_predation(node, preys_list = preys, secondary_preys = secondary_preys, autotroph = True, strong_dependance = strong_dependance, check_nodes = False)
+        else :
+            rr_out.add_predation(node, preys_list = preys, secondary_preys = secondary_preys, strong_dependance = strong_dependance, check_nodes = False)
+
+    # Rules corresponding to competition links #
+
+    for competitor in competitors:
+        rr_out.add_competition(node, competitor, asymmetric = True, check_nodes = False) # The links in the network are asymmetric ; if competition is symmetric the link will appear once for each direction and the translation has therefore to be asymmetric
+        
+    # Rules corresponding to mutualism links #
+    
+    for mutual in mutuals:
+        rr_out.add_mutualism(node, mutual, asymmetric = True, check_nodes = False)
+
+
+def translate_appearance(rr_out, node, preys, secondary_preys, predators, competitors, mutuals, has_feature = False, autotroph = False, appearance_options = []):
+    # Adds to rr_out the rules corresponding to the node's appearance (second part of translate_node, if allow_appearance)
+    
+    # choice of other nodes that have to be absent from the system to allow the node to reappear:
+    absence_conditions = []
+    if "no_predator" in appearance_options:
+        absence_conditions += predators
+    if "no_competitor" in appearance_options:
+        absence_conditions += competitors
+    
+    # choice of other nodes that have to be present in the system to allow the node to reappear:
+    presence_conditions = []
+    if "all_mutualists" in appearance_options:
+        presence_conditions += mutuals
         
-        # present (list of str): list of the names of active nodes.
-        temp_net = self
-        for off_node in set(self.nodes) - set(present):
-            temp_net.remove_node(off_node)
-        return temp_net
\ No newline at end of file
+    if len(preys + secondary_preys) == 0:
+    # if the species has no preys, it has to be an autotroph
+        rr_out.add_appearance(node, presence_conditions = presence_conditions, absence_conditions = absence_conditions)
+    else:
+        # if autotroph, only absence conditions
+        if has_feature:
+            if autotroph:
+                rr_out.add_appearance(node, presence_conditions = presence_conditions, absence_conditions = absence_conditions)
+        # if not, duplication of the the rule for each prey
+        else:
+            for prey in preys:
+                rr_out.add_appearance(node, absence_conditions = absence_conditions, presence_conditions = presence_conditions+[prey])
+            if not "only_main_prey" in appearance_options:
+                for prey in secondary_preys:
+                    rr_out.add_appearance(node, absence_conditions = absence_conditions, presence_conditions = presence_conditions+[prey])
+
+
+def relevant_options(appearance_options, preys, secondary_preys, predators, competitors, mutuals, has_feature = False):
+    # Returns the appearance options (in the order of APPEARANCE_OPTIONS) that actually modify the appearance rules of a node
+    relevant = {"only_main_prey": len(secondary_preys) > 0 and not has_feature, "no_predator": len(predators) > 0,
+                "no_competitor": len(competitors) > 0, "all_mutualists": len(mutuals) > 0}
+    return tuple(option for option in APPEARANCE_OPTIONS if option in appearance_options and relevant[option])
+
+
+def share_names(rr_out, names, labels):
+    # Makes the (empty) rule lists of rr_out use the given tables of names, so that packed rules encoded with them can be added
+    rr_out._names = names
+    rr_out._labels = labels
+    rr_out.rules = []
+    rr_out.constraints = []
+
+
+################### Translation with several options ###################
+
+def sweep_variants(allow_appearance = [True, False], strong_dependance = [True, False], appearance_options = APPEARANCE_OPTIONS):
+    # Returns the list of the combinations of options of create_rr (list of dicts), the appearance options being only
+    # combined when allow_appearance is True (by default, 2 + 2*16 = 34 variants)
+
+    # allow_appearance, strong_dependance (lists of bool): values to combine
+    # appearance_options (list of str): options among which all the subsets are taken
+    subsets = [list(subset) for k in range(len(appearance_options) + 1) for subset in combinations(appearance_options, k)]
+    variants = []
+    for allow, strong in product(allow_appearance, strong_dependance):
+        for subset in (subsets if allow == True else [[]]):
+            variants.append({"allow_appearance": allow, "strong_dependance": strong, "appearance_options": subset})
+    return variants
+
+
+def variant_name(options):
+    # Returns the systematic name of a variant of the translation, e.g. "appearance-strong-no_predator" or "noappearance-weak"
+    parts = ["appearance" if options.get("allow_appearance", True) == True else "noappearance",
+             "strong" if options.get("strong_dependance", True) == True else "weak"]
+    if options.get("allow_appearance", True) == True:
+        parts += [option for option in APPEARANCE_OPTIONS if option in options.get("appearance_options", [])]
+    return "-".join(parts)
+
+
+def sweep_rr_list(cache, options, nodes_init = []):
+    # Builds the rr_list of a variant from the packed rules computed by rr_network.sweep_translation
+    rr_out = rr_list(nodes_list = cache["nodes"])
+    rr_out.nodes_init = nodes_init
+    share_names(rr_out, cache["names"], cache["labels"])
+    links = cache["links"][options["strong_dependance"]]
+    if options["allow_appearance"] == True:
+        appearance = []
+        for i, relevant in enumerate(cache["relevant"]):
+            appearance.append(cache["appearance"][i][tuple(option for option in relevant if option in options["appearance_options"])])
+    else:
+        appearance = [(b"", b"", b"", b"")]*len(links)
+    for k, rule_list in ((0, rr_out.rules), (2, rr_out.constraints)):
+        codes = []
+        lengths = []
+        for link, appear in zip(links, appearance):
+            codes += (link[k], appear[k])
+            lengths += (link[k+1], appear[k+1])
+        rule_list.extend_packed(b"".join(codes), b"".join(lengths))
+    return rr_out
+
+
+# State of the processes writing the files of rr_network.write_sweep
+_sweep = {}
+
+def sweep_init(cache, nodes_init):
+    _sweep["cache"] = cache
+    _sweep["nodes_init"] = nodes_init
+
+def sweep_write(task):
+    options, filename, folder, universe, compression = task
+    rr_out = sweep_rr_list(_sweep["cache"], options, _sweep["nodes_init"])
+    if universe == True:
+        rr_out.write_universe_file(filename = filename, folder = folder, sure = "y", compression = compression)
+    else:
+        rr_out.write_file(filename = filename, folder = folder, sure = "y", compression = compression)
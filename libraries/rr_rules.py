@@ -0,0 +1,563 @@
+from array import array
+from collections.abc import MutableSequence
+from itertools import accumulate
+if __package__:
+    from .rr_stats import *
+else:
+    from rr_stats import *
+
+########### Compact storage of the rules of an rr_list #############
+
+# Rules are not stored as character strings: every node is referred to by an integer id (see rr_names)
+# and the whole list of rules is kept in a single array of small integers. A rule with inputs A+, B-
+# and output C- is encoded by the codes
+#       (number of inputs, 2*id(A)+1, 2*id(B), 2*id(C), tag id, comment id)
+# i.e. the last bit of each node code is its sign (1 for "+", 0 for "-"), and the tag and comment
+# are ids in a second table (0 if there is none). Rule strings that cannot be encoded this way are
+# kept as they are, encoded as (0, id of the string in the second table), so that they are written back
+# unchanged. Those which are rules written with another spacing (e.g. in hand-edited .rr files) are
+# interpreted as the same rule written by create_rule when the rules are analysed (see interpret).
+# The strings are only built ("rendered") when the rules are printed or written in a .rr file.
+
+
+class rr_names():
+    # Table giving an integer id to each distinct name (node names, or tags and comments), so that
+    # every name is stored only once whatever the number of rules in which it appears.
+
+    def __init__(self):
+        self.names = []     # id -> name
+        self.ids = {}       # name -> id
+        self.tokens = []    # code -> "name-" or "name+" (code = 2*id + 1 if "+"), used to render the rules
+        self.codes = {}     # "name-" or "name+" -> code, used to parse the rules
+        self.sides = {}     # cache of the codes of the sides of the rules last parsed
+
+    def __len__(self):
+        return len(self.names)
+
+    def get_id(self, name, create = True):
+        # Returns the id of a name, registering it if needed
+
+        # name (str): name to look up (other objects are converted with str())
+        # create (bool): if False, returns None instead of registering an unknown name
+        if type(name) != str:
+            name = str(name)
+        name_id = self.ids.get(name)
+        if name_id is None and create == True:
+            name_id = len(self.names)
+            self.names.append(name)
+            self.ids[name] = name_id
+            self.tokens.append(name + "-")
+            self.tokens.append(name + "+")
+            self.codes[name + "-"] = 2*name_id
+            self.codes[name + "+"] = 2*name_id + 1
+        return name_id
+
+
+class rr_rule():
+    # Decoded view of an encoded rule, mostly intended for the tools analysing the rules
+
+    # lhs, rhs (tuples of int): ids of the input and output nodes (in the rr_names table of the rule list)
+    # lhs_signs, rhs_signs (tuples of "+" or "-"): their signs
+    # tag, comment (str): tag and comment of the rule ("" if none)
+    __slots__ = ("lhs", "lhs_signs", "rhs", "rhs_signs", "tag", "comment")
+
+    def __init__(self, lhs, lhs_signs, rhs, rhs_signs, tag = "", comment = ""):
+        self.lhs = lhs
+        self.lhs_signs = lhs_signs
+        self.rhs = rhs
+        self.rhs_signs = rhs_signs
+        self.tag = tag
+        self.comment = comment
+
+    def __repr__(self):
+        return "rr_rule(lhs={0}, lhs_signs={1}, rhs={2}, rhs_signs={3}, tag={4!r}, comment={5!r})".format(self.lhs, self.lhs_signs, self.rhs, self.rhs_signs, self.tag, self.comment)
+
+
+def _sign_bit(sign):
+    if sign == "+":
+        return 1
+    elif sign == "-":
+        return 0
+    raise ValueError("The signs of a rule have to be '+' or '-' (got {0!r})".format(sign))
+
+
+def _side_codes(names, A, sign_A):
+    # Encodes one side of a rule (same conventions as utils.create_rule)
+    if type(A) == list or type(A) == tuple:
+        if type(sign_A) == str:
+            sign = _sign_bit(sign_A)
+            codes = [2*names.get_id(elm) + sign for elm in A]
+        elif len(A) != len(sign_A):
+            raise ValueError("The number of species and signs does not match")
+        else:
+            codes = [2*names.get_id(elm) + _sign_bit(sign) for elm, sign in zip(A, sign_A)]
+        if len(codes) == 0:
+            raise ValueError("A rule needs at least one input and one output")
+        return codes
+    return [2*names.get_id(A) + _sign_bit(sign_A)]
+
+
+class rr_rule_list(MutableSequence):
+    # List of rules (or constraints) of an rr_list.
+
+    # It behaves like the list of rule strings it replaces (it is a MutableSequence: append, insert, remove, pop, index,
+    # rules[i] = rule, del rules[i], sort, copy, +, in, iteration, print...) but stores the encoded rules. Strings given
+    # by the user (e.g. built by create_rule) are parsed and encoded. Lookup, removal and deduplication use an index
+    # {encoded rule: position(s)} built on first use. Inserting, replacing or deleting rules inside the list takes a time
+    # proportional to its length, as with a list.
+
+    # rules (iterable, optional): initial rules
+    # names (rr_names, optional): table of the node names, shared with the other rule lists of the rr_list
+    # labels (rr_names, optional): table of the tags and comments, shared in the same way
+
+    def __init__(self, rules = [], names = None, labels = None):
+        self.names = rr_names() if names is None else names
+        self.labels = rr_names() if labels is None else labels
+        self.clear()
+        self.extend(rules)
+
+    ######## Encoding and rendering
+
+    def encode(self, A, sign_A, B, sign_B, tag = "", comment = ""):
+        # Encodes a rule (tuple of int), with the same arguments as utils.create_rule
+        lhs = _side_codes(self.names, A, sign_A)
+        return (len(lhs), *lhs, *_side_codes(self.names, B, sign_B),
+                self.labels.get_id(tag) + 1 if len(tag) != 0 else 0,
+                self.labels.get_id(comment) + 1 if len(comment) != 0 else 0)
+
+    def decode(self, key):
+        # Returns the rr_rule corresponding to an encoded rule (str for the rules that could not be encoded nor interpreted)
+        n_lhs = key[0]
+        if n_lhs == 0:
+            interpreted = self.interpret(self.labels.names[key[1]])
+            return self.labels.names[key[1]] if interpreted is None else self.decode(interpreted)
+        lhs = key[1:n_lhs+1]
+        rhs = key[n_lhs+1:-2]
+        return rr_rule(tuple(c >> 1 for c in lhs), tuple("+" if c & 1 else "-" for c in lhs),
+                       tuple(c >> 1 for c in rhs), tuple("+" if c & 1 else "-" for c in rhs),
+                       self.labels.names[key[-2]-1] if key[-2] else "",
+                       self.labels.names[key[-1]-1] if key[-1] else "")
+
+    def render(self, key):
+        # Returns the character string of an encoded rule, exactly as utils.create_rule writes it
+        n_lhs = key[0]
+        if n_lhs == 0:
+            return self.labels.names[key[1]]
+        tokens = self.names.tokens
+        out_str = ("[" + self.labels.names[key[-2]-1] + "] " if key[-2] else " ") \
+            + ", ".join([tokens[c] for c in key[1:n_lhs+1]]) + " >> " + ", ".join([tokens[c] for c in key[n_lhs+1:-2]])
+        if key[-1]:
+            out_str += "\t\t # " + self.labels.names[key[-1]-1]
+        return out_str
+
+    def parse(self, rule, create = True):
+        # Encodes a rule string written as by utils.create_rule. Strings that do not follow this format are
+        # stored as they are. Returns None if create is False and the rule uses unknown names.
+        if type(rule) != str:
+            raise TypeError("rules have to be character strings (got {0})".format(type(rule).__name__))
+        key = self._parse(rule, create)
+        if key is None or key is False:
+            # string that cannot be encoded (or unknown name: the rule can then only be present as such a string)
+            string_id = self.labels.get_id(rule, create = create and key is False)
+            return None if string_id is None else (0, string_id)
+        return key
+
+    def interpret(self, rule, create = True):
+        # Encodes a rule string whatever its spacing (e.g. "A+  >>  B-", "[x]  A+,B- >> A-" or " A+ >> B-  #c"), as the
+        # rule written by create_rule with the same nodes, tag and comment. Returns None if the string is not a rule
+        # (or if create is False and a name is unknown)
+        body = rule.strip()
+        tag = ""
+        if body[:1] == "[":
+            end = body.find("]")
+            if end < 0:
+                return None
+            tag, body = body[1:end].strip(), body[end+1:]
+        body, sep, comment = body.partition("#")
+        sides = body.split(">>")
+        if len(sides) != 2:
+            return None
+        for k, side in enumerate(sides):
+            elms = [elm.strip() for elm in side.split(",")]
+            if any(len(elm) < 2 or not elm[-1] in "+-" or len(elm.split()) != 1 for elm in elms):
+                return None
+            sides[k] = ", ".join(elms)
+        comment = comment.strip()
+        key = self._parse(("[" + tag + "] " if len(tag) != 0 else " ") + sides[0] + " >> " + sides[1]
+                          + ("\t\t # " + comment if len(comment) != 0 else ""), create)
+        return None if key is None or key is False else key
+
+    def _parse(self, rule, create):
+        # Returns the encoded rule, False if the string does not follow the create_rule format (i.e. could not
+        # be rendered back identically), or None if create is False and a name is unknown
+        tag = 0
+        if rule[:1] == " ":
+            body = rule[1:]
+        elif rule[:1] == "[":
+            end = rule.find("] ")
+            if end < 2:
+                return False
+            tag = self.labels.get_id(rule[1:end], create = create)
+            if tag is None:
+                return None
+            tag += 1
+            body = rule[end+2:]
+        else:
+            return False
+        comment = 0
+        if "\t\t # " in body:
+            body, comment = body.split("\t\t # ", 1)
+            if len(comment) == 0:
+                return False
+            comment = self.labels.get_id(comment, create = create)
+            if comment is None:
+                return None
+            comment += 1
+        lhs, sep, rhs = body.partition(" >> ")
+        if len(sep) == 0 or " >> " in rhs:
+            return False
+        lhs = self._parse_side(lhs, create)
+        rhs = self._parse_side(rhs, create)
+        if lhs is False or rhs is False:
+            return False
+        if lhs is None or rhs is None:
+            return None
+        return (len(lhs), *lhs, *rhs, tag, comment)
+
+    def _parse_side(self, side, create):
+        # The same sides (e.g. "P+" for all the rules of a predator) come back often: they are kept in a cache
+        sides = self.names.sides
+        codes = sides.get(side)
+        if codes is not None:
+            return codes
+        codes = []
+        for elm in side.split(", "):
+            code = self.names.codes.get(elm)
+            if code is None:
+                # (names with spaces or separators would be read as other rules: see interpret)
+                if len(elm) < 2 or not elm[-1] in "+-" or len(elm.split()) != 1 or "," in elm or "#" in elm or ">>" in elm:
+                    return False
+                name_id = self.names.get_id(elm[:-1], create = create)
+                if name_id is None:
+                    return None
+                code = 2*name_id + (elm[-1] == "+")
+            codes.append(code)
+        if len(sides) >= 100000:
+            sides.clear()
+        sides[side] = codes
+        return codes
+
+    def _key(self, rule, create = True):
+        if type(rule) == tuple:
+            return rule
+        return self.parse(rule, create = create)
+
+    ######## List-like interface
+
+    def append(self, rule):
+        # Adds a rule (character string, or encoded rule) at the end of the list
+        key = self._key(rule)
+        if self._index is not None:
+            self._index_add(key, len(self._alive))
+        n_codes = len(self._codes)
+        try:
+            self._codes.extend(key)
+        except OverflowError:
+            # ids too large for 16 bits integers: switch to 32 bits
+            del self._codes[n_codes:]
+            self._codes = array("I", self._codes)
+            self._codes.extend(key)
+        self._offsets.append(len(self._codes))
+        self._alive.append(1)
+
+    def append_rule(self, A, sign_A, B, sign_B, tag = "", comment = ""):
+        # Adds a rule directly from its components, with the same arguments as utils.create_rule (no string is built)
+        stats_count("append_rule")
+        self.append(self.encode(A, sign_A, B, sign_B, tag, comment))
+
+    def add(self, rule):
+        # Adds a rule only if it is not already in the list. Returns True if it was added
+        key = self._key(rule)
+        self._build_index()
+        if key in self._index:
+            return False
+        self.append(key)
+        return True
+
+    def extend(self, rules):
+        # Adds several rules at the end of the list (same as append, with less overhead per rule)
+        if rules is self:
+            rules = list(self.keys())
+        if self._index is not None:
+            for rule in rules:
+                self.append(rule)
+            return
+        codes = self._codes
+        offsets = self._offsets
+        alive = self._alive
+        parse = self.parse
+        for rule in rules:
+            key = rule if type(rule) == tuple else parse(rule)
+            try:
+                codes.extend(key)
+            except OverflowError:
+                del codes[offsets[-1]:]
+                self.append(key)
+                codes = self._codes
+                continue
+            offsets.append(len(codes))
+            alive.append(1)
+
+    def packed(self, interpret = False):
+        # Returns the rules as two bytes objects: all their codes, and the number of codes of each rule (both as unsigned 32 bits integers)
+        # They can be stored and added back with extend_packed to a list sharing the same tables of names
+
+        # interpret (bool): if True, the rules that could not be encoded are replaced by their interpretation when they have one (see interpret)
+        if interpret == True:
+            interpreted = rr_rule_list(names = self.names, labels = self.labels)
+            for key in self.keys():
+                if key[0] == 0:
+                    rule = self.interpret(self.labels.names[key[1]])
+                    key = key if rule is None else rule
+                interpreted.append(key)
+            return interpreted.packed()
+        if self._removed > 0:
+            self._compact()
+        codes = self._codes if self._codes.typecode == "I" else array("I", self._codes)
+        offsets = self._offsets
+        lengths = array("I", [offsets[i+1] - offsets[i] for i in range(len(offsets) - 1)])
+        return codes.tobytes(), lengths.tobytes()
+
+    def extend_packed(self, codes, lengths, typecode = "I"):
+        # Adds at the end of the list the rules given as returned by packed (without building any tuple)
+        # typecode ("I" or "H"): the codes are unsigned 32 bits integers ("I", as returned by packed) or 16 bits ones ("H")
+        packed_codes = array(typecode)
+        packed_codes.frombytes(codes)
+        packed_lengths = array("I")
+        packed_lengths.frombytes(lengths)
+        if self._index is not None:
+            offsets = list(accumulate(packed_lengths, initial = 0))
+            for i in range(len(packed_lengths)):
+                self.append(tuple(packed_codes[offsets[i]:offsets[i+1]]))
+            return
+        if self._codes.typecode == "H" and typecode == "I" and len(packed_codes) > 0 and max(packed_codes) >= 1 << 16:
+            self._codes = array("I", self._codes)
+        if self._codes.typecode == typecode:
+            self._codes.extend(packed_codes)
+        else:
+            self._codes.fromlist(packed_codes.tolist())
+        offsets = accumulate(packed_lengths, initial = self._offsets[-1])
+        next(offsets)
+        self._offsets.extend(offsets)
+        self._alive.extend(b"\x01" * len(packed_lengths))
+
+    def remove(self, rule):
+        # Removes the first occurrence of a rule (ValueError if absent)
+        if not self.discard(rule):
+            raise ValueError("rule {0!r} is not in the list".format(rule))
+
+    def discard(self, rule):
+        # Removes the first occurrence of a rule if present. Returns True if a rule was removed
+        key = self._key(rule, create = False)
+        self._build_index()
+        positions = self._index.get(key)
+        if positions is None:
+            return False
+        if type(positions) == int:
+            position = positions
+            del self._index[key]
+        else:
+            position = positions.pop(0)
+            if len(positions) == 1:
+                self._index[key] = positions[0]
+        self._kill(position)
+        return True
+
+    def insert(self, i, rule):
+        # Inserts a rule before position i (as list.insert)
+        if i >= len(self):
+            self.append(rule)
+            return
+        keys = list(self.keys())
+        keys.insert(i, self._key(rule))
+        self._set_keys(keys)
+
+    def index(self, rule, start = 0, stop = None):
+        # Returns the position of the first occurrence of a rule between start and stop (ValueError if absent), as list.index
+        key = self._key(rule, create = False)
+        if self._removed > 0:
+            self._compact()
+        self._build_index()
+        positions = self._index.get(key)
+        positions = [] if positions is None else [positions] if type(positions) == int else positions
+        candidates = range(len(self))[start:stop]
+        for position in positions:
+            if position in candidates:
+                return position
+        raise ValueError("rule {0!r} is not in the list".format(rule))
+
+    def count(self, rule):
+        key = self._key(rule, create = False)
+        self._build_index()
+        positions = self._index.get(key)
+        if positions is None:
+            return 0
+        return 1 if type(positions) == int else len(positions)
+
+    def dedup(self):
+        # Removes the duplicated rules (keeping the first occurrence). Returns the number of rules removed
+        keys = list(dict.fromkeys(self.keys()))
+        n_removed = len(self) - len(keys)
+        if n_removed > 0:
+            self.clear()
+            self.extend(keys)
+        return n_removed
+
+    def clear(self):
+        self._codes = array("H") if len(self.names) < 2**15 else array("I")     # codes of all rules, one after the other
+        self._offsets = array("Q", [0])     # rule i is self._codes[self._offsets[i]:self._offsets[i+1]]
+        self._alive = bytearray()           # 0 for the rules that have been removed
+        self._removed = 0
+        self._index = None
+
+    def sort(self, key = None, reverse = False):
+        # Sorts the rules as their character strings (as list.sort, key being applied to the strings)
+        render = self.render if key is None else lambda code: key(self.render(code))
+        self._set_keys(sorted(self.keys(), key = render, reverse = reverse))
+
+    def reverse(self):
+        self._set_keys(list(self.keys())[::-1])
+
+    def copy(self):
+        # Returns a copy of the list, sharing the tables of names
+        other = rr_rule_list(names = self.names, labels = self.labels)
+        other._codes = array(self._codes.typecode, self._codes)
+        other._offsets = array("Q", self._offsets)
+        other._alive = bytearray(self._alive)
+        other._removed = self._removed
+        return other
+
+    def keys(self):
+        # Iterates over the encoded rules
+        codes = self._codes
+        offsets = self._offsets
+        for i, alive in enumerate(self._alive):
+            if alive:
+                yield tuple(codes[offsets[i]:offsets[i+1]])
+
+    def iter_rules(self):
+        # Iterates over the decoded rules (rr_rule objects, or str for the rules that could not be encoded)
+        for key in self.keys():
+            yield self.decode(key)
+
+    def __contains__(self, rule):
+        return self.count(rule) > 0
+
+    def __len__(self):
+        return len(self._alive) - self._removed
+
+    def __iter__(self):
+        # Iterates over the rules as character strings
+        for key in self.keys():
+            yield self.render(key)
+
+    def __getitem__(self, i):
+        if self._removed > 0:
+            self._compact()
+        if type(i) == slice:
+            return [self.render(tuple(self._codes[self._offsets[j]:self._offsets[j+1]])) for j in range(len(self))[i]]
+        i = range(len(self))[i]
+        return self.render(tuple(self._codes[self._offsets[i]:self._offsets[i+1]]))
+
+    def __setitem__(self, i, rule):
+        # Replaces a rule (or the rules of a slice by those of an iterable)
+        keys = list(self.keys())
+        if type(i) == slice:
+            keys[i] = [self._key(elm) for elm in rule]
+        else:
+            keys[range(len(keys))[i]] = self._key(rule)
+        self._set_keys(keys)
+
+    def __delitem__(self, i):
+        if type(i) == slice:
+            keys = list(self.keys())
+            del keys[i]
+            self._set_keys(keys)
+            return
+        if self._removed > 0:
+            self._compact()
+        position = range(len(self))[i]
+        if self._index is not None:
+            key = tuple(self._codes[self._offsets[position]:self._offsets[position+1]])
+            positions = self._index[key]
+            if type(positions) == int:
+                del self._index[key]
+            else:
+                positions.remove(position)
+                if len(positions) == 1:
+                    self._index[key] = positions[0]
+        self._kill(position)
+
+    def __add__(self, other):
+        if isinstance(other, str):
+            return NotImplemented
+        result = self.copy()
+        result.extend(other)
+        return result
+
+    def __radd__(self, other):
+        if isinstance(other, str):
+            return NotImplemented
+        result = rr_rule_list(other, names = self.names, labels = self.labels)
+        result.extend(self.keys())
+        return result
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __eq__(self, other):
+        if isinstance(other, rr_rule_list) and other.names is self.names and other.labels is self.labels:
+            return list(other.keys()) == list(self.keys())
+        try:
+            return list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
+
+    ######## Index management
+
+    def _index_add(self, key, position):
+        positions = self._index.get(key)
+        if positions is None:
+            self._index[key] = position
+        elif type(positions) == int:
+            self._index[key] = [positions, position]
+        else:
+            positions.append(position)
+
+    def _build_index(self):
+        if self._index is None:
+            self._index = {}
+            codes = self._codes
+            offsets = self._offsets
+            for position, alive in enumerate(self._alive):
+                if alive:
+                    self._index_add(tuple(codes[offsets[position]:offsets[position+1]]), position)
+
+    def _kill(self, position):
+        # Marks the rule at position (in the arrays) as removed, the index being already updated
+        self._alive[position] = 0
+        self._removed += 1
+        if self._removed > 1000 and 2*self._removed > len(self._alive):
+            self._compact()
+
+    def _set_keys(self, keys):
+        # Replaces all the rules by the encoded rules keys
+        self.clear()
+        self.extend(keys)
+
+    def _compact(self):
+        self._set_keys(list(self.keys()))
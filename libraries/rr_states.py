@@ -0,0 +1,837 @@
+from warnings import warn
+from itertools import combinations
+import multiprocessing
+import multiprocessing.connection
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+
+########### State space of an rr_list, computed without ecoserv #############
+
+# A state of the system is an integer (bitmask) in which bit i is set if the i-th node of rr_list.nodes
+# is present. Each rule is compiled into four masks:
+#       pre_on (nodes that have to be present), pre_off (nodes that have to be absent),
+#       eff_on (nodes set present), eff_off (nodes set absent)
+# A rule can be fired in a state s if (s & pre_on) == pre_on, (s & pre_off) == 0 and if it changes the state,
+# and leads to the state (s | eff_on) & ~eff_off. As in ecco/ecoserv, the constraints have priority: in a
+# state in which a constraint can be fired, only constraints can be fired.
+# States are stored as numpy uint64, which limits the systems to 64 nodes.
+
+# Maximal number of (state, rule) pairs evaluated at once
+BLOCK_SIZE = 1 << 22
+
+# Above this number of nodes, the visited states are stored in a sorted array instead of a bitmap (2^n bits)
+BITMAP_MAX_NODES = 30
+
+
+class rr_masks():
+    # Rules and constraints of an rr_list compiled into bitmasks (see compile_masks)
+
+    # nodes (list of str): names of the nodes, bit i corresponding to nodes[i]
+    # rules, constraints (dict of numpy uint64 arrays): masks "pre_on", "pre_off", "eff_on" and "eff_off", one value per rule
+    # init (int): initial state given by nodes_init
+
+    def __init__(self, nodes, rules, constraints, init):
+        self.nodes = nodes
+        self.rules = rules
+        self.constraints = constraints
+        self.init = init
+
+    def state(self, present):
+        # Returns the state (int) in which the nodes of the list present are present
+        positions = {node: i for i, node in enumerate(self.nodes)}
+        state = 0
+        for node in present:
+            if not node in positions:
+                raise ValueError("node {0} not defined !".format(node))
+            state |= 1 << positions[node]
+        return state
+
+    def present(self, state):
+        # Returns the list of the nodes present in a state
+        state = int(state)
+        return [node for i, node in enumerate(self.nodes) if (state >> i) & 1]
+
+
+def compile_masks(rr):
+    # Compiles the rules and constraints of an rr_list into bitmasks (returns a rr_masks object)
+    nodes = [str(node) for node in rr.nodes]
+    if len(nodes) > 64:
+        raise ValueError("the state space can only be computed for systems of at most 64 nodes ({0} nodes here)".format(len(nodes)))
+    positions = {node: i for i, node in enumerate(nodes)}
+    if len(positions) != len(nodes):
+        raise ValueError("some nodes are defined several times")
+
+    compiled = []
+    for rule_list in (rr.rules, rr.constraints):
+        names = rule_list.names.names
+        masks = np.zeros((4, len(rule_list)), dtype = np.uint64)
+        for k, rule in enumerate(rule_list.iter_rules()):
+            if type(rule) == str:
+                raise ValueError("the rule '{0}' could not be interpreted".format(rule))
+            values = [0, 0, 0, 0]
+            for side, ids, signs in ((0, rule.lhs, rule.lhs_signs), (2, rule.rhs, rule.rhs_signs)):
+                for name_id, sign in zip(ids, signs):
+                    name = names[name_id]
+                    if not name in positions:
+                        raise ValueError("node {0} is used in the rules but not defined !".format(name))
+                    values[side + (sign == "-")] |= 1 << positions[name]
+            masks[:, k] = values
+        compiled.append({"pre_on": masks[0], "pre_off": masks[1], "eff_on": masks[2], "eff_off": masks[3]})
+
+    # Initial state, with the same conventions as write_file
+    nodes_init = list(rr.nodes_init)
+    if not len(nodes_init) == len(nodes):
+        warn("initialization of the nodes is incorrect, as the number of nodes is not equal to the number of initial values. All nodes have been initialized to 1.")
+        nodes_init = [1]*len(nodes)
+    init = 0
+    for i, value in enumerate(nodes_init):
+        if value in (1, "+", True):
+            init |= 1 << i
+
+    return rr_masks(nodes, compiled[0], compiled[1], init)
+
+
+def transitions(states, masks):
+    # Lists the rules that can be fired in each state
+
+    # states (numpy uint64 array): states
+    # masks (dict): compiled rules (rr_masks.rules or rr_masks.constraints)
+    # Returns the arrays (rows, rules, successors): rule rules[k] can be fired in states[rows[k]] and leads to successors[k]
+    n_rules = len(masks["pre_on"])
+    if n_rules == 0 or len(states) == 0:
+        empty = np.zeros(0, dtype = np.int64)
+        return empty, empty, np.zeros(0, dtype = np.uint64)
+    block = max(1, BLOCK_SIZE // n_rules)
+    out = ([], [], [])
+    for start in range(0, len(states), block):
+        S = states[start:start+block, None]
+        successors = (S | masks["eff_on"]) & ~masks["eff_off"]
+        enabled = ((S & masks["pre_on"]) == masks["pre_on"]) & ((S & masks["pre_off"]) == 0) & (successors != S)
+        rows, rules = np.nonzero(enabled)
+        out[0].append(rows + start)
+        out[1].append(rules)
+        out[2].append(successors[rows, rules])
+    return np.concatenate(out[0]), np.concatenate(out[1]), np.concatenate(out[2])
+
+
+def step(states, compiled):
+    # Computes all the transitions from the states, giving the priority to the constraints
+
+    # states (numpy uint64 array): states
+    # compiled (rr_masks): compiled rules
+    # Returns the arrays (sources, rules, successors). Rules are numbered as in rr_list.rules, and constraints
+    # after them (i.e. constraint k is number len(rr_list.rules) + k)
+    c_rows, c_rules, c_successors = transitions(states, compiled.constraints)
+    constrained = np.zeros(len(states), dtype = bool)
+    constrained[c_rows] = True
+    free = np.flatnonzero(~constrained)
+    r_rows, r_rules, r_successors = transitions(states[free], compiled.rules)
+    n_rules = len(compiled.rules["pre_on"])
+    return (np.concatenate([states[free[r_rows]], states[c_rows]]),
+            np.concatenate([r_rules, c_rules + n_rules]),
+            np.concatenate([r_successors, c_successors]))
+
+
+class rr_state_space():
+    # Reachable states and transitions of an rr_list (see explore_states)
+
+    # compiled (rr_masks): compiled rules (nodes, masks, initial state)
+    # states (numpy uint64 array): reachable states, in the order in which they were found (the first one is the initial state)
+    # sources, rules, targets (numpy arrays): transitions, rule rules[k] leading from sources[k] to targets[k].
+    #           Rules are numbered as in rr_list.rules, constraint k being number len(rr_list.rules) + k
+    # complete (bool): False if the exploration was stopped by max_states
+    # stats (list of dict or None): for parallel explorations, work done by each worker (see explore_states_parallel)
+
+    def __init__(self, compiled, states, sources, rules, targets, complete = True, stats = None):
+        self.compiled = compiled
+        self.stats = stats
+        self.nodes = compiled.nodes
+        self.states = states
+        self.sources = sources
+        self.rules = rules
+        self.targets = targets
+        self.complete = complete
+
+    def __len__(self):
+        return len(self.states)
+
+    def __contains__(self, state):
+        return bool(np.any(self.states == np.uint64(state)))
+
+    def present(self, state):
+        # Returns the list of the nodes present in a state
+        return self.compiled.present(state)
+
+    def to_matrix(self, states = None):
+        # Returns states as a boolean matrix, with one row per state and column i telling whether self.nodes[i] is present
+
+        # states (array of int, optionnal): states to convert (by default, all the reachable states, in the order of self.states)
+        states = self.states if states is None else np.asarray(states, dtype = np.uint64)
+        bits = np.arange(len(self.nodes), dtype = np.uint64)
+        return ((states[:, None] >> bits) & np.uint64(1)).astype(bool)
+
+    def index(self, states):
+        # Returns the positions of the given states in self.states (-1 for states that are not reachable)
+        order = np.argsort(self.states)
+        sorted_states = self.states[order]
+        states = np.asarray(states, dtype = np.uint64)
+        found = np.searchsorted(sorted_states, states)
+        found[found == len(sorted_states)] = 0
+        return np.where(sorted_states[found] == states, order[found], -1)
+
+    def is_constraint(self):
+        # Returns a boolean array telling which transitions are due to a constraint
+        return self.rules >= len(self.compiled.rules["pre_on"])
+
+    def to_csr(self):
+        # Returns the transition graph between the positions of the states in self.states in compressed sparse row form: (indptr, indices),
+        # the successors of state k being indices[indptr[k]:indptr[k+1]] (sorted, each one once). The arrays are int32 when possible.
+        if self.complete == False:
+            raise ValueError("the transition graph of an incomplete exploration (max_states) is not known")
+        return transition_csr(self.states, self.sources, self.targets)
+
+    def attractors(self):
+        # Finds the attractors (terminal strongly connected components of the transition graph) and their basins (see attractor_analysis)
+        return attractor_analysis(self)
+
+    def to_networkx(self):
+        # Returns the transition graph as a networkx MultiDiGraph whose nodes are the states (int) and whose edges have a "rule" attribute
+        import networkx as nx
+        graph = nx.MultiDiGraph()
+        graph.add_nodes_from(int(state) for state in self.states)
+        graph.add_edges_from((int(s), int(t), {"rule": int(r)}) for s, t, r in zip(self.sources, self.targets, self.rules))
+        return graph
+
+
+########### Attractors and basins #############
+
+# The attractors are the terminal strongly connected components of the transition graph: sets of states which cannot
+# be left, each of them being reachable from all the others (a single stable state, or communities alternating forever).
+# The basin of an attractor is the set of the states from which it can be reached, and its strong basin the set of the
+# states from which no other attractor can be reached. The graph is stored in compressed sparse row arrays (int32 for
+# less than 2^31 states), and all the computations are iterative (no recursion limit).
+
+# Maximal number of transitions converted at once into positions of states
+CSR_BLOCK_SIZE = 1 << 22
+
+
+def transition_csr(states, sources, targets):
+    # Compressed sparse row arrays (indptr, indices) of the transitions sources -> targets (states), between positions in states
+    n = len(states)
+    dtype = np.int32 if n < 2**31 else np.int64
+    order = np.argsort(states)
+    sorted_states = states[order]
+    keys = []
+    for start in range(0, len(sources), CSR_BLOCK_SIZE):
+        # each transition is encoded as source*n + target (positions), so that the duplicates are removed by a single np.unique
+        rows = order[np.searchsorted(sorted_states, sources[start:start+CSR_BLOCK_SIZE])].astype(np.int64)
+        columns = order[np.searchsorted(sorted_states, targets[start:start+CSR_BLOCK_SIZE])].astype(np.int64)
+        keys.append(sorted_unique(rows*n + columns))
+    keys = sorted_unique(np.concatenate(keys)) if len(keys) > 0 else np.zeros(0, dtype = np.int64)
+    indptr = np.zeros(n + 1, dtype = np.int64)
+    np.cumsum(np.bincount(keys // n, minlength = n), out = indptr[1:])
+    return indptr, (keys % n).astype(dtype)
+
+
+def sorted_unique(values):
+    # Same as np.unique for integers, sorting the array in place (much faster than the hash table used by np.unique for large arrays)
+    values.sort()
+    if len(values) == 0:
+        return values
+    return values[np.concatenate([[True], values[1:] != values[:-1]])]
+
+
+def strong_components(indptr, indices):
+    # Strongly connected components of a graph given in compressed sparse row form
+    # Returns (n_components, labels): the component of each node, numbered from 0
+    n = len(indptr) - 1
+    try:
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import connected_components
+    except ImportError:
+        connected_components = None
+    if connected_components is not None:
+        graph = csr_matrix((np.ones(len(indices), dtype = np.int8), indices, indptr), shape = (n, n))
+        return connected_components(graph, directed = True, connection = "strong")
+    return tarjan_components(indptr, indices)
+
+
+def tarjan_components(indptr, indices):
+    # Strongly connected components computed by Tarjan's algorithm, with an explicit stack instead of recursion
+    # Returns (n_components, labels) as strong_components
+    n = len(indptr) - 1
+    indptr = indptr.tolist()
+    indices = indices.tolist()
+    index = [-1]*n          # order of discovery of each node
+    lowlink = [0]*n
+    labels = [-1]*n
+    stack = []              # nodes whose component is not known yet
+    n_components = 0
+    counter = 0
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        calls = [(root, indptr[root])]      # (node, position of the next successor to visit)
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        while len(calls) > 0:
+            node, position = calls[-1]
+            if position < indptr[node + 1]:
+                calls[-1] = (node, position + 1)
+                successor = indices[position]
+                if index[successor] < 0:
+                    index[successor] = lowlink[successor] = counter
+                    counter += 1
+                    stack.append(successor)
+                    calls.append((successor, indptr[successor]))
+                elif labels[successor] < 0 and index[successor] < lowlink[node]:
+                    lowlink[node] = index[successor]
+                continue
+            calls.pop()
+            if len(calls) > 0 and lowlink[node] < lowlink[calls[-1][0]]:
+                lowlink[calls[-1][0]] = lowlink[node]
+            if lowlink[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    labels[member] = n_components
+                    if member == node:
+                        break
+                n_components += 1
+    return n_components, np.array(labels, dtype = np.int64)
+
+
+def attractor_analysis(space):
+    # Finds the attractors of a state space and their basins
+
+    # space (rr_state_space): complete exploration (see explore_states)
+    # Returns the list of the attractors, ordered by decreasing basin size. Each one is a dict with:
+    #   "states" (numpy uint64 array): its states ; "size": their number
+    #   "present": nodes present in all its states ; "variable": nodes present in some of its states only
+    #   "basin": number of states from which it can be reached (itself included) ; "strong_basin": number of states from which
+    #   only this attractor can be reached
+    indptr, indices = space.to_csr()
+    n_components, labels = strong_components(indptr, indices)
+    sizes = np.bincount(labels, minlength = n_components)
+
+    # Graph of the components: a component is an attractor if no transition leaves it
+    sources = np.repeat(labels, np.diff(indptr))
+    targets = labels[indices]
+    del indptr, indices
+    leaving = sources != targets
+    links = sorted_unique(sources[leaving]*n_components + targets[leaving])
+    del sources, targets, leaving
+    sources, targets = links // n_components, links % n_components
+    del links
+    terminal = np.flatnonzero(np.bincount(sources, minlength = n_components) == 0)
+
+    # Links sorted by target, to find the predecessors of the components
+    order = np.argsort(targets, kind = "stable")
+    sources, targets = sources[order], targets[order]
+    starts = np.zeros(n_components + 1, dtype = np.int64)
+    np.cumsum(np.bincount(targets, minlength = n_components), out = starts[1:])
+    chunks = [terminal[first:first+64] for first in range(0, len(terminal), 64)]
+    n_reached = np.zeros(n_components, dtype = np.int64)
+    for chunk in chunks:
+        bits = reached_attractors(sources, targets, starts, chunk, n_components)
+        n_reached += np.unpackbits(bits.view(np.uint8)).reshape(-1, 64).sum(axis = 1, dtype = np.int64)
+    basins = []
+    strong_basins = []
+    for chunk in chunks:
+        # computed again when there are several chunks, so that only one of them is stored at a time
+        bits = reached_attractors(sources, targets, starts, chunk, n_components) if len(chunks) > 1 else bits
+        for k in range(len(chunk)):
+            reaching = (bits >> np.uint64(k)) & np.uint64(1) == 1
+            basins.append(int(sizes[reaching].sum()))
+            strong_basins.append(int(sizes[reaching & (n_reached == 1)].sum()))
+
+    # States of the attractors
+    members = np.argsort(labels, kind = "stable")
+    first_member = np.zeros(n_components + 1, dtype = np.int64)
+    np.cumsum(sizes, out = first_member[1:])
+    attractors = []
+    for k, component in enumerate(terminal):
+        states = space.states[members[first_member[component]:first_member[component+1]]]
+        present = space.to_matrix(states)
+        attractors.append({"states": states, "size": len(states),
+                           "present": [node for node, on in zip(space.nodes, present.all(axis = 0)) if on],
+                           "variable": [node for node, on in zip(space.nodes, present.any(axis = 0) & ~present.all(axis = 0)) if on],
+                           "basin": basins[k], "strong_basin": strong_basins[k]})
+    attractors.sort(key = lambda attractor: (-attractor["basin"], int(attractor["states"].min())))
+    return attractors
+
+
+def reached_attractors(sources, targets, starts, chunk, n_components):
+    # Tells which attractors of chunk (at most 64 terminal components) can be reached from each component: bit k of the returned
+    # uint64 array is set for the components from which chunk[k] can be reached. The bits are propagated from the terminal
+    # components to their predecessors, each component being processed once all its successors are (reverse topological order).
+
+    # sources, targets, starts: links of the graph of the components, sorted by target (the sources of the links to component c being
+    #                  sources[starts[c]:starts[c+1]])
+    bits = np.zeros(n_components, dtype = np.uint64)
+    bits[chunk] = np.uint64(1) << np.arange(len(chunk), dtype = np.uint64)
+    remaining = np.bincount(sources, minlength = n_components)      # successors not processed yet
+    frontier = np.flatnonzero(remaining == 0)
+    while len(frontier) > 0:
+        counts = starts[frontier + 1] - starts[frontier]
+        edges = np.repeat(starts[frontier] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        np.bitwise_or.at(bits, sources[edges], bits[targets[edges]])
+        np.subtract.at(remaining, sources[edges], 1)
+        frontier = np.unique(sources[edges])
+        frontier = frontier[remaining[frontier] == 0]
+    return bits
+
+
+class visited_states():
+    # Set of the states visited by a search: bitmap of 2^n bits for small systems (bitmap = True), sorted array otherwise
+
+    def __init__(self, n_nodes, bitmap = True):
+        self.bitmap = np.zeros(max(1, (1 << n_nodes) >> 3), dtype = np.uint8) if bitmap == True else None
+        self.seen = np.zeros(0, dtype = np.uint64)
+
+    def unseen(self, states):
+        # Returns the boolean array telling which states (numpy uint64 array) have not been visited
+        if self.bitmap is not None:
+            return (self.bitmap[states >> 3] & (np.uint8(1) << (states & 7).astype(np.uint8))) == 0
+        found = np.searchsorted(self.seen, states)
+        found[found == len(self.seen)] = 0
+        return self.seen[found] != states if len(self.seen) > 0 else np.ones(len(states), dtype = bool)
+
+    def mark(self, states):
+        # Adds states (sorted, distinct and not visited yet) to the set
+        if self.bitmap is not None:
+            np.bitwise_or.at(self.bitmap, states >> 3, np.uint8(1) << (states & 7).astype(np.uint8))
+        elif len(states) > 0:
+            # linear merge of the two sorted arrays (no sort of the whole set at each level)
+            self.seen = np.insert(self.seen, np.searchsorted(self.seen, states), states)
+
+
+def explore_states(rr, init = None, max_states = None):
+    # Computes the states reachable from the initial state, and the transitions between them (breadth-first search)
+
+    # rr (rr_list or rr_masks): system to explore
+    # init (list of str or int, optionnal): nodes initially present, or initial state. By default, given by rr.nodes_init
+    # max_states (int, optionnal): the exploration stops after this number of states (the result is then flagged as incomplete)
+    # Returns a rr_state_space object
+    compiled = rr if isinstance(rr, rr_masks) else compile_masks(rr)
+    n = len(compiled.nodes)
+    if init is None:
+        init = compiled.init
+    elif not isinstance(init, (int, np.integer)):
+        init = compiled.state(init)
+
+    visited = visited_states(n, bitmap = n <= BITMAP_MAX_NODES)
+    frontier = np.array([init], dtype = np.uint64)
+    visited.mark(frontier)
+    states = [frontier]
+    n_states = 1
+    sources, rules, targets = [], [], []
+    complete = True
+    while len(frontier) > 0:
+        source, rule, target = step(frontier, compiled)
+        sources.append(source)
+        rules.append(rule)
+        targets.append(target)
+        new = sorted_unique(target.copy())
+        new = new[visited.unseen(new)]
+        if max_states is not None and n_states + len(new) > max_states:
+            new = new[:max_states - n_states]
+            complete = False
+        visited.mark(new)
+        states.append(new)
+        n_states += len(new)
+        frontier = new if complete == True else np.zeros(0, dtype = np.uint64)
+
+    return rr_state_space(compiled, np.concatenate(states), np.concatenate(sources), np.concatenate(rules).astype(np.int64),
+                          np.concatenate(targets), complete = complete)
+
+
+########### Parallel exploration #############
+
+# The states are shared between worker processes according to a hash of their value. At each level of the
+# breadth-first search, each worker computes the transitions from its part of the frontier and sends the
+# successors owned by each other worker directly to it (one pipe per pair of workers), while receiving those
+# it owns from the others. The process coordinating the exploration only receives the number of new states
+# found by each worker at each level, to decide whether the search goes on. Each worker keeps its own set of
+# visited states (as explore_states) and its transitions, which are only gathered at the end (through files).
+
+
+def owners(states, n_workers):
+    # Returns the worker owning each state (multiplicative hash of the state)
+    return ((states * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(40)) % np.uint64(n_workers)
+
+
+def _send_batches(peers, batches):
+    # Sends to each other worker the batch of successors it owns (run in a thread, while the batches of the others are received)
+    for worker, conn in peers.items():
+        conn.send_bytes(batches[worker].tobytes())
+
+
+def _explore_worker(conn, peers, compiled, worker, n_workers, init, bitmap):
+    # Main loop of a worker process, driven by the commands sent by explore_states_parallel
+    # peers (dict): {other worker: connection to it}
+    visited = visited_states(len(compiled.nodes), bitmap = bitmap)
+    frontier = init if int(owners(init, n_workers)[0]) == worker else init[:0]
+    visited.mark(frontier)
+    states, levels, sources, rules, targets = [frontier], [np.zeros(len(frontier), dtype = np.int32)], [], [], []
+    stats = {"worker": worker, "states": 0, "transitions": 0, "busy": 0.0}
+    level = 0
+    while True:
+        command, data = conn.recv()
+        start = time.perf_counter()
+        if command == "expand":
+            # transitions from the frontier, successors sent to their owners
+            level += 1
+            source, rule, target = step(frontier, compiled)
+            sources.append(source)
+            rules.append(rule)
+            targets.append(target)
+            stats["states"] += len(frontier)
+            stats["transitions"] += len(target)
+            target_owners = owners(target, n_workers)
+            batches = [sorted_unique(target[target_owners == w]) for w in range(n_workers)]
+            sender = threading.Thread(target = _send_batches, args = (peers, batches))
+            sender.start()
+            received = [batches[worker]]
+            waiting = list(peers.values())
+            while len(waiting) > 0:
+                for ready in multiprocessing.connection.wait(waiting):
+                    received.append(np.frombuffer(ready.recv_bytes(), dtype = np.uint64))
+                    waiting.remove(ready)
+            sender.join()
+            new = received[0] if len(received) == 1 else sorted_unique(np.concatenate(received))
+            new = new[visited.unseen(new)]
+            visited.mark(new)
+            frontier = new
+            states.append(new)
+            levels.append(np.full(len(new), level, dtype = np.int32))
+            stats["busy"] += time.perf_counter() - start
+            conn.send(len(new))
+        elif command == "collect":
+            # the arrays are written in the folder data (much faster than sending them through the pipe)
+            for k, arrays in enumerate((states, levels, sources, rules, targets)):
+                np.save(os.path.join(data, "{0}_{1}.npy".format(worker, k)), np.concatenate(arrays))
+            states, levels, sources, rules, targets = [], [], [], [], []
+            stats["busy"] += time.perf_counter() - start
+            conn.send(stats)
+        else:
+            break
+    conn.close()
+    for peer in peers.values():
+        peer.close()
+
+
+def explore_states_parallel(rr, processes = None, init = None, max_states = None):
+    # Same as explore_states, with the states shared between several worker processes
+
+    # rr (rr_list or rr_masks): system to explore
+    # processes (int, optionnal): number of worker processes (by default, the number of CPUs)
+    # init (list of str or int, optionnal): nodes initially present, or initial state. By default, given by rr.nodes_init
+    # max_states (int, optionnal): the exploration stops after the level of the search at which this number of states is exceeded
+    # Returns a rr_state_space object (states ordered by level of the search) whose stats attribute gives, for each worker,
+    # the number of states expanded, of transitions found, the time spent working ("busy", in s) and the throughput ("states_per_s")
+    compiled = rr if isinstance(rr, rr_masks) else compile_masks(rr)
+    if init is None:
+        init = compiled.init
+    elif not isinstance(init, (int, np.integer)):
+        init = compiled.state(init)
+    n_workers = processes if processes is not None else os.cpu_count()
+    if n_workers < 1:
+        raise ValueError("the number of processes has to be at least 1")
+    # each worker has its own bitmap, which is only used if all of them fit in the memory of a single bitmap of BITMAP_MAX_NODES nodes
+    bitmap = len(compiled.nodes) + (n_workers - 1).bit_length() <= BITMAP_MAX_NODES
+
+    start = time.perf_counter()
+    context = multiprocessing.get_context()
+    peers = [{} for worker in range(n_workers)]
+    for first, second in combinations(range(n_workers), 2):
+        peers[first][second], peers[second][first] = context.Pipe()
+    pipes = []
+    workers = []
+    init = np.array([init], dtype = np.uint64)
+    for worker in range(n_workers):
+        parent, child = context.Pipe()
+        process = context.Process(target = _explore_worker, args = (child, peers[worker], compiled, worker, n_workers, init, bitmap),
+                                  daemon = True)
+        process.start()
+        child.close()
+        pipes.append(parent)
+        workers.append(process)
+    for worker_peers in peers:
+        for peer in worker_peers.values():
+            peer.close()
+
+    try:
+        n_states = 1
+        complete = True
+        while True:
+            for conn in pipes:
+                conn.send(("expand", None))
+            n_new = sum(conn.recv() for conn in pipes)
+            n_states += n_new
+            if n_new == 0:
+                break
+            if max_states is not None and n_states >= max_states:
+                complete = False
+                break
+        with tempfile.TemporaryDirectory() as folder:
+            for conn in pipes:
+                conn.send(("collect", folder))
+            stats = [conn.recv() for conn in pipes]
+            # states, levels, sources, rules and targets of all the workers
+            arrays = [np.concatenate([np.load(os.path.join(folder, "{0}_{1}.npy".format(worker, k)), mmap_mode = "r") for worker in range(n_workers)])
+                      for k in range(5)]
+    finally:
+        for conn in pipes:
+            try:
+                conn.send(("stop", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in workers:
+            process.join()
+
+    states, levels, sources, rules, targets = arrays
+    order = np.argsort(levels, kind = "stable")
+    elapsed = time.perf_counter() - start
+    for worker_stats in stats:
+        worker_stats["states_per_s"] = worker_stats["states"] / worker_stats["busy"] if worker_stats["busy"] > 0 else 0.0
+        worker_stats["wall"] = elapsed
+    return rr_state_space(compiled, states[order], sources, rules.astype(np.int64, copy = False), targets, complete = complete, stats = stats)
+
+
+########### Monte Carlo simulation #############
+
+# For systems too large to be explored, trajectories are simulated by firing random rules: at each step, one of the
+# constraints that can be fired is chosen uniformly if there is one, and one of the rules that can be fired otherwise.
+# A trajectory stops in a stable state (nothing can be fired), or after max_steps steps. States are stored as rows of
+# uint64 words (bit i % 64 of word i // 64 for the i-th node), so that the number of nodes is not limited, and many
+# trajectories are advanced at once, the rules which can be fired being counted with matrix products. They are simulated
+# by chunks of SIMULATION_CHUNK trajectories, each chunk having its own random generator derived from the seed, so that
+# the results do not depend on the number of processes.
+
+# Number of trajectories simulated together (with their own random generator)
+SIMULATION_CHUNK = 1024
+
+
+class rr_word_masks():
+    # Rules and constraints of an rr_list compiled into masks of uint64 words (see compile_word_masks)
+
+    # nodes (list of str): names of the nodes, node i corresponding to bit i % 64 of word i // 64
+    # rules, constraints (dict of numpy uint64 matrices): masks "pre_on", "pre_off", "eff_on" and "eff_off", one row per rule
+    # init (numpy uint64 array): initial state given by nodes_init
+
+    def __init__(self, nodes, rules, constraints, init):
+        self.nodes = nodes
+        self.n_words = max(1, (len(nodes) + 63) // 64)
+        self.rules = rules
+        self.constraints = constraints
+        self.init = init
+
+    def state(self, present):
+        # Returns the state (array of words) in which the nodes of the list present are present
+        positions = {node: i for i, node in enumerate(self.nodes)}
+        state = np.zeros(self.n_words, dtype = np.uint64)
+        for node in present:
+            if not str(node) in positions:
+                raise ValueError("node {0} not defined !".format(node))
+            i = positions[str(node)]
+            state[i // 64] |= np.uint64(1) << np.uint64(i % 64)
+        return state
+
+    def to_matrix(self, states):
+        # Converts states (matrix of words, one row per state) into a boolean matrix with one column per node
+        bits = np.unpackbits(np.ascontiguousarray(states, dtype = np.uint64).view(np.uint8), axis = 1, bitorder = "little")
+        return bits[:, :len(self.nodes)].astype(bool)
+
+
+def compile_word_masks(rr):
+    # Compiles the rules and constraints of an rr_list into masks of uint64 words (returns a rr_word_masks object)
+    nodes = [str(node) for node in rr.nodes]
+    positions = {node: i for i, node in enumerate(nodes)}
+    if len(positions) != len(nodes):
+        raise ValueError("some nodes are defined several times")
+    n_words = max(1, (len(nodes) + 63) // 64)
+
+    compiled = []
+    for rule_list in (rr.rules, rr.constraints):
+        names = rule_list.names.names
+        masks = np.zeros((4, len(rule_list), n_words), dtype = np.uint64)
+        for k, rule in enumerate(rule_list.iter_rules()):
+            if type(rule) == str:
+                raise ValueError("the rule '{0}' could not be interpreted".format(rule))
+            for side, ids, signs in ((0, rule.lhs, rule.lhs_signs), (2, rule.rhs, rule.rhs_signs)):
+                for name_id, sign in zip(ids, signs):
+                    name = names[name_id]
+                    if not name in positions:
+                        raise ValueError("node {0} is used in the rules but not defined !".format(name))
+                    i = positions[name]
+                    masks[side + (sign == "-"), k, i // 64] |= np.uint64(1) << np.uint64(i % 64)
+        compiled.append({"pre_on": masks[0], "pre_off": masks[1], "eff_on": masks[2], "eff_off": masks[3]})
+
+    # Initial state, with the same conventions as write_file
+    nodes_init = list(rr.nodes_init)
+    if not len(nodes_init) == len(nodes):
+        warn("initialization of the nodes is incorrect, as the number of nodes is not equal to the number of initial values. All nodes have been initialized to 1.")
+        nodes_init = [1]*len(nodes)
+    compiled_rr = rr_word_masks(nodes, compiled[0], compiled[1], None)
+    compiled_rr.init = compiled_rr.state([node for node, value in zip(nodes, nodes_init) if value in (1, "+", True)])
+    return compiled_rr
+
+
+class rr_simulation():
+    # Trajectories simulated from an initial state (see simulate)
+
+    # compiled (rr_word_masks): compiled rules
+    # final (numpy uint64 matrix): last state of each trajectory (one row of words per trajectory)
+    # steps (numpy int64 array): number of rules fired in each trajectory
+    # stable (numpy bool array): True for the trajectories which reached a stable state (the others were stopped after max_steps)
+    # extinctions (numpy int64 matrix): first step at which each node (column) is absent in each trajectory (row), -1 if it never is
+    #       (0 for the nodes absent from the initial state)
+    # seed (int or None): seed of the simulation
+
+    def __init__(self, compiled, final, steps, stable, extinctions, seed = None):
+        self.compiled = compiled
+        self.nodes = compiled.nodes
+        self.final = final
+        self.steps = steps
+        self.stable = stable
+        self.extinctions = extinctions
+        self.seed = seed
+
+    def __len__(self):
+        return len(self.final)
+
+    def outcomes(self):
+        # Distribution of the final communities: list of dicts with the nodes "present" in a final state, its "count" and "frequency",
+        # whether it is "stable", and the "mean_steps" to reach it, by decreasing frequency
+        states, inverse, counts = np.unique(self.final, axis = 0, return_inverse = True, return_counts = True)
+        inverse = inverse.ravel()
+        mean_steps = np.bincount(inverse, weights = self.steps, minlength = len(states)) / counts
+        stable = np.bincount(inverse, weights = self.stable, minlength = len(states)) > 0
+        present = self.compiled.to_matrix(states)
+        outcomes = [{"present": [node for node, on in zip(self.nodes, present[k]) if on], "count": int(counts[k]),
+                     "frequency": counts[k] / len(self), "stable": bool(stable[k]), "mean_steps": float(mean_steps[k])}
+                    for k in range(len(states))]
+        outcomes.sort(key = lambda outcome: -outcome["count"])
+        return outcomes
+
+    def presence(self):
+        # Returns {node: frequency of the trajectories in which it is present at the end}
+        return dict(zip(self.nodes, self.compiled.to_matrix(self.final).mean(axis = 0).tolist()))
+
+    def hitting_times(self, node = None):
+        # Returns the number of steps before the end of each trajectory (node = None, -1 for the trajectories which did not reach a
+        # stable state) or before the first absence of a node (-1 if it is always present)
+        if node is None:
+            return np.where(self.stable, self.steps, -1)
+        if not node in self.nodes:
+            raise ValueError("node {0} not defined !".format(node))
+        return self.extinctions[:, self.nodes.index(node)]
+
+
+def counting_matrix(masks, n_nodes):
+    # Returns the float32 matrix M and the array n_conditions such that, for a state x (0/1 vector of the nodes) and a = [x, 1 - x],
+    # (a @ M)[r] is the number of conditions of the rule r satisfied in x and (a @ M)[R + r] the number of nodes changed by r
+    # (R rules). Counting with a matrix product is much faster than comparing the words of every state with every rule.
+    def unpack(words):
+        return np.unpackbits(np.ascontiguousarray(words).view(np.uint8), axis = 1, bitorder = "little")[:, :n_nodes].astype(np.float32)
+    pre_on, pre_off, eff_on, eff_off = (unpack(masks[key]) for key in ("pre_on", "pre_off", "eff_on", "eff_off"))
+    # a node both set and removed by a rule is removed
+    matrix = np.block([[pre_on.T, eff_off.T], [pre_off.T, (eff_on * (1 - eff_off)).T]])
+    return np.ascontiguousarray(matrix), pre_on.sum(axis = 1) + pre_off.sum(axis = 1)
+
+
+def enabled_rules(present, counting):
+    # Returns the boolean matrix telling which rules can be fired in each state
+    # present (numpy float32 matrix): 0/1 presence of the nodes (columns) in each state (rows)
+    # counting: (matrix, n_conditions) returned by counting_matrix
+    matrix, n_conditions = counting
+    counts = np.concatenate([present, 1 - present], axis = 1) @ matrix
+    n_rules = len(n_conditions)
+    return (counts[:, :n_rules] == n_conditions) & (counts[:, n_rules:] > 0)
+
+
+def choose_rules(present, counting, rng):
+    # Chooses uniformly one of the rules that can be fired in each state (-1 if none can be), see enabled_rules
+    n_rules = len(counting[1])
+    choice = np.full(len(present), -1, dtype = np.int64)
+    if n_rules == 0:
+        return choice
+    block = max(1, BLOCK_SIZE // n_rules)
+    for start in range(0, len(present), block):
+        enabled = enabled_rules(present[start:start+block], counting)
+        keys = np.where(enabled, rng.random(enabled.shape, dtype = np.float32), -1)
+        chosen = keys.argmax(axis = 1)
+        choice[start:start+block] = np.where(enabled.any(axis = 1), chosen, -1)
+    return choice
+
+
+def simulate_chunk(task):
+    # Simulates a chunk of trajectories (used by simulate, possibly in a worker process)
+    # task: (compiled, init, n_trajectories, max_steps, seed sequence). Returns (final, steps, stable, extinctions)
+    compiled, init, n, max_steps, seed_sequence = task
+    rng = np.random.default_rng(seed_sequence)
+    n_nodes = len(compiled.nodes)
+    states = np.tile(init, (n, 1))
+    steps = np.zeros(n, dtype = np.int64)
+    stable = np.zeros(n, dtype = bool)
+    extinctions = np.where(compiled.to_matrix(states), -1, 0).astype(np.int64)
+    # effects of the constraints followed by those of the rules
+    n_constraints = len(compiled.constraints["eff_on"])
+    eff_on = np.concatenate([compiled.constraints["eff_on"], compiled.rules["eff_on"]])
+    eff_off = np.concatenate([compiled.constraints["eff_off"], compiled.rules["eff_off"]])
+    constraints = counting_matrix(compiled.constraints, n_nodes)
+    rules = counting_matrix(compiled.rules, n_nodes)
+    active = np.arange(n)
+    for step in range(1, max_steps + 1):
+        if len(active) == 0:
+            break
+        current = states[active]
+        present = compiled.to_matrix(current).astype(np.float32)
+        # constraints are fired where they can be, rules elsewhere
+        chosen = choose_rules(present, constraints, rng)
+        free = np.flatnonzero(chosen < 0)
+        fired = choose_rules(present[free], rules, rng)
+        chosen[free] = np.where(fired >= 0, fired + n_constraints, -1)
+        moving = chosen >= 0
+        stable[active[~moving]] = True
+        active = active[moving]
+        current = current[moving]
+        chosen = chosen[moving]
+        successors = (current | eff_on[chosen]) & ~eff_off[chosen]
+        states[active] = successors
+        steps[active] = step
+        # first absence of the nodes removed at this step
+        lost = current & ~successors
+        rows, nodes = np.nonzero(np.unpackbits(lost.view(np.uint8), axis = 1, bitorder = "little")[:, :n_nodes])
+        first = extinctions[active[rows], nodes] < 0
+        extinctions[active[rows[first]], nodes[first]] = step
+    return states, steps, stable, extinctions
+
+
+def simulate(rr, n_trajectories = 1000, max_steps = 1000, seed = None, init = None, processes = None):
+    # Simulates trajectories of the system by firing random rules (see above)
+
+    # rr (rr_list or rr_word_masks): system to simulate
+    # n_trajectories (int): number of trajectories
+    # max_steps (int): maximal number of rules fired in a trajectory
+    # seed (int, optionnal): seed of the random generators (the same seed gives the same trajectories, whatever the number of processes)
+    # init (list of str, optionnal): nodes initially present. By default, given by rr.nodes_init
+    # processes (int, optionnal): if set, the chunks of trajectories are shared between this number of worker processes
+    # Returns a rr_simulation object
+    compiled = rr if isinstance(rr, rr_word_masks) else compile_word_masks(rr)
+    start = compiled.init if init is None else compiled.state(init)
+    sizes = [min(SIMULATION_CHUNK, n_trajectories - first) for first in range(0, n_trajectories, SIMULATION_CHUNK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(compiled, start, size, max_steps, seed_sequence) for size, seed_sequence in zip(sizes, seeds)]
+    if processes is None or processes <= 1 or len(tasks) <= 1:
+        results = [simulate_chunk(task) for task in tasks]
+    else:
+        with multiprocessing.get_context().Pool(min(processes, len(tasks))) as pool:
+            results = pool.map(simulate_chunk, tasks)
+    if len(results) == 0:
+        results = [simulate_chunk((compiled, start, 0, max_steps, np.random.SeedSequence(seed)))]
+    return rr_simulation(compiled, *[np.concatenate([result[k] for result in results]) for k in range(4)], seed = seed)
@@ -0,0 +1,200 @@
+import time
+from functools import wraps
+
+########### Optional instrumentation of the translation #############
+
+# Statistics are only recorded inside a "with rr_stats() as stats:" block. The instrumented functions
+# (create_rr, include_matrix, write_file, ...) record the time spent in each of their phases and count
+# the rules created by kind of interaction, the rules built ("append_rule": the rules added from their components
+# by the translation ; "create_rule": the calls of utils.create_rule, for rules written as strings) and the bytes
+# written (characters of the .rr files, before compression). Outside of such a block, the instrumentation only costs a test of a global variable.
+#
+# Example:
+#       with rr_stats(memory = True) as stats:
+#           rr = net.create_rr()
+#           rr.write_file("web")
+#       print(stats.to_json())
+
+# json and tracemalloc are only imported when needed, to keep the import of the core modules fast
+
+# Statistics being recorded (None if there are none)
+_current = None
+
+
+class rr_stats():
+    # Context manager recording the statistics of the translations done inside its block
+
+    # memory (bool): if True, the peak memory of each phase is measured with tracemalloc (which slows the code down)
+    # After the block:
+    #   phases (dict): {name: {"calls": n, "seconds": total time, "peak_bytes": peak memory}} ; the phases called inside
+    #                  another phase are named "outer/inner" (e.g. "create_rr/translation")
+    #   counters (dict): {name: value}, e.g. "rules.predation", "append_rule", "bytes_written"
+    #   seconds (float): duration of the block
+    #   peak_bytes (int or None): peak memory during the block (if memory is True)
+
+    def __init__(self, memory = False):
+        self.memory = memory
+        self.phases = {}
+        self.counters = {}
+        self.seconds = 0.0
+        self.peak_bytes = None
+        self._stack = []        # [name, start, peak] of the phases being run
+        self._previous = None
+
+    def __enter__(self):
+        global _current
+        self._previous = _current
+        _current = self
+        self._started_tracing = False
+        if self.memory == True:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        global _current
+        self.seconds += time.perf_counter() - self._start
+        if self.memory == True:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                self.peak_bytes = max(self.peak_bytes or 0, tracemalloc.get_traced_memory()[1])
+            if self._started_tracing == True:
+                tracemalloc.stop()
+        _current = self._previous
+        return False
+
+    ######## Recording
+
+    def count(self, name, n = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def phase(self, name):
+        return recorded_phase(self, name)
+
+    def _enter_phase(self, name):
+        if len(self._stack) > 0:
+            name = self._stack[-1][0] + "/" + name
+        peak = 0
+        if self.memory == True:
+            import tracemalloc
+            if len(self._stack) > 0:
+                self._stack[-1][2] = max(self._stack[-1][2], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self.phases.setdefault(name, {"calls": 0, "seconds": 0.0, "peak_bytes": None})
+        self._stack.append([name, time.perf_counter(), peak])
+
+    def _exit_phase(self):
+        name, start, peak = self._stack.pop()
+        record = self.phases[name]
+        record["calls"] += 1
+        record["seconds"] += time.perf_counter() - start
+        if self.memory == True:
+            import tracemalloc
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            record["peak_bytes"] = max(record["peak_bytes"] or 0, peak)
+            if len(self._stack) > 0:
+                self._stack[-1][2] = max(self._stack[-1][2], peak)
+            else:
+                self.peak_bytes = max(self.peak_bytes or 0, peak)
+            tracemalloc.reset_peak()
+
+    ######## Output
+
+    def to_dict(self):
+        return {"seconds": self.seconds, "peak_bytes": self.peak_bytes, "phases": self.phases, "counters": self.counters}
+
+    def to_json(self, **kwd):
+        import json
+        return json.dumps(self.to_dict(), **kwd)
+
+    def __repr__(self):
+        lines = ["{0:<40} {1:>6} {2:>10} {3:>14}".format("phase", "calls", "time (s)", "peak memory")]
+        for name, record in self.phases.items():
+            lines.append("{0:<40} {1:>6} {2:>10.4f} {3:>14}".format(name, record["calls"], record["seconds"],
+                         "" if record["peak_bytes"] is None else record["peak_bytes"]))
+        for name, value in sorted(self.counters.items()):
+            lines.append("{0:<40} {1:>6}".format(name, value))
+        return "\n".join(lines)
+
+
+class recorded_phase():
+    # Context manager recording a phase in a rr_stats object (see stats_phase)
+    __slots__ = ("stats", "name")
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.stats._enter_phase(self.name)
+        return self
+
+    def __exit__(self, *exception):
+        self.stats._exit_phase()
+        return False
+
+
+class no_phase():
+    # Context manager doing nothing, used when no statistics are recorded
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        return False
+
+_no_phase = no_phase()
+
+
+def current_stats():
+    # Returns the rr_stats object recording the statistics, or None
+    return _current
+
+
+def stats_phase(name):
+    # Returns a context manager recording the time spent in its block as the phase name (if statistics are recorded)
+    if _current is None:
+        return _no_phase
+    return _current.phase(name)
+
+
+def stats_count(name, n = 1):
+    # Adds n to a counter (if statistics are recorded)
+    if _current is not None:
+        _current.count(name, n)
+
+
+def stats_timed(name):
+    # Decorator recording each call of a function as the phase name (if statistics are recorded)
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwd):
+            if _current is None:
+                return function(*args, **kwd)
+            with _current.phase(name):
+                return function(*args, **kwd)
+        return wrapper
+    return decorator
+
+
+def stats_rules(kind):
+    # Decorator of the methods of rr_list adding rules, counting the rules and constraints they add as "rules.kind" and
+    # "constraints.kind" (if statistics are recorded)
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwd):
+            if _current is None:
+                return method(self, *args, **kwd)
+            n_rules = len(self.rules)
+            n_constraints = len(self.constraints)
+            result = method(self, *args, **kwd)
+            _current.count("rules." + kind, len(self.rules) - n_rules)
+            if len(self.constraints) > n_constraints:
+                _current.count("constraints." + kind, len(self.constraints) - n_constraints)
+            return result
+        return wrapper
+    return decorator
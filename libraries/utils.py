@@ -1,3 +1,9 @@
+from importlib import import_module
+if __package__:
+    from .rr_stats import *
+else:
+    from rr_stats import *
+
 ########### Function to automatically write a rule #############
 def create_rule(A, sign_A, B, sign_B, tag="", comment=""):
 #     A (string) : name of the component to be added as input of the rule.
@@ -12,6 +18,8 @@ def create_rule(A, sign_A, B, sign_B, tag="", comment=""):
 #       - If A and sign_A are both lists, the sign will be chosen in sign_A for each element of A
 #       (in which case, be careful as both lists need to have equal lengths!)
     
+    stats_count("create_rule")
+    
     # Verification of arguments
     if type(A) == list or type(A) == tuple:
         if type(sign_A) ==  str:
@@ -64,4 +72,12 @@ def apbm(A, B, tag="", comment=""):
 def ambp(A, B, tag="", comment=""):
     return create_rule(A, "-", B, "+", tag, comment)
 def ambm(A, B, tag="", comment=""):
-    return create_rule(A, "-", B, "-", tag, comment)
\ No newline at end of file
+    return create_rule(A, "-", B, "-", tag, comment)
+
+########## Lazy imports of the other modules ############
+def import_sibling(name):
+#     Imports a module of the libraries folder when it is first needed (e.g. rr_states, which needs numpy),
+#     whether the folder is used as the rr_translator package or directly from the sys.path
+    if __package__:
+        return import_module("." + name, __package__)
+    return import_module(name)